@@ -0,0 +1,113 @@
+"""
+Run benchmarks and write results as JSON.
+
+    python -m benchmarks --scales 1 10 100 --output results.json
+    python -m benchmarks --compare results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess  # noqa: S404
+import sys
+import tempfile
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import duckdb
+
+from benchmarks.datasets import prepare_dataset
+from benchmarks.suite import BenchmarkResult, run_suite
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--only", help="Run only cases containing this substring")
+    parser.add_argument("--output", type=Path, help="Write results to this file")
+    parser.add_argument(
+        "--compare", type=Path, help="Compare with results from the previous run"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Median slowdown ratio that is reported as regression",
+    )
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the web app reads settings on import
+        os.environ.setdefault("CSWM_PARSER_RESULTS_PATH", tmp_dir)
+        os.environ.setdefault("CSWM_EMAIL_FOR_SCRAPPER_USERAGENT", "bench@localhost")
+        results = []
+        for scale in args.scales:
+            feed_path = prepare_dataset(scale, Path(tmp_dir))
+            print(f"Running benchmarks on x{scale} dataset", file=sys.stderr)
+            results.extend(
+                run_suite(feed_path, scale=scale, rounds=args.rounds, only=args.only)
+            )
+
+    report = {"meta": _meta(), "results": [asdict(result) for result in results]}
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(report_json)
+    else:
+        print(report_json)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        return _compare(baseline, results, threshold=args.threshold)
+    return 0
+
+
+def _compare(
+    baseline: list[dict], results: list[BenchmarkResult], *, threshold: float
+) -> int:
+    baseline_by_key = {(item["dataset"], item["name"]): item for item in baseline}
+    regressions = 0
+    for result in results:
+        old = baseline_by_key.get(result.key)
+        if old is None or not old["median"]:
+            continue
+        ratio = result.median / old["median"]
+        mark = ""
+        if ratio >= threshold:
+            mark = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{result.dataset:>6} {result.name:<55} "
+            f"{old['median'] * 1000:10.3f}ms -> {result.median * 1000:10.3f}ms "
+            f"x{ratio:.2f}{mark}",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+def _meta() -> dict:
+    try:
+        revision = subprocess.check_output(  # noqa: S603,S607
+            ["git", "rev-parse", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "revision": revision,
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+    }
+
+
+if __name__ == "__main__":
+    sys.exit(main())
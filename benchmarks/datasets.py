@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import contextlib
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from picodi import SingletonScope, registry, shutdown_dependencies
+
+from cs_wayback_machine.deps import get_duckdb_connection_manager
+from cs_wayback_machine.synthetic import DatasetConfig, generate_rosters
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from cs_wayback_machine.storage import DuckDbConnectionManager
+
+FIXTURE_PATH = Path(__file__).parent.parent / "tests" / "test_web" / "rosters.jsonlines"
+
+
+def prepare_dataset(scale: int, directory: Path) -> Path:
+    """
+    Return path to a rosters feed with `scale` times more rows than the fixture.
+    Scaled feeds are synthetic, seeded by `scale`.
+    """
+    if scale == 1:
+        return FIXTURE_PATH
+    with open(FIXTURE_PATH) as f:
+        target_rows = scale * sum(1 for _ in f)
+
+    # every team has at least one row, so there are always enough teams
+    config = DatasetConfig(teams=target_rows, seed=scale)
+    path = directory / f"rosters-x{scale}.jsonlines"
+    rows = 0
+    last_team = None
+    with open(path, "w") as f:
+        for item in generate_rosters(config):
+            # stop only on team boundary, so every team is complete
+            if rows >= target_rows and item["team_unique_name"] != last_team:
+                break
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+            rows += 1
+            last_team = item["team_unique_name"]
+    return path
+
+
+@contextlib.contextmanager
+def serve_dataset(manager: DuckDbConnectionManager) -> Iterator[None]:
+    """
+    Serve the app from `manager`. Singletons (caches, indexes) keep
+    the manager they were built with, so they are dropped before and after.
+    """
+    shutdown_dependencies(SingletonScope)
+    try:
+        with registry.override(get_duckdb_connection_manager, lambda: manager):
+            yield
+    finally:
+        shutdown_dependencies(SingletonScope)
@@ -0,0 +1,320 @@
+"""
+Replay a realistic traffic mix against the web app and report throughput,
+latency percentiles and error rates per route.
+
+    python -m benchmarks.loadtest --requests 5000 --concurrency 16
+    python -m benchmarks.loadtest --url http://localhost:8000 --duration 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import contextlib
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import httpx
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.datasets import prepare_dataset, serve_dataset
+from cs_wayback_machine.storage import DuckDbConnectionManager, ParserResultsStorage
+from cs_wayback_machine.web.presenters import player_link, team_link
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+# share of requests per route
+TRAFFIC_MIX = {
+    "GET /": 0.05,
+    "GET /api/entities/": 0.05,
+    "GET /api/search/": 0.10,
+    "GET /goto/": 0.10,
+    "GET /teams/{team_id}/": 0.35,
+    "GET /teams/{team_id}/?from&to": 0.10,
+    "GET /teams/{team_id}/?hl": 0.10,
+    "GET /players/{player_id}/": 0.25,
+}
+
+
+class ZipfSampler:
+    """Picks items with probability proportional to 1 / rank ** s"""
+
+    def __init__(self, items: Sequence[str], s: float) -> None:
+        self._items = items
+        self._cum_weights = list(
+            itertools.accumulate(1 / rank**s for rank in range(1, len(items) + 1))
+        )
+
+    def pick(self, uniform: float) -> str:
+        """Pick item by uniformly distributed `uniform` value in [0, 1)"""
+        value = uniform * self._cum_weights[-1]
+        return self._items[bisect.bisect(self._cum_weights, value)]
+
+
+def generate_requests(
+    entities: list[str], *, zipf_s: float, seed: int
+) -> Iterator[tuple[str, str]]:
+    """
+    Endless stream of (route, url) built from `/api/entities/` items.
+    Popularity of teams and players follows Zipf distribution, ranks are
+    assigned in random (seeded) order.
+    """
+    rnd = random.Random(seed)  # noqa: S311,DUO102
+    teams = [
+        item.removeprefix("team:") for item in entities if item.startswith("team:")
+    ]
+    players = [
+        item.removeprefix("player:") for item in entities if item.startswith("player:")
+    ]
+    rnd.shuffle(teams)
+    rnd.shuffle(players)
+    team_sampler = ZipfSampler(teams, zipf_s)
+    player_sampler = ZipfSampler(players, zipf_s)
+    routes = list(TRAFFIC_MIX)
+    weights = list(TRAFFIC_MIX.values())
+
+    while True:
+        route = rnd.choices(routes, weights)[0]
+        if route == "GET /":
+            yield route, "/"
+        elif route == "GET /api/entities/":
+            yield route, "/api/entities/"
+        elif route == "GET /api/search/":
+            # as typed in the search box
+            name = player_sampler.pick(rnd.random())
+            query = name[: rnd.randint(1, len(name))]
+            yield route, str(httpx.URL("/api/search/", params={"q": query}))
+        elif route == "GET /goto/":
+            if rnd.random() < 0.5:
+                query = f"team:{team_sampler.pick(rnd.random())}"
+            else:
+                query = f"player:{player_sampler.pick(rnd.random())}"
+            yield route, str(httpx.URL("/goto/", params={"q": query}))
+        elif route == "GET /teams/{team_id}/":
+            yield route, team_link(team_sampler.pick(rnd.random()))
+        elif route == "GET /teams/{team_id}/?from&to":
+            date_from = date(rnd.randint(2005, 2024), 1, 1)
+            date_to = date(date_from.year + rnd.randint(0, 3), 12, 31)
+            yield route, team_link(team_sampler.pick(rnd.random()), date_from, date_to)
+        elif route == "GET /teams/{team_id}/?hl":
+            yield route, team_link(
+                team_sampler.pick(rnd.random()),
+                highlight=player_sampler.pick(rnd.random()),
+            )
+        else:
+            yield route, player_link(player_sampler.pick(rnd.random()))
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    # e.g. 404 for team pages with period when the team didn't exist
+    client_errors: int = 0
+
+
+@dataclass
+class RouteReport:
+    route: str
+    requests: int
+    errors: int
+    error_rate: float
+    client_errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+
+
+async def run_load(
+    client: AsyncClient,
+    requests: Iterator[tuple[str, str]],
+    *,
+    concurrency: int,
+    total_requests: int | None = None,
+    duration: float | None = None,
+) -> tuple[dict[str, RouteStats], float]:
+    """
+    Send requests with `concurrency` parallel workers until `total_requests`
+    are sent or `duration` seconds passed. Return stats by route and
+    elapsed time. 5xx responses and transport failures are counted as errors.
+    """
+    stats: dict[str, RouteStats] = defaultdict(RouteStats)
+    if total_requests is not None:
+        requests = itertools.islice(requests, total_requests)
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    async def worker() -> None:
+        for route, url in requests:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            request_start = time.perf_counter()
+            route_stats = stats[route]
+            try:
+                response = await client.get(url)
+            except httpx.HTTPError:
+                route_stats.errors += 1
+            else:
+                route_stats.errors += response.is_server_error
+                route_stats.client_errors += response.is_client_error
+            route_stats.latencies.append(time.perf_counter() - request_start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats, time.perf_counter() - start
+
+
+def make_report(stats: dict[str, RouteStats], elapsed: float) -> list[RouteReport]:
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.latencies.extend(route_stats.latencies)
+        total.errors += route_stats.errors
+        total.client_errors += route_stats.client_errors
+    return [
+        _route_report(route, route_stats, elapsed)
+        for route, route_stats in [*sorted(stats.items()), ("total", total)]
+        if route_stats.latencies
+    ]
+
+
+def _route_report(route: str, stats: RouteStats, elapsed: float) -> RouteReport:
+    latencies = sorted(stats.latencies)
+    return RouteReport(
+        route=route,
+        requests=len(latencies),
+        errors=stats.errors,
+        error_rate=stats.errors / len(latencies),
+        client_errors=stats.client_errors,
+        throughput=len(latencies) / elapsed,
+        p50=_percentile(latencies, 0.50),
+        p95=_percentile(latencies, 0.95),
+        p99=_percentile(latencies, 0.99),
+    )
+
+
+def _percentile(sorted_values: list[float], quantile: float) -> float:
+    index = min(len(sorted_values) - 1, int(quantile * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def load_test(
+    base_url: str | None,
+    *,
+    feed_path: Path | None,
+    concurrency: int,
+    total_requests: int | None,
+    duration: float | None,
+    zipf_s: float,
+    seed: int,
+) -> list[RouteReport]:
+    """
+    Run load test against the server at `base_url`, or against the app
+    in-process with data from `feed_path`.
+    """
+    async with contextlib.AsyncExitStack() as stack:
+        if base_url is not None:
+            client = AsyncClient(base_url=base_url, timeout=30)
+        else:
+            # imported here because the app reads settings on import
+            from cs_wayback_machine.web.main import app
+
+            client = AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://testserver"
+            )
+        if feed_path is not None:
+            manager = DuckDbConnectionManager(ParserResultsStorage(feed_path))
+            stack.enter_context(serve_dataset(manager))
+        await stack.enter_async_context(client)
+
+        response = await client.get("/api/entities/")
+        response.raise_for_status()
+        requests = generate_requests(response.json(), zipf_s=zipf_s, seed=seed)
+        stats, elapsed = await run_load(
+            client,
+            requests,
+            concurrency=concurrency,
+            total_requests=total_requests,
+            duration=duration,
+        )
+    return make_report(stats, elapsed)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument(
+        "--url", help="Base URL of running server, app is run in-process if not set"
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=1,
+        help="Size of the dataset for in-process run, see `python -m benchmarks`",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, help="Stop after N requests")
+    parser.add_argument("--duration", type=float, help="Stop after N seconds")
+    parser.add_argument(
+        "--zipf-s", type=float, default=1.1, help="Exponent of the popularity skew"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write report to this file")
+    args = parser.parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 1000
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        feed_path = None
+        if args.url is None:
+            os.environ.setdefault("CSWM_PARSER_RESULTS_PATH", tmp_dir)
+            os.environ.setdefault(
+                "CSWM_EMAIL_FOR_SCRAPPER_USERAGENT", "bench@localhost"
+            )
+            feed_path = prepare_dataset(args.scale, Path(tmp_dir))
+        reports = asyncio.run(
+            load_test(
+                args.url,
+                feed_path=feed_path,
+                concurrency=args.concurrency,
+                total_requests=args.requests,
+                duration=args.duration,
+                zipf_s=args.zipf_s,
+                seed=args.seed,
+            )
+        )
+
+    print(
+        f"{'route':<30} {'requests':>8} {'rps':>8} {'errors':>7} {'4xx':>5} "
+        f"{'p50':>9} {'p95':>9} {'p99':>9}",
+        file=sys.stderr,
+    )
+    for report in reports:
+        print(
+            f"{report.route:<30} {report.requests:>8} {report.throughput:>8.1f} "
+            f"{report.error_rate:>7.1%} {report.client_errors:>5} "
+            f"{report.p50 * 1000:>7.1f}ms {report.p95 * 1000:>7.1f}ms "
+            f"{report.p99 * 1000:>7.1f}ms",
+            file=sys.stderr,
+        )
+    if args.output:
+        args.output.write_text(
+            json.dumps([asdict(report) for report in reports], indent=2)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
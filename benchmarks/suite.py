@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import asyncio
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.datasets import serve_dataset
+from cs_wayback_machine.export import EXPORT_QUERIES, DatasetExporter
+from cs_wayback_machine.roster import create_rosters
+from cs_wayback_machine.statistics import StatisticsCalculator, build_statistics_cube
+from cs_wayback_machine.storage import (
+    DuckDbConnectionManager,
+    ParserResultsStorage,
+    RosterStorage,
+)
+from cs_wayback_machine.web.aliases import build_alias_index
+from cs_wayback_machine.web.graph import build_teammate_graph
+from cs_wayback_machine.web.intervals import build_roster_interval_index
+from cs_wayback_machine.web.presenters import (
+    STATISTICS_CUBE_LIMIT,
+    MainPagePresenter,
+    PlayerPagePresenter,
+    TeamRostersPresenter,
+    player_link,
+    present_available_ids,
+    present_global_data,
+    team_link,
+)
+from cs_wayback_machine.web.search import SearchIndex
+from cs_wayback_machine.web.transfers import build_transfer_index
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from cs_wayback_machine.web.graph import TeammateGraph
+
+STATISTICS_LIMIT = 10
+# players to find paths to from the sample player
+PATH_TARGETS = 100
+TRANSFER_MAX_GAP_DAYS = 90
+
+
+@dataclass
+class BenchmarkResult:
+    dataset: str
+    scale: int
+    group: str
+    name: str
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+
+    @classmethod
+    def from_timings(
+        cls, timings: list[float], *, dataset: str, scale: int, group: str, name: str
+    ) -> BenchmarkResult:
+        return cls(
+            dataset=dataset,
+            scale=scale,
+            group=group,
+            name=name,
+            rounds=len(timings),
+            min=min(timings),
+            median=statistics.median(timings),
+            mean=statistics.mean(timings),
+            stdev=statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        )
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.dataset, self.name
+
+
+@dataclass
+class Case:
+    group: str
+    name: str
+    func: Callable[[], Any]
+
+
+def run_suite(
+    feed_path: Path, *, scale: int, rounds: int, only: str | None = None
+) -> list[BenchmarkResult]:
+    """
+    Time storage, statistics, presenters and routes against the feed at
+    `feed_path`. `only` filters cases by substring of their names.
+    """
+    dataset = f"x{scale}"
+    storage = ParserResultsStorage(feed_path)
+    load_timings = measure(
+        lambda: DuckDbConnectionManager(storage).conn.close(), min(rounds, 3)
+    )
+    results = [
+        BenchmarkResult.from_timings(
+            load_timings, dataset=dataset, scale=scale, group="storage", name="load"
+        )
+    ]
+    manager = DuckDbConnectionManager(storage)
+    team_id, player_id = _sample_ids(manager)
+    for case in _cases(manager, team_id=team_id, player_id=player_id):
+        if only and only not in case.name:
+            continue
+        results.append(
+            BenchmarkResult.from_timings(
+                measure(case.func, rounds),
+                dataset=dataset,
+                scale=scale,
+                group=case.group,
+                name=case.name,
+            )
+        )
+
+    with serve_dataset(manager):
+        for name, url in _routes(team_id=team_id, player_id=player_id):
+            if only and only not in name:
+                continue
+            timings = asyncio.run(measure_route(url, rounds))
+            results.append(
+                BenchmarkResult.from_timings(
+                    timings, dataset=dataset, scale=scale, group="routes", name=name
+                )
+            )
+    return results
+
+
+def measure(func: Callable[[], Any], rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def measure_route(url: str, rounds: int) -> list[float]:
+    # imported here because the app reads settings on import
+    from cs_wayback_machine.web.main import app
+
+    timings = []
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        # warm up
+        response = await client.get(url)
+        if response.is_error:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await client.get(url)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _sample_ids(manager: DuckDbConnectionManager) -> tuple[str, str]:
+    """Team with the biggest history and player with the most teams"""
+    team_row = manager.conn.execute(
+        """
+        SELECT team_id
+        FROM rosters
+        GROUP BY team_id
+        ORDER BY COUNT(*) DESC, team_id
+        LIMIT 1;
+        """
+    ).fetchone()
+    player_row = manager.conn.execute(
+        """
+        SELECT player_unique_id
+        FROM rosters
+        WHERE player_unique_id IS NOT NULL
+        GROUP BY player_unique_id
+        ORDER BY COUNT(DISTINCT team_id) DESC, player_unique_id
+        LIMIT 1;
+        """
+    ).fetchone()
+    assert team_row is not None
+    assert player_row is not None
+    return team_row[0], player_row[0]
+
+
+def _cases(
+    manager: DuckDbConnectionManager, *, team_id: str, player_id: str
+) -> list[Case]:
+    storage = RosterStorage(manager)
+    calc = StatisticsCalculator(manager)
+    team_players = storage.get_players(team_id, date.min, date.max)
+    search_index = SearchIndex(present_available_ids(storage))
+    alias_index = build_alias_index(storage)
+    exporter = DatasetExporter(manager)
+    interval_index = build_roster_interval_index(storage)
+    teammate_graph = build_teammate_graph(storage)
+    statistics_cube = build_statistics_cube(calc, limit=STATISTICS_CUBE_LIMIT)
+    player_ids = sorted(storage.get_player_names())
+    path_targets = player_ids[:: max(len(player_ids) // PATH_TARGETS, 1)]
+    cases = [
+        Case(
+            "storage", "RosterStorage.get_db_updated_date", storage.get_db_updated_date
+        ),
+        Case("storage", "RosterStorage.get_team", partial(storage.get_team, team_id)),
+        Case(
+            "storage",
+            "RosterStorage.get_players",
+            partial(storage.get_players, team_id, date.min, date.max),
+        ),
+        Case(
+            "storage",
+            "RosterStorage.get_player",
+            partial(storage.get_player, player_id),
+        ),
+        Case(
+            "storage",
+            "RosterStorage.get_teammates",
+            partial(storage.get_teammates, player_id),
+        ),
+        Case("storage", "RosterStorage.get_team_names", storage.get_team_names),
+        Case("storage", "RosterStorage.get_player_names", storage.get_player_names),
+        Case("roster", "create_rosters", partial(create_rosters, team_players)),
+        Case(
+            "presenters",
+            "TeamRostersPresenter.present",
+            partial(TeamRostersPresenter(rosters_storage=storage).present, team_id),
+        ),
+        Case(
+            "presenters",
+            "PlayerPagePresenter.present",
+            partial(PlayerPagePresenter(rosters_storage=storage).present, player_id),
+        ),
+        Case(
+            "presenters",
+            "MainPagePresenter.present",
+            MainPagePresenter(
+                statistics_calculator=calc, statistics_cube=statistics_cube
+            ).present,
+        ),
+        Case(
+            "presenters",
+            "MainPagePresenter.present year",
+            partial(
+                MainPagePresenter(
+                    statistics_calculator=calc, statistics_cube=statistics_cube
+                ).present,
+                year=2015,
+            ),
+        ),
+        Case(
+            "presenters",
+            "present_available_ids",
+            partial(present_available_ids, storage),
+        ),
+        Case(
+            "presenters", "present_global_data", partial(present_global_data, storage)
+        ),
+        Case(
+            "search",
+            "SearchIndex.build",
+            lambda: SearchIndex(present_available_ids(storage)),
+        ),
+        Case(
+            "statistics",
+            "StatisticsCalculator.entity_popularity",
+            calc.entity_popularity,
+        ),
+        Case("search", "SearchIndex.search", partial(search_index.search, team_id[:3])),
+        Case(
+            "search",
+            "SearchIndex.search fuzzy",
+            partial(search_index.search, team_id[::-1]),
+        ),
+        Case("search", "AliasIndex.build", partial(build_alias_index, storage)),
+        Case("search", "AliasIndex.player", partial(alias_index.player, player_id)),
+        Case(
+            "intervals",
+            "RosterIntervalIndex.build",
+            partial(build_roster_interval_index, storage),
+        ),
+        Case(
+            "intervals",
+            "RosterIntervalIndex.at",
+            partial(interval_index.at, team_id, date(2015, 6, 1)),
+        ),
+        Case(
+            "intervals",
+            "RosterIntervalIndex.snapshot",
+            partial(interval_index.snapshot, date(2015, 6, 1)),
+        ),
+        Case(
+            "statistics",
+            "StatisticsCube.build",
+            partial(build_statistics_cube, calc, limit=STATISTICS_CUBE_LIMIT),
+        ),
+        Case("graph", "TeammateGraph.build", partial(build_teammate_graph, storage)),
+        Case(
+            "graph",
+            f"TeammateGraph.path x{len(path_targets)}",
+            partial(_paths, teammate_graph, player_id, path_targets),
+        ),
+        Case(
+            "transfers",
+            "TransferIndex.build",
+            partial(build_transfer_index, storage, max_gap_days=TRANSFER_MAX_GAP_DAYS),
+        ),
+        *[
+            Case(
+                "export",
+                f"DatasetExporter.write {table}",
+                partial(_export, exporter, table),
+            )
+            for table in EXPORT_QUERIES
+        ],
+    ]
+    for name in [
+        "players_with_most_days_in_current_team",
+        "players_with_most_teams",
+        "active_players_by_country",
+        "teams_with_most_players",
+        "players_with_most_teammates",
+        "get_teammate_pair_with_most_time",
+    ]:
+        cases.append(
+            Case(
+                "statistics",
+                f"StatisticsCalculator.{name}",
+                partial(getattr(calc, name), limit=STATISTICS_LIMIT),
+            )
+        )
+    return cases
+
+
+def _export(exporter: DatasetExporter, table: str) -> None:
+    with tempfile.TemporaryDirectory(prefix="cswm-benchmark-") as tmp_dir:
+        exporter.write(table, Path(tmp_dir) / f"{table}.parquet")
+
+
+def _paths(graph: TeammateGraph, player_id: str, targets: list[str]) -> None:
+    for target in targets:
+        graph.path(player_id, target)
+
+
+def _routes(*, team_id: str, player_id: str) -> list[tuple[str, str]]:
+    return [
+        ("GET /", "/"),
+        ("GET /?year=", "/?year=2015"),
+        ("GET /api/entities/", "/api/entities/"),
+        ("GET /api/search/", f"/api/search/?q={team_id[:3]}"),
+        ("GET /goto/", f"/goto/?q=team:{team_id}"),
+        ("GET /teams/{team_id}/", team_link(team_id)),
+        ("GET /players/{player_id}/", player_link(player_id)),
+        ("GET /snapshot/", "/snapshot/?date=2015-06-01"),
+        ("GET /transfers/", "/transfers/?year=2015"),
+        ("GET /metrics/", "/metrics/"),
+        ("GET /favicon.ico", "/favicon.ico"),
+    ]
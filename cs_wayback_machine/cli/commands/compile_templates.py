@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from picodi import Provide, inject
+
+from cs_wayback_machine.cli.core import Command
+from cs_wayback_machine.deps import get_settings
+from cs_wayback_machine.web.html_render import compile_templates, configure_templates
+
+if TYPE_CHECKING:
+    import argparse
+
+    from cs_wayback_machine.settings import Settings
+
+
+class CompileTemplatesCommand(Command):
+    """Compile templates into the bytecode cache shared by web workers"""
+
+    @inject
+    def run(
+        self,
+        args: argparse.Namespace,  # noqa: U100
+        settings: Settings = Provide(get_settings),
+    ) -> None:
+        if settings.templates_cache_path is None:
+            print("templates_cache_path is not set in the config", flush=True)
+            raise SystemExit(1)
+        configure_templates(
+            auto_reload=False, bytecode_cache_path=settings.templates_cache_path
+        )
+        names = compile_templates()
+        print(
+            f"Compiled {len(names)} templates to {settings.templates_cache_path}",
+            flush=True,
+        )
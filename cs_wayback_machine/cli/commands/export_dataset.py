@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from picodi import Provide, inject
+
+from cs_wayback_machine.cli.core import Command
+from cs_wayback_machine.deps import get_dataset_exporter
+from cs_wayback_machine.export import EXPORT_QUERIES
+
+if TYPE_CHECKING:
+    import argparse
+
+    from cs_wayback_machine.export import DatasetExporter
+
+
+class ExportDatasetCommand(Command):
+    """Export tables and derived tables as Parquet files"""
+
+    @classmethod
+    def setup_parser(cls, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("output", type=Path, help="Directory for Parquet files")
+        parser.add_argument(
+            "--tables",
+            nargs="+",
+            choices=list(EXPORT_QUERIES),
+            default=list(EXPORT_QUERIES),
+        )
+
+    @inject
+    def run(
+        self,
+        args: argparse.Namespace,
+        exporter: DatasetExporter = Provide(get_dataset_exporter),
+    ) -> None:
+        args.output.mkdir(parents=True, exist_ok=True)
+        for table in args.tables:
+            path = args.output / f"{table}.parquet"
+            rows = exporter.write(table, path)
+            print(f"Exported {rows} rows to {path}", flush=True)
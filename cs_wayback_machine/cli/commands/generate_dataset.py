@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from cs_wayback_machine.cli.core import Command
+from cs_wayback_machine.synthetic import DatasetConfig, write_dataset
+
+if TYPE_CHECKING:
+    import argparse
+
+
+class GenerateDatasetCommand(Command):
+    """Generate synthetic rosters dataset for scale testing"""
+
+    @classmethod
+    def setup_parser(cls, parser: argparse.ArgumentParser) -> None:
+        defaults = DatasetConfig()
+        parser.add_argument("output", type=Path, help="Path to rosters.jsonlines")
+        parser.add_argument("--teams", type=int, default=defaults.teams)
+        parser.add_argument("--roster-size", type=int, default=defaults.roster_size)
+        parser.add_argument(
+            "--roster-churn",
+            type=float,
+            default=defaults.roster_churn,
+            help="Average number of roster changes per team per year",
+        )
+        parser.add_argument(
+            "--career-years",
+            type=float,
+            default=defaults.career_years,
+            help="Average career length of a player",
+        )
+        parser.add_argument(
+            "--invalid-date-share",
+            type=float,
+            default=defaults.invalid_date_share,
+            help="Share of rows with incomplete dates",
+        )
+        parser.add_argument(
+            "--player-reuse",
+            type=float,
+            default=defaults.player_reuse,
+            help="Chance that a free roster spot is taken by an already known player",
+        )
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+
+    def run(self, args: argparse.Namespace) -> None:
+        config = DatasetConfig(
+            teams=args.teams,
+            roster_size=args.roster_size,
+            roster_churn=args.roster_churn,
+            career_years=args.career_years,
+            invalid_date_share=args.invalid_date_share,
+            player_reuse=args.player_reuse,
+            seed=args.seed,
+        )
+        rows = write_dataset(args.output, config)
+        print(f"Generated {rows} rows in {args.output}", flush=True)
@@ -27,25 +27,43 @@ class UpdateDatabaseCommand(Command):
             type=schedule_time,
             help=(
                 "Run the command in schedule mode. Format:"
-                "'WEEKDAY-HOUR-MINUTE'. Example: '0-12-30' for Monday 12:30 UTC"
+                "'WEEKDAY-HOUR-MINUTE'. Example: '0-12-30' for Monday 12:30 UTC,"
+                " '*-12-30' for every day at 12:30 UTC"
             ),
         )
+        parser.add_argument(
+            "--budget",
+            type=int,
+            help=(
+                "Refresh only up to BUDGET most active teams (plus new ones)"
+                " and keep other teams from the previous run"
+            ),
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Discard checkpoint of the interrupted crawl and start from scratch",
+        )
 
     def run(self, args: argparse.Namespace) -> None:
         if not args.schedule:
-            result = scrape_liquidpedia_and_replace_result()
+            result = scrape_liquidpedia_and_replace_result(
+                budget=args.budget, restart=args.restart
+            )
             render_result(result)
             return
 
-        self.schedule_job(args.schedule)
+        self.schedule_job(args.schedule, budget=args.budget)
 
-    def schedule_job(self, schedule: tuple[int, int, int]) -> None:
+    def schedule_job(
+        self, schedule: tuple[int | None, int, int], budget: int | None = None
+    ) -> None:
         setup_monitoring()
         scheduler = sched.scheduler(time.time, time.sleep)
 
         def job(just_schedule: bool = False) -> None:
             if not just_schedule:
-                result = scrape_liquidpedia_and_replace_result()
+                result = scrape_liquidpedia_and_replace_result(budget=budget)
                 only_print_result(result)
             next_run = next_run_time(schedule)
             print(
@@ -57,15 +75,22 @@ class UpdateDatabaseCommand(Command):
         scheduler.run()
 
 
-def schedule_time(schedule: str) -> tuple[int, int, int]:
+def schedule_time(schedule: str) -> tuple[int | None, int, int]:
+    if schedule.startswith("*-"):
+        res = datetime.strptime(schedule.removeprefix("*-"), "%H-%M")
+        return None, res.hour, res.minute
     res = datetime.strptime(schedule, "%w-%H-%M")
     return int(schedule.split("-")[0]), res.hour, res.minute
 
 
-def next_run_time(schedule: tuple[int, int, int]) -> float:
+def next_run_time(schedule: tuple[int | None, int, int]) -> float:
     weekday, hour, minute = schedule
     now = datetime.fromtimestamp(time.time())
     next_run = now.replace(hour=hour, minute=minute)
+    if weekday is None:
+        if now.time() >= next_run.time():
+            next_run += timedelta(days=1)
+        return next_run.timestamp()
     if now.weekday() == weekday and now.time() < next_run.time():
         return next_run.timestamp()
     days_ahead = weekday - now.weekday()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 import shutil
 from dataclasses import dataclass
 from datetime import date
@@ -7,12 +8,26 @@ from typing import TYPE_CHECKING
 
 from picodi import Provide, inject
 
+from cs_wayback_machine.crawl_scheduler import CrawlScheduler
+from cs_wayback_machine.date_util import new_data_version
+from cs_wayback_machine.delta import compute_delta, prune_deltas
 from cs_wayback_machine.deps import get_settings
+from cs_wayback_machine.feed import Manifest, merge_feeds, verify_feed
 from cs_wayback_machine.scraper import TeamsSpider, create_crawler_process
+from cs_wayback_machine.storage import ParserResultsStorage
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from datetime import datetime
+    from pathlib import Path
+
+    from cs_wayback_machine.delta import Delta
     from cs_wayback_machine.settings import Settings
 
+DELTAS_TO_KEEP = 10
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class Result:
@@ -22,40 +37,157 @@ class Result:
 
 @inject
 def scrape_liquidpedia_and_replace_result(
+    budget: int | None = None,
+    restart: bool = False,
     settings: Settings = Provide(get_settings),
 ) -> Result:
+    """
+    Scrape Liquipedia and replace parser results.
+    If `budget` is set and previous results exist, only the most active teams
+    (up to `budget`) and new teams are refreshed, other teams are kept as is.
+    If the previous crawl didn't finish, it's resumed from the checkpoint
+    unless `restart` is set.
+    """
     settings.parser_results_path.mkdir(parents=False, exist_ok=True)
-    tmp_file = settings.parser_results_path / "rosters.inprogress.jsonlines"
-    tmp_file.unlink(missing_ok=True)
+    tmp_dir = settings.parser_results_path / "rosters.inprogress"
+    job_dir = settings.crawl_job_path
+    if restart or not job_dir.exists():
+        shutil.rmtree(job_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    else:
+        logger.info("Resuming interrupted crawl from %s", job_dir)
+    job_dir.mkdir(exist_ok=True)
+
+    today = date.today()
+    scheduler = CrawlScheduler.load(settings.crawl_state_file_path)
+    parser_result_path = settings.parser_result_path
+    is_partial = budget is not None and parser_result_path.exists()
+    team_filter = None
+    if budget is not None and is_partial:
+        team_filter = _make_team_filter(scheduler, budget=budget, today=today)
 
     process = create_crawler_process(
-        result_path=tmp_file, email=settings.email_for_scrapper_useragent
+        result_dir=tmp_dir, email=settings.email_for_scrapper_useragent, job_dir=job_dir
     )
     crawler = process.create_crawler(TeamsSpider)
-    process.crawl(crawler)
+    process.crawl(crawler, team_filter=team_filter)
     process.start(install_signal_handlers=False)
-    errors_count = crawler.stats.get_value("downloader/exception_count")
+    finish_reason = crawler.stats.get_value("finish_reason")
+    # errors below CLOSESPIDER_ERRORCOUNT don't change the finish reason
+    spider_errors = crawler.stats.get_value("spider_exceptions/count", 0)
+    assert isinstance(crawler.spider, TeamsSpider)
+    crawled_teams = crawler.spider.crawled_teams
+    failed_urls = crawler.spider.failed_urls
     process.stop()
 
-    if errors_count:
-        return Result("Error occurred during the scraping", 1)
+    if finish_reason != "finished" or failed_urls or spider_errors:
+        return Result(
+            f"Scraping didn't finish (reason: {finish_reason},"
+            f" failed pages: {len(failed_urls)}, errors: {spider_errors}),"
+            " run again to resume",
+            1,
+        )
+    # crawl is finished, a rejected feed must not be resumed by the next run
+    shutil.rmtree(job_dir, ignore_errors=True)
 
-    tmp_file_size = tmp_file.stat().st_size
-    if tmp_file_size == 0:
-        tmp_file.unlink(missing_ok=True)
-        return Result("Scraping resulted in empty file", 1)
+    if is_partial:
+        crawl_dir = tmp_dir
+        tmp_dir = settings.parser_results_path / "rosters.merged"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        merge_feeds(
+            parser_result_path,
+            crawl_dir,
+            replaced_teams=crawled_teams,
+            target_dir=tmp_dir,
+        )
+        shutil.rmtree(crawl_dir, ignore_errors=True)
 
-    parser_result_file_path = settings.parser_result_file_path
-    if parser_result_file_path.exists():
-        old_file_size = parser_result_file_path.stat().st_size
-        # if the tmp file is more than 10% smaller than the old file, something is wrong
-        if tmp_file_size < old_file_size * 0.9:
-            tmp_file.unlink(missing_ok=True)
-            return Result("New file is significantly smaller than the old one", 1)
+    if error := _check_new_feed(tmp_dir, parser_result_path):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return Result(error, 1)
 
-        shutil.move(parser_result_file_path, f"{parser_result_file_path}.bak")
-    shutil.move(tmp_file, parser_result_file_path)
+    old_version = ParserResultsStorage(
+        parser_result_path, updated_file=settings.parser_result_updated_date_file_path
+    ).version()
+    # workers reload the data only when its version increases
+    version = new_data_version(old_version)
+    delta = None
+    if parser_result_path.exists():
+        delta = _publish_delta(
+            settings,
+            old_version=old_version,
+            new_version=version,
+            new_feed_path=tmp_dir,
+        )
+        backup_path = parser_result_path.with_name(f"{parser_result_path.name}.bak")
+        shutil.rmtree(backup_path, ignore_errors=True)
+        shutil.move(parser_result_path, backup_path)
+    shutil.move(tmp_dir, parser_result_path)
     with open(settings.parser_result_updated_date_file_path, "w") as f:
-        f.write(date.today().isoformat())
+        f.write(version.isoformat())
+
+    scheduler.record_crawl(
+        crawled_teams=crawled_teams,
+        changed_teams=delta.teams if delta else None,
+        feed_path=parser_result_path,
+        today=today,
+    )
+    scheduler.save(settings.crawl_state_file_path)
 
     return Result("Scraping finished")
+
+
+def _make_team_filter(
+    scheduler: CrawlScheduler, *, budget: int, today: date
+) -> Callable[[str], bool]:
+    planned_teams = scheduler.plan(budget, today)
+    known_teams = set(scheduler.teams)
+    logger.info("Refreshing %s of %s teams", len(planned_teams), len(known_teams))
+
+    def team_filter(name: str) -> bool:
+        return name in planned_teams or name not in known_teams
+
+    return team_filter
+
+
+def _check_new_feed(new_feed_path: Path, old_feed_path: Path) -> str | None:
+    manifest = Manifest.load(new_feed_path)
+    if manifest is None or manifest.total_rows == 0:
+        return "Scraping resulted in empty feed"
+    if errors := verify_feed(new_feed_path):
+        return f"Scraping resulted in corrupted feed: {errors}"
+
+    old_manifest = Manifest.load(old_feed_path) if old_feed_path.exists() else None
+    # if the new feed has more than 10% fewer rows than the old one,
+    #   something is wrong
+    if old_manifest and manifest.total_rows < old_manifest.total_rows * 0.9:
+        return "New feed is significantly smaller than the old one"
+    return None
+
+
+def _publish_delta(
+    settings: Settings,
+    *,
+    old_version: datetime | None,
+    new_version: datetime,
+    new_feed_path: Path,
+) -> Delta | None:
+    if old_version is None or old_version >= new_version:
+        return None
+    delta = compute_delta(
+        settings.parser_result_path,
+        new_feed_path,
+        from_version=old_version,
+        to_version=new_version,
+        deltas_path=settings.parser_result_deltas_path,
+    )
+    logger.info(
+        "Delta %s -> %s: %s teams changed, %s rows added, %s rows removed",
+        delta.from_version,
+        delta.to_version,
+        len(delta.teams),
+        delta.added_rows,
+        delta.removed_rows,
+    )
+    prune_deltas(settings.parser_result_deltas_path, keep=DELTAS_TO_KEEP)
+    return delta
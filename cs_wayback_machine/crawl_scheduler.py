@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+import duckdb
+
+from cs_wayback_machine.duck import read_feed
+from cs_wayback_machine.feed import feed_files
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+
+@dataclass
+class TeamCrawlState:
+    last_crawled: date | None = None
+    last_changed: date | None = None
+    active_players: int = 0
+    recent_moves: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> TeamCrawlState:
+        return cls(
+            last_crawled=_parse_date(data.get("last_crawled")),
+            last_changed=_parse_date(data.get("last_changed")),
+            active_players=data.get("active_players", 0),
+            recent_moves=data.get("recent_moves", 0),
+        )
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        for key in ("last_crawled", "last_changed"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+
+class CrawlScheduler:
+    """
+    Keeps per-team crawl state and decides which teams should be refreshed.
+    Teams with recent roster moves and many active players are refreshed
+    often, teams that didn't change for years are refreshed rarely.
+    """
+
+    def __init__(
+        self,
+        teams: dict[str, TeamCrawlState] | None = None,
+        *,
+        max_refresh_interval_days: int = 90,
+        change_half_life_days: int = 30,
+        recent_moves_period_days: int = 365,
+        hot_budget_share: float = 0.5,
+    ) -> None:
+        self.teams = teams or {}
+        self._max_refresh_interval_days = max_refresh_interval_days
+        self._change_half_life_days = change_half_life_days
+        self._recent_moves_period_days = recent_moves_period_days
+        self._hot_budget_share = hot_budget_share
+
+    @classmethod
+    def load(cls, state_path: Path) -> CrawlScheduler:
+        if not state_path.exists():
+            return cls()
+        data = json.loads(state_path.read_text())
+        return cls(
+            {name: TeamCrawlState.from_dict(item) for name, item in data.items()}
+        )
+
+    def save(self, state_path: Path) -> None:
+        data = {name: state.to_dict() for name, state in sorted(self.teams.items())}
+        tmp_path = state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2))
+        os.replace(tmp_path, state_path)
+
+    def priority(self, state: TeamCrawlState, today: date) -> float:
+        if state.last_crawled is None:
+            return math.inf
+        days_since_crawl = (today - state.last_crawled).days
+        if days_since_crawl <= 0:
+            return 0.0
+        if days_since_crawl >= self._max_refresh_interval_days:
+            return math.inf
+        last_changed = state.last_changed or date.min
+        days_since_change = max((today - last_changed).days, 0)
+        activity = 1 + state.active_players + 2 * state.recent_moves
+        hotness = activity / (1 + days_since_change / self._change_half_life_days)
+        return days_since_crawl * hotness
+
+    def plan(self, budget: int, today: date) -> set[str]:
+        """
+        Return names of known teams to refresh within `budget` team requests.
+        Overdue teams (never crawled or not crawled for the max refresh
+        interval) are refreshed least recently crawled first, but at least
+        `hot_budget_share` of the budget is kept for other teams by priority,
+        so after a full crawl overdue teams don't crowd out active ones.
+        """
+        overdue = []
+        hot = []
+        for name, state in self.teams.items():
+            priority = self.priority(state, today)
+            if priority == math.inf:
+                overdue.append((state.last_crawled or date.min, name))
+            elif priority > 0:
+                hot.append((-priority, name))
+        overdue.sort()
+        hot.sort()
+        # unused part of either share goes to the other one
+        hot_budget = min(
+            len(hot),
+            max(budget - len(overdue), math.ceil(budget * self._hot_budget_share)),
+        )
+        planned = hot[:hot_budget] + overdue[: budget - hot_budget]
+        return {name for _, name in planned}
+
+    def record_crawl(
+        self,
+        *,
+        crawled_teams: Iterable[str],
+        changed_teams: Iterable[str] | None,
+        feed_path: Path,
+        today: date,
+    ) -> None:
+        """
+        Update state of crawled teams.
+        `changed_teams` is None if changes are unknown (e.g. first crawl).
+        """
+        crawled_teams = set(crawled_teams)
+        changed = set(changed_teams) if changed_teams is not None else None
+        stats = self._team_stats(feed_path, crawled_teams, today)
+        for name in crawled_teams:
+            state = self.teams.setdefault(name, TeamCrawlState())
+            state.last_crawled = today
+            active_players, recent_moves, last_move = stats.get(name, (0, 0, None))
+            state.active_players = active_players
+            state.recent_moves = recent_moves
+            if changed is not None and name in changed:
+                state.last_changed = today
+            elif last_move is not None:
+                state.last_changed = max(state.last_changed or last_move, last_move)
+
+    def _team_stats(
+        self, feed_path: Path, teams: set[str], today: date
+    ) -> dict[str, tuple[int, int, date | None]]:
+        conn = duckdb.connect(":memory:")
+        feed_rel = read_feed(conn, feed_files(feed_path))  # noqa: F841
+        rows = conn.execute(
+            """
+            SELECT
+                team_unique_name,
+                COUNT(DISTINCT player_unique_id) FILTER (
+                    WHERE join_date IS NOT NULL
+                        AND inactive_date IS NULL
+                        AND leave_date IS NULL
+                ),
+                COUNT(*) FILTER (
+                    WHERE join_date >= $since
+                        OR inactive_date >= $since
+                        OR leave_date >= $since
+                ),
+                GREATEST(MAX(join_date), MAX(inactive_date), MAX(leave_date))
+            FROM feed_rel
+            WHERE team_unique_name IN (SELECT unnest($teams))
+            GROUP BY team_unique_name
+            """,
+            parameters={
+                "since": today - timedelta(days=self._recent_moves_period_days),
+                "teams": list(teams),
+            },
+        ).fetchall()
+        return {name: (active, moves, last) for name, active, moves, last in rows}
+
+
+def _parse_date(value: str | None) -> date | None:
+    return date.fromisoformat(value) if value else None
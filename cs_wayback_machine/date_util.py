@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 
 
 @dataclass
@@ -22,6 +22,22 @@ class DateRange:
         return (self.end - self.start).days
 
 
+def new_data_version(previous: datetime | None) -> datetime:
+    """
+    Version of newly published data: UTC time in seconds, always later than
+    `previous`, so several updates on the same day are still ordered
+    """
+    version = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    if previous is not None and version <= previous:
+        version = previous + timedelta(seconds=1)
+    return version
+
+
+def data_version_name(version: datetime) -> str:
+    """Version for file names"""
+    return version.strftime("%Y-%m-%dT%H-%M-%S")
+
+
 def days_human_readable(days: int) -> str:
     if days <= 31:
         return f"{days} days"
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import duckdb
+
+from cs_wayback_machine.date_util import data_version_name
+from cs_wayback_machine.duck import read_feed
+from cs_wayback_machine.feed import (
+    SHARD_FILE_NAME_TEMPLATE,
+    Manifest,
+    Shard,
+    feed_files,
+    file_sha256,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+DELTA_FILE_NAME = "delta.json"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Delta:
+    """
+    Changes between two versions of the feed.
+    `path` is a feed directory that holds all new rows of the affected teams.
+    """
+
+    path: Path
+    from_version: datetime
+    to_version: datetime
+    teams: list[str]
+    players: list[str]
+    added_rows: int
+    removed_rows: int
+
+    @classmethod
+    def load(cls, path: Path) -> Delta:
+        data = json.loads((path / DELTA_FILE_NAME).read_text())
+        return cls(
+            path=path,
+            from_version=datetime.fromisoformat(data["from_version"]),
+            to_version=datetime.fromisoformat(data["to_version"]),
+            teams=data["teams"],
+            players=data["players"],
+            added_rows=data["added_rows"],
+            removed_rows=data["removed_rows"],
+        )
+
+    def save(self) -> None:
+        data = {
+            "from_version": self.from_version.isoformat(),
+            "to_version": self.to_version.isoformat(),
+            "teams": self.teams,
+            "players": self.players,
+            "added_rows": self.added_rows,
+            "removed_rows": self.removed_rows,
+        }
+        (self.path / DELTA_FILE_NAME).write_text(json.dumps(data, indent=2))
+
+
+def compute_delta(
+    old_feed_path: Path,
+    new_feed_path: Path,
+    *,
+    from_version: datetime,
+    to_version: datetime,
+    deltas_path: Path,
+) -> Delta:
+    """
+    Compare two feeds row by row and write rows of changed teams
+    from the new feed to `deltas_path/<to_version>`.
+    """
+    conn = duckdb.connect(":memory:")
+    old_rel = read_feed(conn, feed_files(old_feed_path))  # noqa: F841
+    new_rel = read_feed(conn, feed_files(new_feed_path))  # noqa: F841
+    conn.execute("CREATE TABLE old_rosters AS SELECT * FROM old_rel")
+    conn.execute("CREATE TABLE new_rosters AS SELECT * FROM new_rel")
+    conn.execute(
+        """
+        CREATE TABLE changes AS
+        SELECT team_unique_name, player_unique_id, 'added' AS change
+        FROM (SELECT * FROM new_rosters EXCEPT ALL SELECT * FROM old_rosters)
+        UNION ALL
+        SELECT team_unique_name, player_unique_id, 'removed' AS change
+        FROM (SELECT * FROM old_rosters EXCEPT ALL SELECT * FROM new_rosters)
+        """
+    )
+    row = conn.execute(
+        """
+        SELECT
+            COUNT(*) FILTER (WHERE change = 'added'),
+            COUNT(*) FILTER (WHERE change = 'removed'),
+            COALESCE(LIST(DISTINCT team_unique_name ORDER BY team_unique_name), []),
+            COALESCE(LIST(DISTINCT player_unique_id ORDER BY player_unique_id), [])
+        FROM changes
+        """
+    ).fetchone()
+    assert row is not None
+    added_rows, removed_rows, teams, players = row
+
+    delta_path = deltas_path / data_version_name(to_version)
+    shutil.rmtree(delta_path, ignore_errors=True)
+    delta_path.mkdir(parents=True)
+    manifest = Manifest()
+    if teams:
+        shard_path = delta_path / SHARD_FILE_NAME_TEMPLATE.format(index=0)
+        rows_count = conn.execute(
+            f"""
+            COPY (
+                SELECT *
+                FROM new_rosters
+                WHERE team_unique_name IN (SELECT team_unique_name FROM changes)
+            ) TO '{_escape(shard_path)}' (FORMAT JSON, COMPRESSION ZSTD)
+            """  # noqa: S608
+        ).fetchone()
+        manifest.shards.append(
+            Shard(
+                file_name=shard_path.name,
+                rows=rows_count[0] if rows_count else 0,
+                size=shard_path.stat().st_size,
+                sha256=file_sha256(shard_path),
+            )
+        )
+    manifest.save(delta_path)
+
+    delta = Delta(
+        path=delta_path,
+        from_version=from_version,
+        to_version=to_version,
+        teams=teams,
+        players=[player for player in players if player],
+        added_rows=added_rows,
+        removed_rows=removed_rows,
+    )
+    delta.save()
+    return delta
+
+
+def find_delta_chain(
+    deltas_path: Path | None, from_version: datetime, to_version: datetime
+) -> list[Delta] | None:
+    """
+    Find deltas that lead from `from_version` to `to_version`.
+    Return None if there is no such chain.
+    """
+    if deltas_path is None or not deltas_path.exists():
+        return None
+    deltas_by_from_version = {}
+    for path in deltas_path.iterdir():
+        if not (path / DELTA_FILE_NAME).exists():
+            continue
+        try:
+            delta = Delta.load(path)
+        except (ValueError, KeyError):
+            logger.exception("Can't load delta from %s", path)
+            continue
+        deltas_by_from_version[delta.from_version] = delta
+
+    chain = []
+    version = from_version
+    while version < to_version:
+        next_delta = deltas_by_from_version.get(version)
+        if next_delta is None or next_delta.to_version <= version:
+            return None
+        chain.append(next_delta)
+        version = next_delta.to_version
+    if version != to_version:
+        return None
+    return chain
+
+
+def prune_deltas(deltas_path: Path, *, keep: int) -> None:
+    if not deltas_path.exists():
+        return
+    paths = sorted(path for path in deltas_path.iterdir() if path.is_dir())
+    for path in paths[:-keep] if keep else paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _escape(path: Path) -> str:
+    return str(path).replace("'", "''")
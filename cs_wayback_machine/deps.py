@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from picodi import Provide, SingletonScope, dependency, inject
 
+from cs_wayback_machine.export import DatasetExporter
+from cs_wayback_machine.monitoring import QueryMonitor, memory_collector
 from cs_wayback_machine.settings import Settings
 from cs_wayback_machine.statistics import StatisticsCalculator
 from cs_wayback_machine.storage import (
@@ -22,8 +24,8 @@ def get_settings() -> Settings:
 
 
 @inject
-def get_parser_result_file_path(settings: Settings = Provide(get_settings)) -> Path:
-    return settings.parser_result_file_path
+def get_parser_result_path(settings: Settings = Provide(get_settings)) -> Path:
+    return settings.parser_result_path
 
 
 @inject
@@ -33,25 +35,71 @@ def get_parser_result_updated_date_file_path(
     return settings.parser_result_updated_date_file_path
 
 
+@inject
+def get_parser_result_deltas_path(
+    settings: Settings = Provide(get_settings),
+) -> Path:
+    return settings.parser_result_deltas_path
+
+
 @inject
 def get_parser_results_storage(
-    parser_result_file: Path = Provide(get_parser_result_file_path),
+    parser_result_path: Path = Provide(get_parser_result_path),
     parser_result_updated_date_file_path: Path = Provide(
         get_parser_result_updated_date_file_path
     ),
+    parser_result_deltas_path: Path = Provide(get_parser_result_deltas_path),
 ) -> ParserResultsStorage:
     return ParserResultsStorage(
-        parsed_rosters=parser_result_file,
+        parsed_rosters=parser_result_path,
         updated_file=parser_result_updated_date_file_path,
+        deltas_path=parser_result_deltas_path,
+    )
+
+
+@inject
+def get_query_monitor(settings: Settings = Provide(get_settings)) -> QueryMonitor:
+    threshold = settings.slow_query_threshold_ms
+    return QueryMonitor(
+        slow_query_threshold=threshold / 1000 if threshold is not None else None,
+        slow_query_sample_rate=settings.slow_query_sample_rate,
     )
 
 
+@inject
+def get_duckdb_config(
+    settings: Settings = Provide(get_settings),
+) -> dict[str, Any]:
+    config: dict[str, Any] = {}
+    if settings.duckdb_memory_limit is not None:
+        config["memory_limit"] = settings.duckdb_memory_limit
+    if settings.duckdb_threads is not None:
+        config["threads"] = settings.duckdb_threads
+    return config
+
+
+@inject
+def get_shared_database_path(
+    settings: Settings = Provide(get_settings),
+) -> Path | None:
+    return settings.shared_database_path if settings.shared_database else None
+
+
 @dependency(scope_class=SingletonScope, use_init_hook=True)
 @inject
 def get_duckdb_connection_manager(
     parser_results_storage: ParserResultsStorage = Provide(get_parser_results_storage),
+    query_monitor: QueryMonitor = Provide(get_query_monitor),
+    duckdb_config: dict[str, Any] = Provide(get_duckdb_config),
+    shared_database_path: Path | None = Provide(get_shared_database_path),
 ) -> DuckDbConnectionManager:
-    manager = DuckDbConnectionManager(parser_results_storage)
+    manager = DuckDbConnectionManager(
+        parser_results_storage,
+        query_monitor,
+        duckdb_config,
+        shared_database_path=shared_database_path,
+    )
+    memory_collector.track_duckdb(manager.current_cursor)
     # load data
     manager.conn
     return manager
@@ -73,3 +121,12 @@ def get_statistics_calculator(
     ),
 ) -> StatisticsCalculator:
     return StatisticsCalculator(duckdb_conn_manager)
+
+
+@inject
+def get_dataset_exporter(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+) -> DatasetExporter:
+    return DatasetExporter(duckdb_conn_manager)
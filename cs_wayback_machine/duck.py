@@ -1,29 +1,66 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Protocol
+import contextlib
+import fcntl
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Protocol
 
 import duckdb
 
+from cs_wayback_machine.date_util import data_version_name
+from cs_wayback_machine.feed import feed_files
+
 if TYPE_CHECKING:
-    from datetime import date
+    from collections.abc import Iterator
+    from datetime import datetime
     from pathlib import Path
 
+    from cs_wayback_machine.delta import Delta
+
+logger = logging.getLogger(__name__)
+
+
+FEED_COLUMNS = {
+    "team_unique_name": "TEXT",
+    "team_name": "TEXT",
+    "team_url": "TEXT",
+    "player_unique_id": "TEXT",
+    "game_version": "TEXT",
+    "player_id": "TEXT",
+    "full_name": "TEXT",
+    "player_url": "TEXT",
+    "is_captain": "BOOLEAN",
+    "position": "TEXT",
+    "flag_name": "TEXT",
+    "join_date": "DATE",
+    "inactive_date": "DATE",
+    "leave_date": "DATE",
+    "join_date_raw": "TEXT",
+    "inactive_date_raw": "TEXT",
+    "leave_date_raw": "TEXT",
+    "has_invalid_dates": "BOOLEAN",
+}
+
 
 class ParserResultsStorage(Protocol):
     parsed_rosters: Path
 
-    def version(self) -> date | None:
+    def version(self) -> datetime | None:
         pass
 
 
 def create_new_connection_from_parser_results(
     parsed_rosters_storage: ParserResultsStorage,
+    config: dict[str, Any] | None = None,
+    database: str = ":memory:",
 ) -> duckdb.DuckDBPyConnection:
-    conn = duckdb.connect(":memory:")
+    """`config` is passed to DuckDB as is, e.g. `memory_limit` and `threads`"""
+    conn = duckdb.connect(database, config=config or {})
     conn.execute(
         """
         CREATE TABLE meta (
-            rosters_updated_date DATE,
+            rosters_version TIMESTAMP,
         )
     """
     )
@@ -60,14 +97,124 @@ def create_new_connection_from_parser_results(
     """
     )
 
-    rosters_rel = conn.read_json(  # noqa: F841
-        str(parsed_rosters_storage.parsed_rosters)
+    _insert_feed(conn, feed_files(parsed_rosters_storage.parsed_rosters))
+    if version := parsed_rosters_storage.version():
+        conn.execute(
+            """
+            INSERT INTO meta (rosters_version)
+            VALUES ($version)
+            """,
+            parameters={"version": version},
+        )
+
+    return conn
+
+
+def open_shared_database(
+    parsed_rosters_storage: ParserResultsStorage,
+    directory: Path,
+    config: dict[str, Any] | None = None,
+) -> duckdb.DuckDBPyConnection:
+    """
+    Open read-only database file with the current version of parser results.
+    The file is built by the first process that needs it, other processes wait
+    for it and open the same file, so the data is loaded only once.
+    """
+    version = parsed_rosters_storage.version()
+    name = data_version_name(version) if version else "unversioned"
+    path = directory / f"rosters-{name}.duckdb"
+    if not path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        with _exclusive_lock(directory / ".lock"):
+            if not path.exists():
+                _build_database_file(parsed_rosters_storage, path, config)
+    return duckdb.connect(str(path), read_only=True, config=config or {})
+
+
+def _build_database_file(
+    parsed_rosters_storage: ParserResultsStorage,
+    path: Path,
+    config: dict[str, Any] | None,
+) -> None:
+    logger.info("Building shared database %s", path)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = create_new_connection_from_parser_results(
+        parsed_rosters_storage, config, database=str(tmp_path)
     )
+    conn.close()
+    os.replace(tmp_path, path)
+    # processes that still use old files keep them open until they switch
+    for old_path in path.parent.glob("rosters-*.duckdb"):
+        if old_path != path:
+            old_path.unlink()
+
+
+@contextlib.contextmanager
+def _exclusive_lock(path: Path) -> Iterator[None]:
+    with open(path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def apply_delta(conn: duckdb.DuckDBPyConnection, delta: Delta) -> None:
+    """
+    Replace rosters of teams affected by `delta` in place.
+    Other cursors keep seeing the previous data until the transaction commits.
+    """
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(
+            "DELETE FROM rosters WHERE team_id IN (SELECT unnest($teams))",
+            parameters={"teams": delta.teams},
+        )
+        if files := feed_files(delta.path):
+            _insert_feed(conn, files)
+        conn.execute(
+            "UPDATE meta SET rosters_version = $version",
+            parameters={"version": delta.to_version},
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    # DuckDB doesn't allow deleting referenced keys in the same transaction,
+    #   so teams that disappeared from the feed are deleted after the commit
+    conn.execute(
+        """
+        DELETE FROM teams
+        WHERE unique_name IN (SELECT unnest($teams))
+            AND unique_name NOT IN (SELECT team_id FROM rosters)
+        """,
+        parameters={"teams": delta.teams},
+    )
+
+
+def read_feed(
+    conn: duckdb.DuckDBPyConnection, files: list[Path]
+) -> duckdb.DuckDBPyRelation:
+    # shards are read in parallel by DuckDB
+    return conn.sql(
+        """
+        SELECT *
+        FROM read_json($files, format = 'newline_delimited', columns = $columns)
+        """,
+        params={"files": [str(path) for path in files], "columns": FEED_COLUMNS},
+    )
+
+
+def _insert_feed(conn: duckdb.DuckDBPyConnection, files: list[Path]) -> None:
+    rosters_rel = read_feed(conn, files)  # noqa: F841
     conn.execute(
         """
     INSERT INTO teams (unique_name, name, liquipedia_url)
     SELECT DISTINCT ON (team_unique_name) team_unique_name, team_name, team_url
     FROM rosters_rel
+    ON CONFLICT (unique_name) DO UPDATE
+        SET name = EXCLUDED.name, liquipedia_url = EXCLUDED.liquipedia_url
     """
     )
     conn.execute(
@@ -85,13 +232,3 @@ def create_new_connection_from_parser_results(
     FROM rosters_rel
     """
     )
-    if version := parsed_rosters_storage.version():
-        conn.execute(
-            """
-            INSERT INTO meta (rosters_updated_date)
-            VALUES ($updated_date)
-            """,
-            parameters={"updated_date": version},
-        )
-
-    return conn
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from cs_wayback_machine.storage import ROSTER_PERIODS_QUERY, TEAMMATE_OVERLAPS_QUERY
+
+if TYPE_CHECKING:
+    from cs_wayback_machine.storage import DuckDbConnectionManager
+
+# rows with invalid dates are skipped in derived tables
+EXPORT_QUERIES = {
+    "teams": "SELECT * FROM teams ORDER BY unique_name",
+    "rosters": "SELECT * FROM rosters ORDER BY team_id, join_date, player_id",
+    "roster_periods": ROSTER_PERIODS_QUERY,
+    "teammate_overlaps": (
+        f"SELECT * FROM ({TEAMMATE_OVERLAPS_QUERY}) ORDER BY ALL"  # noqa: S608
+    ),
+}
+
+
+class DatasetExporter:
+    """
+    Exports tables and derived tables as Parquet files written by DuckDB,
+    rows don't pass through Python.
+    """
+
+    def __init__(self, manager: DuckDbConnectionManager) -> None:
+        self._manager = manager
+
+    def write(self, table: str, path: Path) -> int:
+        """Write the table to `path`, return number of rows"""
+        escaped_path = str(path).replace("'", "''")
+        query = f"""
+        COPY ({EXPORT_QUERIES[table]})
+        TO '{escaped_path}' (FORMAT PARQUET, COMPRESSION ZSTD);
+        """
+        rows = self._manager.fetchall(f"export_{table}", query)
+        return rows[0][0] if rows else 0
+
+
+class ExportFileCache:
+    """
+    Parquet files of tables, every table is written once per data generation
+    to a temp directory of the process. Files of the previous generation
+    are kept, they may still be sent.
+    """
+
+    def __init__(
+        self, exporter: DatasetExporter, manager: DuckDbConnectionManager
+    ) -> None:
+        self._exporter = exporter
+        self._manager = manager
+        self._directory = tempfile.TemporaryDirectory(prefix="cswm-export-")
+        self._lock = threading.Lock()
+
+    def get(self, table: str) -> Path:
+        self._manager.refresh()
+        generation = self._manager.generation
+        directory = Path(self._directory.name)
+        path = directory / f"{table}-{generation}.parquet"
+        if path.exists():
+            return path
+        with self._lock:
+            if not path.exists():
+                tmp_path = path.with_suffix(".tmp")
+                self._exporter.write(table, tmp_path)
+                os.replace(tmp_path, path)
+                for old_path in directory.glob(f"{table}-*.parquet"):
+                    if int(old_path.stem.rpartition("-")[2]) < generation - 1:
+                        old_path.unlink()
+        return path
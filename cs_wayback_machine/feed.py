@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+import zstandard
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+MANIFEST_FILE_NAME = "manifest.json"
+SHARD_FILE_NAME_TEMPLATE = "rosters-{index:05d}.jsonl.zst"
+DEFAULT_MAX_SHARD_SIZE = 64 * 1024 * 1024
+
+
+@dataclass
+class Shard:
+    file_name: str
+    rows: int
+    size: int
+    sha256: str
+
+
+@dataclass
+class ShardPosition:
+    """End of the last complete zstd frame of the shard being written"""
+
+    file_name: str
+    rows: int
+    size: int
+    uncompressed_size: int
+
+
+@dataclass
+class Manifest:
+    shards: list[Shard] = field(default_factory=list)
+
+    @property
+    def total_rows(self) -> int:
+        return sum(shard.rows for shard in self.shards)
+
+    @classmethod
+    def load(cls, directory: Path) -> Manifest | None:
+        manifest_path = directory / MANIFEST_FILE_NAME
+        if not manifest_path.exists():
+            return None
+        data = json.loads(manifest_path.read_text())
+        return cls(shards=[Shard(**shard) for shard in data["shards"]])
+
+    def save(self, directory: Path) -> None:
+        manifest_path = directory / MANIFEST_FILE_NAME
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(asdict(self), indent=2))
+        os.replace(tmp_path, manifest_path)
+
+
+class ShardedFeedWriter:
+    """
+    Writes items as zstd-compressed jsonlines shards.
+    A new shard is started when the uncompressed size of the current one
+    reaches `max_shard_size`. The manifest is written on close.
+    With `resume=True` shards listed in an existing manifest are kept
+    and new items are written to the following shards, or appended to
+    `resume_shard` if it's given (see `checkpoint`).
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+        compression_level: int = 10,
+        resume: bool = False,
+        resume_shard: ShardPosition | None = None,
+    ) -> None:
+        self._directory = directory
+        self._max_shard_size = max_shard_size
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._manifest = (resume and Manifest.load(directory)) or Manifest()
+        self._shard_path: Path | None = None
+        self._file: BinaryIO | None = None
+        self._writer: zstandard.ZstdCompressionWriter | None = None
+        self._rows = 0
+        self._bytes_written = 0
+        if resume and resume_shard is not None:
+            self._open_shard(resume_shard)
+
+    def write(self, item: dict[str, Any]) -> None:
+        if self._writer is None:
+            self._open_shard()
+        assert self._writer is not None
+        line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+        self._writer.write(line)
+        self._rows += 1
+        self._bytes_written += len(line)
+        if self._bytes_written >= self._max_shard_size:
+            self._close_shard()
+
+    def checkpoint(self) -> tuple[Manifest, ShardPosition | None]:
+        """
+        Make written items durable without closing the current shard:
+        the zstd frame is ended and the file is synced. Items written after
+        the returned position are dropped when the writer is resumed from it.
+        """
+        if self._writer is None:
+            return self._manifest, None
+        assert self._file is not None
+        assert self._shard_path is not None
+        self._writer.flush(zstandard.FLUSH_FRAME)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        position = ShardPosition(
+            file_name=self._shard_path.name,
+            rows=self._rows,
+            size=self._file.tell(),
+            uncompressed_size=self._bytes_written,
+        )
+        return self._manifest, position
+
+    def close(self) -> Manifest:
+        if self._writer is not None:
+            self._close_shard()
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._manifest.save(self._directory)
+        return self._manifest
+
+    def _open_shard(self, position: ShardPosition | None = None) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        if position is None:
+            file_name = SHARD_FILE_NAME_TEMPLATE.format(
+                index=len(self._manifest.shards)
+            )
+            self._shard_path = self._directory / file_name
+            self._file = open(self._shard_path, "wb")  # noqa: SIM115
+            self._rows = 0
+            self._bytes_written = 0
+        else:
+            self._shard_path = self._directory / position.file_name
+            # frames written after the checkpoint are incomplete
+            self._file = open(self._shard_path, "r+b")  # noqa: SIM115
+            self._file.truncate(position.size)
+            self._file.seek(position.size)
+            self._rows = position.rows
+            self._bytes_written = position.uncompressed_size
+        self._writer = self._compressor.stream_writer(self._file, closefd=False)
+
+    def _close_shard(self) -> None:
+        assert self._file is not None
+        assert self._writer is not None
+        assert self._shard_path is not None
+        self._writer.close()  # type: ignore[no-untyped-call]
+        self._file.close()
+        shard_path = self._shard_path
+        self._manifest.shards.append(
+            Shard(
+                file_name=shard_path.name,
+                rows=self._rows,
+                size=shard_path.stat().st_size,
+                sha256=file_sha256(shard_path),
+            )
+        )
+        self._file = None
+        self._writer = None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feed_files(path: Path) -> list[Path]:
+    """
+    Return files to load for the feed at `path`.
+    `path` can be a directory with shards and manifest or a single jsonlines file.
+    """
+    if not path.is_dir():
+        return [path]
+    manifest = Manifest.load(path)
+    if manifest is None:
+        return []
+    return [path / shard.file_name for shard in manifest.shards]
+
+
+def verify_feed(directory: Path) -> list[str]:
+    manifest = Manifest.load(directory)
+    if manifest is None:
+        return [f"Manifest not found in {directory}"]
+    errors = []
+    for shard in manifest.shards:
+        shard_path = directory / shard.file_name
+        if not shard_path.exists():
+            errors.append(f"Shard {shard.file_name} is missing")
+        elif file_sha256(shard_path) != shard.sha256:
+            errors.append(f"Shard {shard.file_name} checksum mismatch")
+    return errors
+
+
+def iter_feed(path: Path) -> Iterator[dict[str, Any]]:
+    for file_path in feed_files(path):
+        with open(file_path, "rb") as f:
+            stream: BinaryIO = f
+            if file_path.suffix == ".zst":
+                # shards resumed from a checkpoint have several frames
+                stream = zstandard.ZstdDecompressor().stream_reader(
+                    f, read_across_frames=True
+                )
+            for line in io.TextIOWrapper(stream, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def merge_feeds(
+    base_path: Path,
+    update_path: Path,
+    *,
+    replaced_teams: set[str],
+    target_dir: Path,
+    max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+) -> Manifest:
+    """
+    Write a feed with rows from `update_path` and rows from `base_path`
+    for teams that are not in `replaced_teams`.
+    """
+    writer = ShardedFeedWriter(target_dir, max_shard_size=max_shard_size)
+    for item in iter_feed(base_path):
+        if item.get("team_unique_name") not in replaced_teams:
+            writer.write(item)
+    for item in iter_feed(update_path):
+        writer.write(item)
+    return writer.close()
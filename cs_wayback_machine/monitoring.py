@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import random
+from typing import TYPE_CHECKING, Any
+
+import duckdb
+from prometheus_client import REGISTRY, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from prometheus_client.metrics_core import Metric
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("cs_wayback_machine.slow_queries")
+
+QUERY_DURATION = Histogram(
+    "cswm_query_duration_seconds",
+    "Duration of database queries",
+    ["query"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+QUERY_ROWS = Histogram(
+    "cswm_query_rows",
+    "Number of rows returned by database queries",
+    ["query"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+DUCKDB_GENERATION = Gauge(
+    "cswm_duckdb_generation",
+    "Generation of the loaded data, increased on every reload or applied delta",
+)
+DATA_SWAP_RSS = Gauge(
+    "cswm_data_swap_rss_bytes",
+    "Resident memory of the process before and after the last data swap",
+    ["kind", "phase"],
+)
+
+
+class QueryMonitor:
+    """
+    Reports duration and number of rows of every query to Prometheus.
+    Queries slower than `slow_query_threshold` (seconds) are logged with
+    `EXPLAIN ANALYZE` output, `slow_query_sample_rate` of them to keep
+    the cost of re-running them low.
+    """
+
+    def __init__(
+        self,
+        *,
+        slow_query_threshold: float | None = None,
+        slow_query_sample_rate: float = 1.0,
+    ) -> None:
+        self._slow_query_threshold = slow_query_threshold
+        self._slow_query_sample_rate = slow_query_sample_rate
+
+    def observe(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        *,
+        name: str,
+        query: str,
+        parameters: dict[str, Any] | None,
+        duration: float,
+        rows: int,
+        generation: int,
+    ) -> None:
+        QUERY_DURATION.labels(query=name).observe(duration)
+        QUERY_ROWS.labels(query=name).observe(rows)
+        if (
+            self._slow_query_threshold is not None
+            and duration >= self._slow_query_threshold
+            and random.random() < self._slow_query_sample_rate  # noqa: S311,DUO102
+        ):
+            self._log_slow_query(
+                conn,
+                name=name,
+                query=query,
+                parameters=parameters,
+                duration=duration,
+                rows=rows,
+                generation=generation,
+            )
+
+    def _log_slow_query(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        *,
+        name: str,
+        query: str,
+        parameters: dict[str, Any] | None,
+        duration: float,
+        rows: int,
+        generation: int,
+    ) -> None:
+        try:
+            plan_rows = conn.execute(
+                f"EXPLAIN ANALYZE {query}", parameters=parameters
+            ).fetchall()
+            plan = "\n".join(str(row[-1]) for row in plan_rows)
+        except duckdb.Error:
+            slow_query_logger.exception("Can't get plan of the slow query %s", name)
+            plan = "<not available>"
+        slow_query_logger.warning(
+            "Slow query %s: %.1fms, %s rows, generation %s, parameters %s\n%s",
+            name,
+            duration * 1000,
+            rows,
+            generation,
+            parameters,
+            plan,
+        )
+
+
+def current_rss() -> int | None:
+    """Resident set size of the process in bytes, None if it can't be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+@contextlib.contextmanager
+def sample_rss(kind: str) -> Iterator[None]:
+    """Report RSS before and after the data swap of `kind` made in the block"""
+    before = current_rss()
+    yield
+    after = current_rss()
+    if before is None or after is None:
+        return
+    DATA_SWAP_RSS.labels(kind=kind, phase="before").set(before)
+    DATA_SWAP_RSS.labels(kind=kind, phase="after").set(after)
+    logger.info(
+        "RSS %.1fMiB -> %.1fMiB after data %s", before / 2**20, after / 2**20, kind
+    )
+
+
+class MemoryCollector:
+    """
+    Collects memory used by DuckDB and sizes of in-process caches on scrape.
+    RSS of the process is reported by the default `process_*` metrics.
+    """
+
+    def __init__(self) -> None:
+        self._get_duckdb_cursor: Callable[[], duckdb.DuckDBPyConnection | None] = (
+            lambda: None
+        )
+        self._caches: dict[str, Callable[[], int]] = {}
+
+    def track_duckdb(
+        self, get_cursor: Callable[[], duckdb.DuckDBPyConnection | None]
+    ) -> None:
+        """`get_cursor` returns a new cursor or None if data is not loaded"""
+        self._get_duckdb_cursor = get_cursor
+
+    def track_cache(self, name: str, get_size: Callable[[], int]) -> None:
+        self._caches[name] = get_size
+
+    def collect(self) -> Iterator[Metric]:
+        memory = GaugeMetricFamily(
+            "cswm_duckdb_memory_bytes",
+            "Memory used by DuckDB buffer manager",
+            labels=["tag"],
+        )
+        temporary_storage = GaugeMetricFamily(
+            "cswm_duckdb_temporary_storage_bytes",
+            "Temporary storage used by DuckDB",
+            labels=["tag"],
+        )
+        cache_entries = GaugeMetricFamily(
+            "cswm_cache_entries",
+            "Number of entries in in-process caches",
+            labels=["cache"],
+        )
+
+        cursor = self._get_duckdb_cursor()
+        if cursor is not None:
+            try:
+                for tag, memory_bytes, temporary_bytes in cursor.execute(
+                    """
+                    SELECT tag, memory_usage_bytes, temporary_storage_bytes
+                    FROM duckdb_memory();
+                    """
+                ).fetchall():
+                    memory.add_metric([tag], memory_bytes)
+                    temporary_storage.add_metric([tag], temporary_bytes)
+            except duckdb.Error:
+                # connection can be closed by concurrent data reload
+                logger.warning("Can't collect DuckDB memory usage", exc_info=True)
+            finally:
+                cursor.close()
+        for name, get_size in self._caches.items():
+            cache_entries.add_metric([name], get_size())
+
+        yield from [memory, temporary_storage, cache_entries]
+
+
+memory_collector = MemoryCollector()
+REGISTRY.register(memory_collector)
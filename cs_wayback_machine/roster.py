@@ -6,6 +6,7 @@ from typing import TYPE_CHECKING
 
 from cs_wayback_machine.date_util import DateRange
 from cs_wayback_machine.entities import Roster, RosterPlayer
+from cs_wayback_machine.spans import timed
 
 if TYPE_CHECKING:
     from datetime import date
@@ -18,6 +19,7 @@ class Event:
     player: RosterPlayer
 
 
+@timed("create_rosters")
 def create_rosters(players: list[RosterPlayer]) -> list[Roster]:  # noqa: C901
     # Collect events
     events_by_date: dict[date, list[Event]] = {}
@@ -1,36 +1,143 @@
 from __future__ import annotations
 
+import json
+import os
 import re
+from dataclasses import asdict, dataclass
 from datetime import date
+from pathlib import Path
 from typing import TYPE_CHECKING, Any
 from urllib.parse import parse_qs, unquote, urlparse
 
 import scrapy
 from scrapy.crawler import CrawlerProcess
+from scrapy.spidermiddlewares.httperror import HttpError
+
+from cs_wayback_machine.feed import (
+    DEFAULT_MAX_SHARD_SIZE,
+    Manifest,
+    Shard,
+    ShardedFeedWriter,
+    ShardPosition,
+)
 
 if TYPE_CHECKING:
-    from collections.abc import Generator
-    from pathlib import Path
+    from collections.abc import Callable, Generator, Iterable
 
+    from scrapy.crawler import Crawler
     from scrapy.http import Response
+    from twisted.python.failure import Failure
+
+
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+# written items and spider state are saved after this number of crawled teams
+CHECKPOINT_INTERVAL = 50
+
+
+@dataclass(frozen=True)
+class TeamCrawled:
+    """Yielded after all rows of the team, so the pipeline knows they are written"""
+
+    team_unique_name: str
 
 
 class TeamsSpider(scrapy.Spider):
     name = "teamsspider"
     start_urls = ["https://liquipedia.net/counterstrike/index.php?title=Category:Teams"]
 
+    def __init__(
+        self,
+        *args: Any,
+        team_filter: Callable[[str], bool] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        # decides by team unique name whether the team page should be crawled
+        self.team_filter = team_filter
+        # restored from the crawl checkpoint by ShardedFeedPipeline
+        self.state: dict[str, Any] = {}
+        # team pages requested in this run
+        self._requested_teams: set[str] = set()
+
+    @property
+    def crawled_teams(self) -> set[str]:
+        return self.state.setdefault("crawled_teams", set())
+
+    @property
+    def failed_urls(self) -> dict[str, str]:
+        """Urls that failed after all retries, mapped to callback names"""
+        return self.state.setdefault("failed_urls", {})
+
+    def start_requests(self) -> Generator:
+        # retry pages that failed during the previous (interrupted) run
+        failed_urls = dict(self.failed_urls)
+        self.failed_urls.clear()
+        for url, callback in failed_urls.items():
+            if callback == "parse_teams":
+                self._requested_teams.add(self._team_unique_name(url))
+            yield scrapy.Request(
+                url,
+                callback=getattr(self, callback),
+                errback=self.on_request_failure,
+                dont_filter=True,
+            )
+        for url in self.start_urls:
+            yield scrapy.Request(
+                url,
+                callback=self.parse,
+                errback=self.on_request_failure,
+                dont_filter=True,
+            )
+
+    def on_request_failure(self, failure: Failure) -> None:
+        # client errors like 404 won't be fixed by retrying
+        if isinstance(failure.value, HttpError):
+            status = failure.value.response.status
+            if status not in self.settings.getlist("RETRY_HTTP_CODES"):
+                return
+        request = failure.request  # type: ignore[attr-defined]
+        callback = getattr(request.callback, "__name__", "parse")
+        self.failed_urls[request.url] = callback
+
     def parse(self, response: Response, **kwargs: Any) -> Generator:
         teams = response.css("#mw-pages .mw-content-ltr a::attr(href)").getall()
         for team in teams:
             if "User:" in team:
                 continue
-            yield response.follow(team, callback=self.parse_teams)
+            team_name = self._team_unique_name(response.urljoin(team))
+            # teams crawled before the interruption are skipped
+            if team_name in self.crawled_teams or team_name in self._requested_teams:
+                continue
+            if self.team_filter is not None and not self.team_filter(team_name):
+                continue
+            self._requested_teams.add(team_name)
+            yield response.follow(
+                team, callback=self.parse_teams, errback=self.on_request_failure
+            )
 
         next_page = response.css('#mw-pages a:contains("next page")::attr(href)').get()
         if next_page is not None:
-            yield response.follow(next_page, callback=self.parse)
-
-    def parse_teams(self, response: Response) -> Generator:  # noqa: C901
+            # list of teams is walked again when the crawl is resumed
+            yield response.follow(
+                next_page,
+                callback=self.parse,
+                errback=self.on_request_failure,
+                dont_filter=True,
+            )
+
+    def parse_teams(self, response: Response) -> Generator:
+        team = self._team_unique_name(response.url)
+        try:
+            # rows of a team are written only if the whole page is parsed
+            rows = list(self._parse_team_rows(response))
+        except Exception:
+            self.failed_urls[response.url] = "parse_teams"
+            raise
+        yield from rows
+        self.crawled_teams.add(team)
+        yield TeamCrawled(team)
+
+    def _parse_team_rows(self, response: Response) -> Generator:  # noqa: C901
         team_name = response.css("#firstHeading span::text").get()
         roster_section = response.css("#Player_Roster").xpath(
             "../following-sibling::*[self::div or self::h2]"
@@ -69,12 +176,11 @@ class TeamsSpider(scrapy.Spider):
                 )
                 if player_url is not None:
                     player_url = response.urljoin(player_url)
-                team_slug = self._extract_name_from_url(response.url)
                 player_id = self._extract_text(row.css("td.ID a::text"))
                 player_slug = self._extract_name_from_url(player_url) or ""
                 extracted_dates = self._extract_dates(row)
                 yield {
-                    "team_unique_name": self._clean_text(team_slug or ""),
+                    "team_unique_name": self._team_unique_name(response.url),
                     "team_name": team_name,
                     "team_url": response.url,
                     "player_unique_id": self._clean_text(
@@ -156,6 +262,9 @@ class TeamsSpider(scrapy.Spider):
             return parse_qs(parsed_url.query)["title"][0]
         return url.split("/")[-1].replace("_", " ")
 
+    def _team_unique_name(self, url: str) -> str:
+        return self._clean_text(self._extract_name_from_url(url) or "")
+
     def _clean_text(self, text: str) -> str:
         return unquote(text.strip().replace("_", " "))
 
@@ -164,88 +273,233 @@ class DateParser:
     def __init__(self, date_type: str, date_value: str) -> None:
         self._date_type_raw = date_type
         self._date_value_raw = date_value
-        self._date_type: str | None = None
-        self._date_value: date | None = None
-
-    def parse(self) -> tuple[str | None, date | None, str | None]:
-        self._date_type_raw = self._date_type_raw.strip()
-        self._date_value_raw = self._date_value_raw.strip()
-
-        self._parse_date_type()
-        if not self._date_type:
-            return None, None, None
-        date_fixed = self._parse_date_value()
-
-        date_value_raw = None
-        empty_value = not self._date_value and not self._date_value_raw
-        if ("join" in self._date_type or "leave" in self._date_type) and empty_value:
-            date_value_raw = "unknown"
-        elif not self._date_value or date_fixed:
-            date_value_raw = self._date_value_raw or None
-
-        return self._date_type, self._date_value, date_value_raw
-
-    def _parse_date_type(self) -> None:
-        date_type = self._date_type_raw.lower().replace(" ", "_")
-        parsed = date_type.replace(":", "")
-        if parsed in ["join_date", "leave_date", "inactive_date"]:
-            self._date_type = parsed
-
-    def _parse_date_value(self) -> bool:
-        if self._date_type is None:
-            raise RuntimeError("Date type must be parsed first")
-
-        text = self._date_value_raw[:10].lower()
-        if date := self._parse_date(text):
-            self._date_value = date
-            return False
-
-        fixed_date = self._try_to_fix_date(text, to_start="join" in self._date_type)
-        if fixed_date is None:
-            return False
-        if date := self._parse_date(fixed_date):
-            self._date_value = date
-            return True
-        return False
-
-    def _parse_date(self, value: str) -> date | None:
-        try:
-            return date.fromisoformat(value)
-        except ValueError:
-            return None
 
-    def _try_to_fix_date(self, value: str, *, to_start: bool) -> str | None:
-        year = value[:4]
-        if len(year) < 4:
-            return None
-        try:
-            int(year)
-        except ValueError:
-            return None
+    def parse(self) -> ParsedDate:
+        return _parse_date_cell(self._date_type_raw, self._date_value_raw)
+
+
+DATE_TYPES = frozenset(["join_date", "leave_date", "inactive_date"])
+_ISO_DATE_RE = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})")
+
+ParsedDate = tuple[str | None, date | None, str | None]
+
+
+def parse_dates(cells: Iterable[tuple[str, str]]) -> list[ParsedDate]:
+    """
+    Batch version of `DateParser.parse` for whole columns of
+    `(date_type, date_value)` cells, e.g. for re-parsing stored raw values.
+    Each distinct cell is parsed only once.
+    """
+    parsed: dict[tuple[str, str], ParsedDate] = {}
+    result = []
+    for cell in cells:
+        if (item := parsed.get(cell)) is None:
+            item = parsed[cell] = _parse_date_cell(*cell)
+        result.append(item)
+    return result
+
+
+def _parse_date_cell(date_type_raw: str, date_value_raw: str) -> ParsedDate:
+    date_type = date_type_raw.strip().lower().replace(" ", "_").replace(":", "")
+    if date_type not in DATE_TYPES:
+        return None, None, None
+    value_raw = date_value_raw.strip()
+
+    text = value_raw[:10].lower()
+    fixed = False
+    value = _parse_iso_date(text)
+    if value is None:
+        fixed_text = _fix_date(text, to_start=date_type == "join_date")
+        if fixed_text is not None:
+            value = _parse_iso_date(fixed_text)
+            fixed = value is not None
+
+    if date_type != "inactive_date" and not value and not value_raw:
+        return date_type, value, "unknown"
+    if not value or fixed:
+        return date_type, value, value_raw or None
+    return date_type, value, None
+
+
+def _parse_iso_date(text: str) -> date | None:
+    try:
+        if match := _ISO_DATE_RE.fullmatch(text):
+            return date(*map(int, match.groups()))
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _fix_date(text: str, *, to_start: bool) -> str | None:
+    # "2013-??-??" -> "2013-01-01" or "2013-12-31"
+    if len(text) < 4:
+        return None
+    try:
+        int(text[:4])
+    except ValueError:
+        return None
+    if len(text) > 4 and not text[5].isdigit():
+        text = text[:4]
+    text = "".join(char for char in text if char.isdigit() or char == "-")
+    parts = text.rstrip("-").split("-")
+    parts.extend(["01", "01"] if to_start else ["12", "31"])
+    return "-".join(parts[:3])
+
+
+class ShardedFeedPipeline:
+    """
+    Writes items to the sharded feed. With `checkpoint_dir` written shards and
+    spider state (crawled teams, failed pages) are saved there together every
+    `checkpoint_interval` crawled teams, so a killed crawl is resumed from
+    the last checkpoint; teams crawled after it are crawled again.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_shard_size: int,
+        *,
+        crawler: Crawler | None = None,
+        checkpoint_dir: Path | None = None,
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+    ) -> None:
+        self._directory = directory
+        self._max_shard_size = max_shard_size
+        self._crawler = crawler
+        self._checkpoint_dir = checkpoint_dir
+        self._checkpoint_interval = checkpoint_interval
+        # teams with all rows written, restored from the checkpoint on resume
+        self._written_teams: set[str] = set()
+        self._teams_since_checkpoint = 0
+        self._writer: ShardedFeedWriter | None = None
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> ShardedFeedPipeline:
+        checkpoint_dir = crawler.settings.get("CRAWL_CHECKPOINT_DIR")
+        return cls(
+            directory=Path(crawler.settings["SHARDED_FEED_DIR"]),
+            max_shard_size=crawler.settings.getint(
+                "SHARDED_FEED_MAX_SHARD_SIZE", DEFAULT_MAX_SHARD_SIZE
+            ),
+            crawler=crawler,
+            checkpoint_dir=Path(checkpoint_dir) if checkpoint_dir else None,
+        )
 
-        if len(value) > 4 and not value[5].isdigit():
-            value = value[:4]
-        value = "".join(char for char in value if char.isdigit() or char == "-")
-        value = value.rstrip("-")
+    def open_spider(self, spider: TeamsSpider | None = None) -> None:
+        spider = spider or self._spider
+        checkpoint = self._load_checkpoint()
+        resume_shard = None
+        if checkpoint is not None:
+            manifest, resume_shard, state = checkpoint
+            # items written after the checkpoint are incomplete and are overwritten
+            self._directory.mkdir(parents=True, exist_ok=True)
+            manifest.save(self._directory)
+            self._written_teams = set(state["crawled_teams"])
+            if spider is not None:
+                spider.state.update(state)
+        self._writer = ShardedFeedWriter(
+            self._directory,
+            max_shard_size=self._max_shard_size,
+            resume=checkpoint is not None,
+            resume_shard=resume_shard,
+        )
 
-        parts = value.split("-")
-        if to_start:
-            parts.extend(["01", "01"])
-        else:
-            parts.extend(["12", "31"])
-        return "-".join(parts[:3])
+    def process_item(
+        self, item: dict | TeamCrawled, spider: TeamsSpider | None = None
+    ) -> dict | TeamCrawled:
+        assert self._writer is not None
+        if isinstance(item, TeamCrawled):
+            self._written_teams.add(item.team_unique_name)
+            self._teams_since_checkpoint += 1
+            spider = spider or self._spider
+            if spider is not None and (
+                self._teams_since_checkpoint >= self._checkpoint_interval
+            ):
+                self._save_checkpoint(spider)
+            return item
+        self._writer.write(item)
+        return item
+
+    def close_spider(self, spider: TeamsSpider | None = None) -> None:
+        assert self._writer is not None
+        spider = spider or self._spider
+        if spider is not None:
+            self._save_checkpoint(spider)
+        self._writer.close()
+
+    @property
+    def _spider(self) -> TeamsSpider | None:
+        if self._crawler is None:
+            return None
+        assert isinstance(self._crawler.spider, TeamsSpider)
+        return self._crawler.spider
 
+    def _load_checkpoint(
+        self,
+    ) -> tuple[Manifest, ShardPosition | None, dict[str, Any]] | None:
+        if self._checkpoint_dir is None:
+            return None
+        path = self._checkpoint_dir / CHECKPOINT_FILE_NAME
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text())
+        manifest = Manifest(shards=[Shard(**shard) for shard in data["shards"]])
+        open_shard = data["open_shard"] and ShardPosition(**data["open_shard"])
+        state = {
+            "crawled_teams": set(data["crawled_teams"]),
+            "failed_urls": data["failed_urls"],
+        }
+        return manifest, open_shard, state
 
-def create_crawler_process(*, result_path: str | Path, email: str) -> CrawlerProcess:
+    def _save_checkpoint(self, spider: TeamsSpider) -> None:
+        assert self._writer is not None
+        self._teams_since_checkpoint = 0
+        if self._checkpoint_dir is None:
+            return
+        # the current shard is kept open, so shards still reach their full size
+        manifest, open_shard = self._writer.checkpoint()
+        data = {
+            "shards": [asdict(shard) for shard in manifest.shards],
+            "open_shard": asdict(open_shard) if open_shard else None,
+            "crawled_teams": sorted(self._written_teams),
+            "failed_urls": spider.state.get("failed_urls", {}),
+        }
+        # shards and state are saved in one file, so they always match
+        self._checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        path = self._checkpoint_dir / CHECKPOINT_FILE_NAME
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, path)
+
+
+def create_crawler_process(
+    *,
+    result_dir: str | Path,
+    email: str,
+    job_dir: str | Path | None = None,
+    max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+) -> CrawlerProcess:
+    """
+    If `job_dir` is set, checkpoints of written items and spider state
+    are saved there as the crawl goes, so an interrupted crawl can be resumed.
+    """
     return CrawlerProcess(
         settings={
-            "FEEDS": {
-                str(result_path): {"format": "jsonlines"},
+            "CRAWL_CHECKPOINT_DIR": str(job_dir) if job_dir else None,
+            "ITEM_PIPELINES": {
+                f"{__name__}.ShardedFeedPipeline": 300,
             },
+            "SHARDED_FEED_DIR": str(result_dir),
+            "SHARDED_FEED_MAX_SHARD_SIZE": max_shard_size,
             "BOT_NAME": "teamsscrapper",
             "USER_AGENT": f"cs-wayback-machine/1.0.0 ({email})",
             "ROBOTSTXT_OBEY": False,
-            "CLOSESPIDER_ERRORCOUNT": 1,
+            # failed requests are retried, pages that failed after all retries
+            #   are recorded in spider state and retried on the next run
+            "RETRY_ENABLED": True,
+            "RETRY_TIMES": 5,
+            "RETRY_HTTP_CODES": [429, 500, 502, 503, 504, 522, 524, 408],
+            "CLOSESPIDER_ERRORCOUNT": 50,
             "AUTOTHROTTLE_ENABLED": True,
             "AUTOTHROTTLE_START_DELAY": 2,
             "AUTOTHROTTLE_MAX_DELAY": 10,
@@ -253,6 +507,5 @@ def create_crawler_process(*, result_path: str | Path, email: str) -> CrawlerPro
             "CONCURRENT_REQUESTS_PER_DOMAIN": 1,
             "REQUEST_FINGERPRINTER_IMPLEMENTATION": "2.7",
             "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
-            "FEED_EXPORT_ENCODING": "utf-8",
         }
     )
@@ -21,10 +21,48 @@ class Settings:
     email_for_scrapper_useragent: str
     parser_results_path: Path
     sentry_dsn: str | None
+    # queries slower than this are logged with EXPLAIN ANALYZE output
+    slow_query_threshold_ms: float | None = None
+    slow_query_sample_rate: float = 1.0
+    # collect request phase timings (Server-Timing header and span histograms)
+    server_timing: bool = False
+    # enables admin endpoints (e.g. profiling), passed as Bearer token
+    admin_token: str | None = None
+    # per worker limits of DuckDB, e.g. "512MB" and 2 (DuckDB defaults if not set)
+    duckdb_memory_limit: str | None = None
+    duckdb_threads: int | None = None
+    # workers open one read-only database file instead of loading own copies
+    shared_database: bool = False
+    # number of the biggest teams and players rendered on worker startup
+    warmup_top: int = 20
+    # check templates for changes on every render (for development)
+    templates_auto_reload: bool = False
+    # compiled templates are stored here and shared by workers (disabled if not set)
+    templates_cache_path: Path | None = None
+    # number of serialized team and player responses of /api/ cached per worker
+    api_cache_entries: int = 2000
+    # leaving a team and joining another one within this period is a transfer
+    transfer_max_gap_days: int = 90
 
     @property
-    def parser_result_file_path(self) -> Path:
-        return self.parser_results_path.resolve() / "rosters.jsonlines"
+    def parser_result_path(self) -> Path:
+        return self.parser_results_path.resolve() / "rosters"
+
+    @property
+    def parser_result_deltas_path(self) -> Path:
+        return self.parser_results_path.resolve() / "deltas"
+
+    @property
+    def crawl_state_file_path(self) -> Path:
+        return self.parser_results_path.resolve() / "crawl_state.json"
+
+    @property
+    def crawl_job_path(self) -> Path:
+        return self.parser_results_path.resolve() / "crawl_job"
+
+    @property
+    def shared_database_path(self) -> Path:
+        return self.parser_results_path.resolve() / "duckdb"
 
     @property
     def parser_result_updated_date_file_path(self) -> Path:
@@ -41,4 +79,22 @@ class Settings:
             email_for_scrapper_useragent=settings.email_for_scrapper_useragent,
             parser_results_path=Path(parser_results_path),
             sentry_dsn=settings.get("sentry_dsn"),
+            slow_query_threshold_ms=settings.get("slow_query_threshold_ms"),
+            slow_query_sample_rate=settings.get("slow_query_sample_rate", 1.0),
+            server_timing=settings.get("server_timing", False),
+            admin_token=settings.get("admin_token"),
+            duckdb_memory_limit=settings.get("duckdb_memory_limit"),
+            duckdb_threads=settings.get("duckdb_threads"),
+            shared_database=settings.get("shared_database", False),
+            warmup_top=settings.get("warmup_top", 20),
+            templates_auto_reload=settings.get("templates_auto_reload", False),
+            templates_cache_path=_resolve_path(settings.get("templates_cache_path")),
+            api_cache_entries=settings.get("api_cache_entries", 2000),
+            transfer_max_gap_days=settings.get("transfer_max_gap_days", 90),
         )
+
+
+def _resolve_path(value: str | None) -> Path | None:
+    if value is None:
+        return None
+    return BASE_DIR / value if not value.startswith("/") else Path(value)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, ParamSpec, TypeVar
+
+from prometheus_client import Histogram
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+SPAN_DURATION = Histogram(
+    "cswm_span_duration_seconds",
+    "Duration of request phases",
+    ["span"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+# (name, duration) of finished spans, None if spans are not collected
+_spans: ContextVar[list[tuple[str, float]] | None] = ContextVar("spans", default=None)
+
+
+@contextlib.contextmanager
+def collect_spans() -> Iterator[list[tuple[str, float]]]:
+    """Collect spans finished inside the block, including ones in threads"""
+    spans: list[tuple[str, float]] = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[None]:
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        spans.append((name, duration))
+        SPAN_DURATION.labels(span=name).observe(duration)
+
+
+def timed(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator that wraps calls of the function in a span"""
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _spans.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def server_timing_header(spans: list[tuple[str, float]]) -> str:
+    """
+    Format spans for the `Server-Timing` header.
+    Durations of spans with the same name are summed.
+    """
+    durations: dict[str, float] = {}
+    for name, duration in spans:
+        durations[name] = durations.get(name, 0.0) + duration
+    return ", ".join(
+        f"{name};dur={duration * 1000:.2f}" for name, duration in durations.items()
+    )
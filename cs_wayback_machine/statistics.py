@@ -3,8 +3,13 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     from cs_wayback_machine.storage import DuckDbConnectionManager
 
+# statistics of StatisticsCalculator.top_by_bucket
+BUCKETED_STATISTICS = ("players_with_most_teams", "teams_with_most_players")
+
 
 class StatisticsCalculator:
     def __init__(self, manager: DuckDbConnectionManager) -> None:
@@ -61,8 +66,9 @@ class StatisticsCalculator:
         ORDER BY total_days DESC
         LIMIT $limit;
         """
-        statement = self._manager.conn.execute(query, parameters={"limit": limit})
-        return statement.fetchall()
+        return self._manager.fetchall(
+            "players_with_most_days_in_current_team", query, {"limit": limit}
+        )
 
     def players_with_most_teams(self, *, limit: int) -> list[tuple[str, int]]:
         query = """
@@ -75,8 +81,9 @@ class StatisticsCalculator:
         ORDER BY total_teams DESC
         LIMIT $limit;
         """
-        statement = self._manager.conn.execute(query, parameters={"limit": limit})
-        return statement.fetchall()
+        return self._manager.fetchall(
+            "players_with_most_teams", query, {"limit": limit}
+        )
 
     def active_players_by_country(self, *, limit: int) -> list[tuple[str, int]]:
         query = """
@@ -92,8 +99,9 @@ class StatisticsCalculator:
         ORDER BY total_players DESC
         LIMIT $limit;
         """
-        statement = self._manager.conn.execute(query, parameters={"limit": limit})
-        return statement.fetchall()
+        return self._manager.fetchall(
+            "active_players_by_country", query, {"limit": limit}
+        )
 
     def teams_with_most_players(self, *, limit: int) -> list[tuple[str, int]]:
         query = """
@@ -106,8 +114,9 @@ class StatisticsCalculator:
         ORDER BY total_players DESC
         LIMIT $limit;
         """
-        statement = self._manager.conn.execute(query, parameters={"limit": limit})
-        return statement.fetchall()
+        return self._manager.fetchall(
+            "teams_with_most_players", query, {"limit": limit}
+        )
 
     def players_with_most_teammates(self, *, limit: int) -> list[tuple[str, int]]:
         query = """
@@ -140,8 +149,9 @@ class StatisticsCalculator:
         ORDER BY teammate_count DESC
         LIMIT $limit;
         """
-        statement = self._manager.conn.execute(query, parameters={"limit": limit})
-        return statement.fetchall()
+        return self._manager.fetchall(
+            "players_with_most_teammates", query, {"limit": limit}
+        )
 
     def get_teammate_pair_with_most_time(
         self, *, limit: int
@@ -201,5 +211,179 @@ class StatisticsCalculator:
         LIMIT $limit;
         """
 
-        statement = self._manager.conn.execute(query, parameters={"limit": limit})
-        return statement.fetchall()
+        return self._manager.fetchall(
+            "get_teammate_pair_with_most_time", query, {"limit": limit}
+        )
+
+    def top_by_bucket(self, *, limit: int) -> list[tuple[str, str, str, str, int]]:
+        """
+        (statistic, bucket kind, bucket, id, total) of `BUCKETED_STATISTICS`
+        for all time (`all` kind, empty bucket), for every year the team
+        or player was active and for every game version
+        """
+        query = """
+        WITH stints AS (
+            SELECT
+                player_unique_id,
+                team_id,
+                game_version,
+                join_date,
+                LEAST(
+                    COALESCE(inactive_or_leave_date, CURRENT_DATE), CURRENT_DATE
+                ) AS end_date
+            FROM rosters
+            WHERE join_date IS NOT NULL
+                AND player_unique_id IS NOT NULL
+        ),
+        bucketed AS (
+            SELECT player_unique_id, team_id, 'all' AS bucket_kind, '' AS bucket
+            FROM stints
+            UNION ALL
+            SELECT
+                player_unique_id,
+                team_id,
+                'year',
+                CAST(UNNEST(RANGE(YEAR(join_date), YEAR(end_date) + 1)) AS TEXT)
+            FROM stints
+            UNION ALL
+            SELECT player_unique_id, team_id, 'game_version', game_version
+            FROM stints
+            WHERE game_version IS NOT NULL
+        ),
+        totals AS (
+            SELECT
+                'players_with_most_teams' AS statistic,
+                bucket_kind,
+                bucket,
+                player_unique_id AS id,
+                COUNT(DISTINCT team_id) AS total
+            FROM bucketed
+            GROUP BY ALL
+            UNION ALL
+            SELECT
+                'teams_with_most_players',
+                bucket_kind,
+                bucket,
+                team_id,
+                COUNT(DISTINCT player_unique_id)
+            FROM bucketed
+            GROUP BY ALL
+        )
+        SELECT statistic, bucket_kind, bucket, id, total
+        FROM totals
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY statistic, bucket_kind, bucket ORDER BY total DESC, id
+        ) <= $limit
+        ORDER BY statistic, bucket_kind, bucket, total DESC, id;
+        """
+        return self._manager.fetchall("top_by_bucket", query, {"limit": limit})
+
+    def entity_popularity(self) -> list[tuple[str, str, float]]:
+        """
+        (kind, id, score) for every team and player. Score grows with the number
+        of roster entries (teams of a player), active years and teammates
+        (players of a team) on log scale, plus a bonus for recent activity.
+        """
+        query = """
+        WITH stints AS (
+            SELECT
+                team_id,
+                player_unique_id,
+                join_date,
+                COALESCE(inactive_or_leave_date, CURRENT_DATE) AS end_date
+            FROM rosters
+            WHERE join_date IS NOT NULL
+        ),
+        team_players AS (
+            SELECT DISTINCT team_id, player_unique_id
+            FROM stints
+        ),
+        team_sizes AS (
+            SELECT team_id, COUNT(*) AS players
+            FROM team_players
+            GROUP BY team_id
+        ),
+        player_teammates AS (
+            SELECT tp.player_unique_id, SUM(ts.players - 1) AS teammates
+            FROM team_players AS tp
+            JOIN team_sizes AS ts USING (team_id)
+            GROUP BY tp.player_unique_id
+        ),
+        signals AS (
+            SELECT
+                'team' AS kind,
+                stints.team_id AS id,
+                COUNT(*) AS entries,
+                MAX(end_date) - MIN(join_date) AS active_days,
+                CURRENT_DATE - MAX(end_date) AS inactive_days,
+                ANY_VALUE(ts.players) AS teammates
+            FROM stints
+            JOIN team_sizes AS ts USING (team_id)
+            GROUP BY stints.team_id
+            UNION ALL
+            SELECT
+                'player' AS kind,
+                stints.player_unique_id AS id,
+                COUNT(DISTINCT team_id) AS entries,
+                MAX(end_date) - MIN(join_date) AS active_days,
+                CURRENT_DATE - MAX(end_date) AS inactive_days,
+                ANY_VALUE(pt.teammates) AS teammates
+            FROM stints
+            JOIN player_teammates AS pt USING (player_unique_id)
+            GROUP BY stints.player_unique_id
+        )
+        SELECT
+            kind,
+            id,
+            LN(1 + entries)
+                + LN(1 + active_days / 365)
+                + 0.5 * LN(1 + teammates)
+                + 2 * EXP(-GREATEST(inactive_days, 0) / (3 * 365)) AS score
+        FROM signals;
+        """
+        return self._manager.fetchall("entity_popularity", query)
+
+
+class StatisticsCube:
+    """
+    Tops of `BUCKETED_STATISTICS` for all time, by year and by game version,
+    computed with one query when the cube is built
+    """
+
+    def __init__(self, rows: Iterable[tuple[str, str, str, str, int]]) -> None:
+        """`rows` - (statistic, bucket kind, bucket, id, total) sorted by total"""
+        self._tops: dict[tuple[str, str, str], list[tuple[str, int]]] = {}
+        for statistic, bucket_kind, bucket, entity_id, total in rows:
+            key = (statistic, bucket_kind, bucket)
+            self._tops.setdefault(key, []).append((entity_id, total))
+        buckets = {(bucket_kind, bucket) for _, bucket_kind, bucket in self._tops}
+        self.years = sorted(int(bucket) for kind, bucket in buckets if kind == "year")
+        self.game_versions = sorted(
+            bucket for kind, bucket in buckets if kind == "game_version"
+        )
+
+    def __len__(self) -> int:
+        return len(self._tops)
+
+    def top(
+        self,
+        statistic: str,
+        *,
+        year: int | None = None,
+        game_version: str | None = None,
+        limit: int,
+    ) -> list[tuple[str, int]]:
+        """Top of the year or the game version, all time top if none is passed"""
+        if year is not None:
+            key = (statistic, "year", str(year))
+        elif game_version is not None:
+            key = (statistic, "game_version", game_version)
+        else:
+            key = (statistic, "all", "")
+        return self._tops.get(key, [])[:limit]
+
+
+def build_statistics_cube(
+    statistics_calculator: StatisticsCalculator, *, limit: int
+) -> StatisticsCube:
+    return StatisticsCube(statistics_calculator.top_by_bucket(limit=limit))
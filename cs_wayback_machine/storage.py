@@ -1,21 +1,99 @@
 from __future__ import annotations
 
 import logging
-from datetime import date
-from typing import TYPE_CHECKING
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
 
 import duckdb
 
 from cs_wayback_machine.date_util import DateRange
-from cs_wayback_machine.duck import create_new_connection_from_parser_results
+from cs_wayback_machine.delta import find_delta_chain
+from cs_wayback_machine.duck import (
+    apply_delta,
+    create_new_connection_from_parser_results,
+    open_shared_database,
+)
 from cs_wayback_machine.entities import RosterPlayer, Team
+from cs_wayback_machine.monitoring import DUCKDB_GENERATION, QueryMonitor, sample_rss
+from cs_wayback_machine.spans import span
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from pathlib import Path
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# new team may be joined a few days before leaving the old one,
+#   e.g. when the leave date is the day of the last match
+TRANSFER_OVERLAP_DAYS = 7
+
+# periods players spent in teams, rows with invalid dates are skipped
+STINTS_QUERY = """
+    SELECT
+        team_id,
+        player_unique_id,
+        join_date AS start_date,
+        COALESCE(inactive_or_leave_date, CURRENT_DATE) AS end_date
+    FROM rosters
+    WHERE player_unique_id IS NOT NULL
+        AND join_date IS NOT NULL
+        AND NOT has_invalid_dates
+"""
+
+# periods of teams when their rosters didn't change
+ROSTER_PERIODS_QUERY = f"""
+    WITH stints AS ({STINTS_QUERY}),
+    bounds AS (
+        SELECT team_id, start_date AS day FROM stints
+        UNION
+        SELECT team_id, end_date FROM stints
+    ),
+    periods AS (
+        SELECT
+            team_id,
+            day AS start_date,
+            LEAD(day) OVER (PARTITION BY team_id ORDER BY day) AS end_date
+        FROM bounds
+    )
+    SELECT
+        periods.team_id,
+        periods.start_date,
+        periods.end_date,
+        LIST(DISTINCT stints.player_unique_id ORDER BY stints.player_unique_id)
+            AS players
+    FROM periods
+    JOIN stints
+        ON stints.team_id = periods.team_id
+        AND stints.start_date <= periods.start_date
+        AND stints.end_date >= periods.end_date
+    GROUP BY ALL
+    ORDER BY periods.team_id, periods.start_date
+"""  # noqa: S608
+
+# every pair of players once, with the player id less than the teammate id
+TEAMMATE_OVERLAPS_QUERY = f"""
+    WITH stints AS ({STINTS_QUERY})
+    SELECT
+        player.player_unique_id,
+        teammate.player_unique_id AS teammate_unique_id,
+        player.team_id,
+        GREATEST(player.start_date, teammate.start_date) AS overlap_start,
+        LEAST(player.end_date, teammate.end_date) AS overlap_end,
+        overlap_end - overlap_start AS days
+    FROM stints AS player
+    JOIN stints AS teammate
+        ON player.team_id = teammate.team_id
+        AND player.player_unique_id < teammate.player_unique_id
+        AND player.start_date < teammate.end_date
+        AND teammate.start_date < player.end_date
+"""  # noqa: S608
+
 
 class RosterStorage:
     def __init__(self, manager: DuckDbConnectionManager) -> None:
@@ -23,14 +101,13 @@ class RosterStorage:
 
     def get_db_updated_date(self) -> date | None:
         query = """
-        SELECT rosters_updated_date
+        SELECT CAST(rosters_version AS DATE)
         FROM meta;
         """
-        statement = self._manager.conn.execute(query)
-        row = statement.fetchone()
-        if row is None:
+        rows = self._manager.fetchall("get_db_updated_date", query)
+        if not rows:
             return None
-        return row[0]
+        return rows[0][0]
 
     def get_team(self, team_id: str) -> Team | None:
         query = """
@@ -38,11 +115,10 @@ class RosterStorage:
         FROM teams
         WHERE unique_name = $team_id;
         """
-        statement = self._manager.conn.execute(query, parameters={"team_id": team_id})
-        row = statement.fetchone()
-        if row is None:
+        rows = self._manager.fetchall("get_team", query, {"team_id": team_id})
+        if not rows:
             return None
-        return Team(*row)
+        return Team(*rows[0])
 
     def get_players(
         self, team_id: str, date_from: date, date_to: date
@@ -57,16 +133,17 @@ class RosterStorage:
         AND (inactive_or_leave_date is NULL OR inactive_or_leave_date >= $start_date);
         """
 
-        statement = self._manager.conn.execute(
+        rows = self._manager.fetchall(
+            "get_players",
             query,
-            parameters={
+            {
                 "team_id": team_id,
                 "start_date": date_from,
                 "end_date": date_to,
             },
         )
         players = []
-        for row in statement.fetchall():
+        for row in rows:
             players.append(RosterPlayer(*row))
         return players
 
@@ -78,11 +155,9 @@ class RosterStorage:
         FROM rosters
         WHERE player_unique_id = $player_id;
         """
-        statement = self._manager.conn.execute(
-            query, parameters={"player_id": player_id}
-        )
+        rows = self._manager.fetchall("get_player", query, {"player_id": player_id})
         players = []
-        for row in statement.fetchall():
+        for row in rows:
             players.append(RosterPlayer(*row))
         return players
 
@@ -213,11 +288,9 @@ class RosterStorage:
             merged_start, merged_end
         ORDER BY merged_start;
         """
-        statement = self._manager.conn.execute(
-            query, parameters={"player_id": player_id}
-        )
+        rows = self._manager.fetchall("get_teammates", query, {"player_id": player_id})
         results = []
-        for row in statement.fetchall():
+        for row in rows:
             *player_data, start, end = row
             results.append((RosterPlayer(*player_data), DateRange(start, end)))
         return results
@@ -227,57 +300,311 @@ class RosterStorage:
         SELECT unique_name
         FROM teams;
         """
-        statement = self._manager.conn.execute(query)
-        return [row[0] for row in statement.fetchall()]
+        rows = self._manager.fetchall("get_team_names", query)
+        return [row[0] for row in rows]
 
     def get_player_names(self) -> list[str]:
         query = """
         SELECT DISTINCT player_unique_id
         FROM rosters;
         """
-        statement = self._manager.conn.execute(query)
-        return [row[0] for row in statement.fetchall()]
+        rows = self._manager.fetchall("get_player_names", query)
+        return [row[0] for row in rows]
+
+    def get_roster_periods(self) -> list[tuple[str, date, date, list[str]]]:
+        """(team id, start, end, player ids) of every roster of every team"""
+        return self._manager.fetchall("get_roster_periods", ROSTER_PERIODS_QUERY)
+
+    def get_transfers(
+        self, *, max_gap_days: int
+    ) -> list[tuple[str, str, str, date, date]]:
+        """
+        (player id, from team id, to team id, leave date, join date) of players
+        who joined another team within `max_gap_days` after leaving the team,
+        the next team is the first one joined after the leave date
+        """
+        query = """
+        WITH stints AS (
+            SELECT
+                player_unique_id,
+                team_id,
+                join_date,
+                inactive_or_leave_date AS end_date
+            FROM rosters
+            WHERE player_unique_id IS NOT NULL
+                AND join_date IS NOT NULL
+                AND NOT has_invalid_dates
+        )
+        SELECT
+            stint.player_unique_id,
+            stint.team_id,
+            next_stint.team_id,
+            stint.end_date,
+            next_stint.join_date
+        FROM stints AS stint,
+        -- first stint that starts after this one ends, overlapping ones are skipped
+        LATERAL (
+            SELECT team_id, join_date
+            FROM stints AS other
+            WHERE other.player_unique_id = stint.player_unique_id
+                AND other.join_date > stint.join_date
+                AND other.join_date >= stint.end_date - $overlap_days::INTEGER
+            ORDER BY other.join_date, other.team_id
+            LIMIT 1
+        ) AS next_stint
+        WHERE stint.end_date IS NOT NULL
+            AND next_stint.team_id <> stint.team_id
+            AND next_stint.join_date - stint.end_date <= $max_gap_days
+        ORDER BY next_stint.join_date, stint.player_unique_id;
+        """
+        return self._manager.fetchall(
+            "get_transfers",
+            query,
+            {"max_gap_days": max_gap_days, "overlap_days": TRANSFER_OVERLAP_DAYS},
+        )
+
+    def get_teammate_links(self) -> list[tuple[str, str, str, date, date]]:
+        """
+        (player id, teammate id, team id, start, end) of the longest time
+        every pair of players spent together
+        """
+        query = f"""
+        SELECT DISTINCT ON (player_unique_id, teammate_unique_id)
+            player_unique_id, teammate_unique_id, team_id, overlap_start, overlap_end
+        FROM ({TEAMMATE_OVERLAPS_QUERY})
+        ORDER BY player_unique_id, teammate_unique_id, days DESC, team_id;
+        """  # noqa: S608
+        return self._manager.fetchall("get_teammate_links", query)
+
+    def get_aliases(self) -> list[tuple[str, str, str, int]]:
+        """
+        (kind, id, alias, number of roster entries) for names of teams and
+        all nicknames players had
+        """
+        query = """
+        SELECT 'team' AS kind, teams.unique_name, teams.name, COUNT(rosters.team_id)
+        FROM teams
+        LEFT JOIN rosters ON rosters.team_id = teams.unique_name
+        GROUP BY ALL
+        UNION ALL
+        SELECT 'player' AS kind, player_unique_id, player_id, COUNT(*)
+        FROM rosters
+        WHERE player_unique_id IS NOT NULL
+        GROUP BY ALL;
+        """
+        return self._manager.fetchall("get_aliases", query)
+
+
+@dataclass(frozen=True)
+class DataUpdate:
+    """
+    Notification about new data loaded into the database.
+    `teams` and `players` are None if everything could have changed.
+    """
+
+    version: datetime | None
+    teams: frozenset[str] | None = None
+    players: frozenset[str] | None = None
+    generation: int = 0
 
 
 class DuckDbConnectionManager:
-    def __init__(self, parser_results_storage: ParserResultsStorage) -> None:
+    def __init__(
+        self,
+        parser_results_storage: ParserResultsStorage,
+        query_monitor: QueryMonitor | None = None,
+        duckdb_config: dict[str, Any] | None = None,
+        shared_database_path: Path | None = None,
+    ) -> None:
+        """
+        With `shared_database_path` the data is read from read-only database
+        files in this directory that are shared by all processes.
+        """
         self._parser_results_storage = parser_results_storage
+        self._query_monitor = query_monitor or QueryMonitor()
+        self._duckdb_config = duckdb_config
+        self._shared_database_path = shared_database_path
         self._conn: duckdb.DuckDBPyConnection | None = None
+        # version of the loaded data
+        self._version: datetime | None = None
+        self._update_lock = threading.Lock()
+        self._update_listeners: list[Callable[[DataUpdate], None]] = []
+        # increased on every load of new data
+        self.generation = 0
 
     @property
     def conn(self) -> duckdb.DuckDBPyConnection:
         if self._conn is None:
-            logger.info("Creating new connection")
-            self._conn = create_new_connection_from_parser_results(
-                self._parser_results_storage
-            )
+            with self._update_lock:
+                if self._conn is None:
+                    logger.info("Creating new connection")
+                    with sample_rss("load"):
+                        self._conn = self._connect()
+                    self._version = self.version(self._conn.cursor())
+                    self._set_generation(self.generation + 1)
         conn = self._conn.cursor()
-        current_version = self.version(conn)
         new_version = self._parser_results_storage.version()
-        if new_version and (current_version is None or new_version > current_version):
-            logger.info("New version of parser results detected, updating database")
-            conn.close()
-            self._conn = conn = create_new_connection_from_parser_results(
-                self._parser_results_storage
-            )
+        if self._is_outdated(conn, new_version):
+            with self._update_lock:
+                if self._is_outdated(conn, new_version):
+                    assert new_version is not None
+                    conn = self._update(conn, new_version)
         return conn
 
-    def version(self, conn: duckdb.DuckDBPyConnection) -> date | None:
+    def refresh(self) -> None:
+        """
+        Load the data or switch to the new data if there is one, cheap when
+        the data is up to date: only the published version is checked
+        """
+        new_version = self._parser_results_storage.version()
+        if self._conn is not None and not (
+            new_version and (self._version is None or new_version > self._version)
+        ):
+            return
+        self.conn.close()
+
+    def fetchall(
+        self, name: str, query: str, parameters: dict[str, Any] | None = None
+    ) -> list[tuple]:
+        """Run the query and report its metrics under `name`"""
+        conn = self.conn
+        generation = self.generation
+        start = time.perf_counter()
+        with span(name):
+            rows = conn.execute(query, parameters=parameters).fetchall()
+        self._query_monitor.observe(
+            conn,
+            name=name,
+            query=query,
+            parameters=parameters,
+            duration=time.perf_counter() - start,
+            rows=len(rows),
+            generation=generation,
+        )
+        return rows
+
+    def current_cursor(self) -> duckdb.DuckDBPyConnection | None:
+        """Cursor of the loaded connection, doesn't load or update data"""
+        conn = self._conn
+        return conn.cursor() if conn is not None else None
+
+    def add_update_listener(self, listener: Callable[[DataUpdate], None]) -> None:
+        self._update_listeners.append(listener)
+
+    def version(self, conn: duckdb.DuckDBPyConnection) -> datetime | None:
         query = """
-        SELECT rosters_updated_date
+        SELECT rosters_version
         FROM meta;
         """
         statement = conn.execute(query)
         row = statement.fetchone()
         return row[0] if row else None
 
+    def _is_outdated(
+        self, conn: duckdb.DuckDBPyConnection, new_version: datetime | None
+    ) -> bool:
+        current_version = self.version(conn)
+        return bool(
+            new_version and (current_version is None or new_version > current_version)
+        )
+
+    def _update(
+        self, conn: duckdb.DuckDBPyConnection, new_version: datetime
+    ) -> duckdb.DuckDBPyConnection:
+        current_version = self.version(conn)
+        deltas = None
+        # shared database is read-only, other processes build the new file
+        if current_version is not None and self._shared_database_path is None:
+            deltas = find_delta_chain(
+                self._parser_results_storage.deltas_path, current_version, new_version
+            )
+
+        if deltas is not None:
+            logger.info("New version of parser results detected, applying deltas")
+            teams: set[str] = set()
+            players: set[str] = set()
+            with sample_rss("delta"):
+                for delta in deltas:
+                    apply_delta(conn, delta)
+                    teams.update(delta.teams)
+                    players.update(delta.players)
+            update = DataUpdate(
+                version=new_version,
+                teams=frozenset(teams),
+                players=frozenset(players),
+                generation=self.generation + 1,
+            )
+        else:
+            logger.info("New version of parser results detected, updating database")
+            with sample_rss("reload"):
+                conn.close()
+                self._conn = self._connect()
+            conn = self._conn.cursor()
+            update = DataUpdate(version=new_version, generation=self.generation + 1)
+
+        self._version = new_version
+        self._set_generation(update.generation)
+        for listener in self._update_listeners:
+            listener(update)
+        return conn
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        if self._shared_database_path is not None:
+            return open_shared_database(
+                self._parser_results_storage,
+                self._shared_database_path,
+                self._duckdb_config,
+            )
+        return create_new_connection_from_parser_results(
+            self._parser_results_storage, self._duckdb_config
+        )
+
+    def _set_generation(self, generation: int) -> None:
+        self.generation = generation
+        DUCKDB_GENERATION.set(generation)
+
+
+class GenerationCache(Generic[T]):
+    """Value computed from the data, rebuilt once per data generation"""
+
+    def __init__(
+        self, manager: DuckDbConnectionManager, build: Callable[[], T]
+    ) -> None:
+        self._manager = manager
+        self._build = build
+        self._lock = threading.Lock()
+        self._value: T | None = None
+        self._generation = 0
+
+    def get(self) -> T:
+        self._manager.refresh()
+        if self._value is None or self._generation != self._manager.generation:
+            with self._lock:
+                generation = self._manager.generation
+                if self._value is None or self._generation != generation:
+                    self._value = self._build()
+                    self._generation = generation
+        return self._value
+
+    @property
+    def current(self) -> T | None:
+        """Last built value, doesn't build it"""
+        return self._value
+
 
 class ParserResultsStorage:
-    def __init__(self, parsed_rosters: Path, updated_file: Path | None = None):
+    def __init__(
+        self,
+        parsed_rosters: Path,
+        updated_file: Path | None = None,
+        deltas_path: Path | None = None,
+    ):
         self.parsed_rosters = parsed_rosters
+        self.deltas_path = deltas_path
         self._updated_file = updated_file
 
-    def version(self) -> date | None:
+    def version(self) -> datetime | None:
+        """Time the data was published, files with a date only are still read"""
         if self._updated_file is not None and self._updated_file.exists():
-            return date.fromisoformat(self._updated_file.read_text().strip())
+            return datetime.fromisoformat(self._updated_file.read_text().strip())
         return None
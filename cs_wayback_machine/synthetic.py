@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import random
+import string
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any
+
+from cs_wayback_machine.scraper import parse_dates
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+LIQUIPEDIA_URL = "https://liquipedia.net/counterstrike"
+GAME_VERSION_RELEASES = [
+    (date(2023, 9, 27), "CS2"),
+    (date(2012, 8, 21), "CS:GO"),
+    (date.min, "CS"),
+]
+FLAGS = [
+    "Ukraine",
+    "Russia",
+    "Sweden",
+    "Brazil",
+    "Denmark",
+    "France",
+    "Poland",
+    "Finland",
+    "Germany",
+    "United States",
+    "Kazakhstan",
+    "Mongolia",
+]
+POSITIONS = ["(Coach)", "(Trial)", "(Stand-in)", "(On Loan)", "(Substitute)"]
+TEAM_WORDS = [
+    "Natus",
+    "Virtus",
+    "Ninjas",
+    "Alliance",
+    "Dynasty",
+    "Spirit",
+    "Heroic",
+    "Vitality",
+    "Liquid",
+    "Complexity",
+    "Eternal",
+    "Fire",
+    "Monte",
+    "Apeks",
+    "Falcons",
+    "Legacy",
+]
+TEAM_SUFFIXES = ["", "Gaming", "Esports", "Club", "Academy", "Team", "Red", "Black"]
+
+
+@dataclass(frozen=True)
+class DatasetConfig:
+    """
+    Parameters of the synthetic rosters dataset.
+    `roster_churn` - average number of roster changes per team per year,
+    `career_years` - average career length of a player,
+    `invalid_date_share` - share of stints with incomplete dates (`*_raw` fields),
+    `player_reuse` - chance that a free spot is taken by an already known player.
+    """
+
+    teams: int = 1000
+    roster_size: int = 5
+    roster_churn: float = 1.5
+    career_years: float = 5.0
+    invalid_date_share: float = 0.05
+    player_reuse: float = 0.7
+    first_year: int = 2000
+    today: date = date(2024, 10, 1)
+    seed: int = 0
+
+
+@dataclass
+class _Player:
+    unique_id: str
+    player_id: str
+    full_name: str
+    flag_name: str
+    career_start: date
+    career_end: date
+
+
+@dataclass
+class _Stint:
+    player: _Player
+    join_date: date
+    position: str | None
+    is_captain: bool
+    leave_date: date | None = field(default=None)
+
+
+def generate_rosters(config: DatasetConfig) -> Iterator[dict[str, Any]]:
+    """
+    Generate roster items with the same schema as `TeamsSpider` emits.
+    Same config (including seed) always gives the same items.
+    """
+    generator = _RostersGenerator(config)
+    for team_num in range(config.teams):
+        yield from generator.generate_team(team_num)
+
+
+def write_dataset(path: Path, config: DatasetConfig) -> int:
+    """Write generated rosters as jsonlines and return number of rows"""
+    rows = 0
+    with open(path, "w") as f:
+        for item in generate_rosters(config):
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+            rows += 1
+    return rows
+
+
+class _RostersGenerator:
+    def __init__(self, config: DatasetConfig) -> None:
+        self._config = config
+        self._random = random.Random(config.seed)  # noqa: S311,DUO102
+        self._players: list[_Player] = []
+        self._team_names: set[str] = set()
+        self._first_date = date(config.first_year, 1, 1)
+
+    def generate_team(self, team_num: int) -> Iterator[dict[str, Any]]:
+        team_name = self._team_name(team_num)
+        founded = self._random_date(self._first_date, self._config.today - _days(30))
+        disbanded = founded + _days(self._random.expovariate(1 / (3 * 365)))
+        for stint in self._simulate_roster(founded, disbanded):
+            yield self._make_item(team_name, stint)
+
+    def _simulate_roster(self, founded: date, disbanded: date) -> list[_Stint]:
+        rnd = self._random
+        end = min(disbanded, self._config.today)
+        roster: list[_Stint] = []
+        stints: list[_Stint] = []
+
+        def join(day: date) -> None:
+            stint = self._new_stint(day, roster)
+            roster.append(stint)
+            stints.append(stint)
+
+        def leave(stint: _Stint, day: date) -> None:
+            stint.leave_date = day
+            roster.remove(stint)
+
+        for _ in range(self._config.roster_size):
+            join(founded)
+        day = founded
+        while True:
+            day += _days(rnd.expovariate(self._config.roster_churn / 365))
+            if day >= end:
+                break
+            # players that retired since the last change are replaced too
+            for stint in sorted(roster, key=lambda item: item.player.career_end):
+                if stint.player.career_end < day:
+                    leave(stint, stint.player.career_end)
+                    join(stint.player.career_end)
+            leave(rnd.choice(roster), day)
+            join(day)
+        if disbanded < self._config.today:
+            for stint in list(roster):
+                leave(stint, disbanded)
+        return stints
+
+    def _team_name(self, team_num: int) -> str:
+        name = " ".join(
+            filter(
+                None,
+                [
+                    self._random.choice(TEAM_WORDS),
+                    self._random.choice(TEAM_SUFFIXES),
+                ],
+            )
+        )
+        if name in self._team_names:
+            name = f"{name} {team_num}"
+        self._team_names.add(name)
+        return name
+
+    def _new_stint(self, day: date, roster: list[_Stint]) -> _Stint:
+        rnd = self._random
+        position = None
+        if rnd.random() < 0.15:
+            position = rnd.choice(POSITIONS)
+        return _Stint(
+            player=self._pick_player(day, exclude=[stint.player for stint in roster]),
+            join_date=day,
+            position=position,
+            is_captain=position is None and rnd.random() < 0.1,
+        )
+
+    def _pick_player(self, day: date, exclude: list[_Player]) -> _Player:
+        rnd = self._random
+        if self._players and rnd.random() < self._config.player_reuse:
+            for _ in range(10):
+                player = rnd.choice(self._players)
+                if (
+                    player.career_start <= day < player.career_end
+                    and player not in exclude
+                ):
+                    return player
+
+        num = len(self._players)
+        nickname = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 7)))
+        career_days = max(180, rnd.expovariate(1 / (self._config.career_years * 365)))
+        player = _Player(
+            unique_id=f"{nickname.capitalize()}{num}",
+            player_id=f"{nickname}{num}",
+            full_name=f"Player {num}",
+            flag_name=rnd.choice(FLAGS),
+            career_start=day,
+            career_end=day + _days(career_days),
+        )
+        self._players.append(player)
+        return player
+
+    def _make_item(self, team_name: str, stint: _Stint) -> dict[str, Any]:
+        rnd = self._random
+        player = stint.player
+        dates: dict[str, str | None] = {
+            "join_date": None,
+            "inactive_date": None,
+            "leave_date": None,
+            "join_date_raw": None,
+            "inactive_date_raw": None,
+            "leave_date_raw": None,
+        }
+        raw_dates = {"join_date": stint.join_date.isoformat()}
+        if stint.leave_date is not None:
+            raw_dates["leave_date"] = stint.leave_date.isoformat()
+            inactive_date = stint.leave_date - _days(rnd.randint(30, 200))
+            if rnd.random() < 0.1 and inactive_date > stint.join_date:
+                raw_dates["inactive_date"] = inactive_date.isoformat()
+        if rnd.random() < self._config.invalid_date_share:
+            invalid_type = rnd.choice([key for key, val in raw_dates.items() if val])
+            raw_dates[invalid_type] = rnd.choice(
+                [
+                    raw_dates[invalid_type][:8] + "??",
+                    raw_dates[invalid_type][:5] + "??-??",
+                    "",
+                ]
+            )
+        # parse dates the same way as the spider does
+        cells = [
+            (date_type.replace("_", " ").title(), value)
+            for date_type, value in raw_dates.items()
+        ]
+        for date_type, value, raw in parse_dates(cells):
+            assert date_type is not None
+            dates[date_type] = value.isoformat() if value else None
+            if raw is not None:
+                dates[f"{date_type}_raw"] = raw
+
+        team_slug = team_name.replace(" ", "_")
+        return {
+            "team_unique_name": team_name,
+            "team_name": team_name,
+            "team_url": f"{LIQUIPEDIA_URL}/{team_slug}",
+            "player_unique_id": player.unique_id,
+            "game_version": _game_version(stint.join_date),
+            "player_id": player.player_id,
+            "full_name": player.full_name,
+            "player_url": f"{LIQUIPEDIA_URL}/{player.unique_id}",
+            "is_captain": stint.is_captain,
+            "position": stint.position,
+            "flag_name": player.flag_name,
+            **dates,
+            "has_invalid_dates": any(
+                value is not None
+                for key, value in dates.items()
+                if key.endswith("_raw")
+            ),
+        }
+
+    def _random_date(self, start: date, end: date) -> date:
+        return start + _days(self._random.randint(0, (end - start).days))
+
+
+def _game_version(day: date) -> str:
+    for release_date, version in GAME_VERSION_RELEASES:
+        if day >= release_date:
+            return version
+    raise AssertionError("unreachable")
+
+
+def _days(value: float) -> timedelta:
+    return timedelta(days=max(1, int(value)))
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import Counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cs_wayback_machine.storage import RosterStorage
+
+# letters that have no decomposition in NFKD
+_EXTRA_FOLDING = str.maketrans(
+    {"ø": "o", "đ": "d", "ł": "l", "æ": "ae", "œ": "oe", "þ": "th", "ı": "i"}
+)
+_SPACES_RE = re.compile(r"[\s_]+")
+
+
+def fold(value: str) -> str:
+    """Case folded value without diacritics"""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).translate(_EXTRA_FOLDING)
+
+
+def normalize_alias(value: str) -> str:
+    """`Åsbjørn_Ö` and `asbjorn o` are the same alias"""
+    return _SPACES_RE.sub(" ", fold(value)).strip()
+
+
+class AliasIndex:
+    """
+    Maps normalized names of teams and players to their ids.
+    Player aliases are all nicknames (`player_id`) the player had in rosters.
+    If the alias is shared, the entity whose id it is wins, then the one
+    with the most roster entries under this alias.
+    """
+
+    def __init__(self, aliases: list[tuple[str, str, str, int]]) -> None:
+        """`aliases` - (kind, id, alias, number of roster entries with it)"""
+        self._ids: dict[str, set[str]] = {"team": set(), "player": set()}
+        candidates: list[tuple[str, str, tuple[bool, int, str]]] = []
+        total_entries: Counter[tuple[str, str]] = Counter()
+        for kind, entity_id, alias, entries in aliases:
+            self._ids[kind].add(entity_id)
+            total_entries[(kind, entity_id)] += entries
+            candidates.append((kind, alias, (False, entries, entity_id)))
+        for (kind, entity_id), entries in total_entries.items():
+            candidates.append((kind, entity_id, (True, entries, entity_id)))
+
+        best: dict[tuple[str, str], tuple[bool, int, str]] = {}
+        for kind, name, candidate in candidates:
+            key = (kind, normalize_alias(name))
+            if key not in best or candidate > best[key]:
+                best[key] = candidate
+        self._aliases = {key: entity_id for key, (*_, entity_id) in best.items()}
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def team(self, value: str) -> str | None:
+        return self._resolve("team", value)
+
+    def player(self, value: str) -> str | None:
+        return self._resolve("player", value)
+
+    def _resolve(self, kind: str, value: str) -> str | None:
+        if value in self._ids[kind]:
+            return value
+        return self._aliases.get((kind, normalize_alias(value)))
+
+
+def build_alias_index(storage: RosterStorage) -> AliasIndex:
+    return AliasIndex(storage.get_aliases())
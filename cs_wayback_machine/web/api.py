@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import orjson
+
+from cs_wayback_machine.web.presenters import PlayerPagePresenter, TeamRostersPresenter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from cs_wayback_machine.storage import (
+        DataUpdate,
+        DuckDbConnectionManager,
+        GenerationCache,
+        RosterStorage,
+    )
+    from cs_wayback_machine.web.aliases import AliasIndex
+
+# ids per kind in one batch request
+MAX_BATCH_IDS = 100
+NULL = b"null"
+
+
+class ApiCache:
+    """
+    LRU cache of serialized API responses of the current data version.
+    Every entry remembers teams it was built from, so a delta drops only
+    entries of changed teams and players; full reload drops everything.
+    """
+
+    def __init__(self, manager: DuckDbConnectionManager, max_entries: int) -> None:
+        self._manager = manager
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[bytes, frozenset[str]]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_build(
+        self,
+        key: tuple[str, str],
+        build: Callable[[], tuple[bytes, frozenset[str]] | None],
+    ) -> bytes | None:
+        """`build` returns serialized value and ids of teams it depends on"""
+        # entries of the replaced data are dropped by `on_update`
+        self._manager.refresh()
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+        generation = self._manager.generation
+        result = build()
+        if result is None:
+            return None
+        with self._lock:
+            # don't store values built from the data replaced in the meantime
+            if generation == self._manager.generation:
+                self._entries[key] = result
+                if len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return result[0]
+
+    def on_update(self, update: DataUpdate) -> None:
+        with self._lock:
+            if update.teams is None or update.players is None:
+                self._entries.clear()
+                return
+            teams, players = update.teams, update.players
+            for key, (_, entry_teams) in list(self._entries.items()):
+                kind, entity_id = key
+                if (
+                    (kind == "team" and entity_id in teams)
+                    or (kind == "player" and entity_id in players)
+                    or not entry_teams.isdisjoint(teams)
+                ):
+                    del self._entries[key]
+
+
+class EntityApi:
+    """Serialized data of team and player pages, looked up by any alias"""
+
+    def __init__(
+        self,
+        *,
+        rosters_storage: RosterStorage,
+        alias_index_cache: GenerationCache[AliasIndex],
+        cache: ApiCache,
+    ) -> None:
+        self._team_presenter = TeamRostersPresenter(rosters_storage=rosters_storage)
+        self._player_presenter = PlayerPagePresenter(rosters_storage=rosters_storage)
+        self._alias_index_cache = alias_index_cache
+        self._cache = cache
+
+    def team(self, value: str) -> bytes | None:
+        team_id = self._alias_index_cache.get().team(value)
+        if team_id is None:
+            return None
+        return self._cache.get_or_build(("team", team_id), lambda: self._team(team_id))
+
+    def player(self, value: str) -> bytes | None:
+        player_id = self._alias_index_cache.get().player(value)
+        if player_id is None:
+            return None
+        return self._cache.get_or_build(
+            ("player", player_id), lambda: self._player(player_id)
+        )
+
+    def batch(self, teams: list[str], players: list[str]) -> Iterator[bytes]:
+        """
+        Stream `{"teams": {id: data}, "players": {id: data}}` chunk by chunk,
+        data of unknown ids is null
+        """
+        yield b'{"teams":{'
+        yield from self._items(teams, self.team)
+        yield b'},"players":{'
+        yield from self._items(players, self.player)
+        yield b"}}"
+
+    def _items(
+        self, ids: list[str], get: Callable[[str], bytes | None]
+    ) -> Iterator[bytes]:
+        for num, entity_id in enumerate(dict.fromkeys(ids)):
+            separator = b"," if num else b""
+            yield separator + orjson.dumps(entity_id) + b":" + (get(entity_id) or NULL)
+
+    def _team(self, team_id: str) -> tuple[bytes, frozenset[str]] | None:
+        result = self._team_presenter.present(team_id)
+        if result is None:
+            return None
+        return orjson.dumps(result), frozenset([team_id])
+
+    def _player(self, player_id: str) -> tuple[bytes, frozenset[str]] | None:
+        result = self._player_presenter.present(player_id)
+        if result is None:
+            return None
+        return orjson.dumps(result), frozenset(team.team_id for team in result.teams)
+
+
+def parse_batch_request(body: bytes) -> tuple[list[str], list[str]] | None:
+    """(teams, players) from `{"teams": [...], "players": [...]}`, None if invalid"""
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    teams = data.get("teams", [])
+    players = data.get("players", [])
+    for ids in (teams, players):
+        if (
+            not isinstance(ids, list)
+            or len(ids) > MAX_BATCH_IDS
+            or not all(isinstance(item, str) for item in ids)
+        ):
+            return None
+    return teams, players
@@ -2,13 +2,41 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from picodi import Provide, inject
+from picodi import Provide, SingletonScope, dependency, inject
 
-from cs_wayback_machine.deps import get_rosters_storage
-from cs_wayback_machine.web.presenters import GlobalDataDTO, present_global_data
+from cs_wayback_machine.deps import (
+    get_dataset_exporter,
+    get_duckdb_connection_manager,
+    get_rosters_storage,
+    get_settings,
+    get_statistics_calculator,
+)
+from cs_wayback_machine.export import ExportFileCache
+from cs_wayback_machine.monitoring import memory_collector
+from cs_wayback_machine.statistics import build_statistics_cube
+from cs_wayback_machine.storage import GenerationCache
+from cs_wayback_machine.web.aliases import build_alias_index
+from cs_wayback_machine.web.api import ApiCache, EntityApi
+from cs_wayback_machine.web.graph import build_teammate_graph
+from cs_wayback_machine.web.intervals import build_roster_interval_index
+from cs_wayback_machine.web.presenters import (
+    STATISTICS_CUBE_LIMIT,
+    GlobalDataDTO,
+    present_global_data,
+)
+from cs_wayback_machine.web.search import build_search_index
+from cs_wayback_machine.web.transfers import build_transfer_index
 
 if TYPE_CHECKING:
-    from cs_wayback_machine.storage import RosterStorage
+    from cs_wayback_machine.export import DatasetExporter
+    from cs_wayback_machine.settings import Settings
+    from cs_wayback_machine.statistics import StatisticsCalculator, StatisticsCube
+    from cs_wayback_machine.storage import DuckDbConnectionManager, RosterStorage
+    from cs_wayback_machine.web.aliases import AliasIndex
+    from cs_wayback_machine.web.graph import TeammateGraph
+    from cs_wayback_machine.web.intervals import RosterIntervalIndex
+    from cs_wayback_machine.web.search import SearchIndex
+    from cs_wayback_machine.web.transfers import TransferIndex
 
 
 @inject
@@ -16,3 +44,142 @@ def get_global_data(
     rosters_storage: RosterStorage = Provide(get_rosters_storage),
 ) -> GlobalDataDTO:
     return present_global_data(rosters_storage)
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_search_index_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    statistics_calculator: StatisticsCalculator = Provide(get_statistics_calculator),
+) -> GenerationCache[SearchIndex]:
+    cache = GenerationCache(
+        duckdb_conn_manager,
+        lambda: build_search_index(rosters_storage, statistics_calculator),
+    )
+    memory_collector.track_cache("search_index", lambda: len(cache.current or ()))
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_statistics_cube_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    statistics_calculator: StatisticsCalculator = Provide(get_statistics_calculator),
+) -> GenerationCache[StatisticsCube]:
+    cache = GenerationCache(
+        duckdb_conn_manager,
+        lambda: build_statistics_cube(
+            statistics_calculator, limit=STATISTICS_CUBE_LIMIT
+        ),
+    )
+    memory_collector.track_cache("statistics_cube", lambda: len(cache.current or ()))
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_alias_index_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+) -> GenerationCache[AliasIndex]:
+    cache = GenerationCache(
+        duckdb_conn_manager, lambda: build_alias_index(rosters_storage)
+    )
+    memory_collector.track_cache("alias_index", lambda: len(cache.current or ()))
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_roster_interval_index_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+) -> GenerationCache[RosterIntervalIndex]:
+    cache = GenerationCache(
+        duckdb_conn_manager, lambda: build_roster_interval_index(rosters_storage)
+    )
+    memory_collector.track_cache(
+        "roster_interval_index", lambda: len(cache.current or ())
+    )
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_teammate_graph_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+) -> GenerationCache[TeammateGraph]:
+    cache = GenerationCache(
+        duckdb_conn_manager, lambda: build_teammate_graph(rosters_storage)
+    )
+    memory_collector.track_cache("teammate_graph", lambda: len(cache.current or ()))
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_transfer_index_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    settings: Settings = Provide(get_settings),
+) -> GenerationCache[TransferIndex]:
+    cache = GenerationCache(
+        duckdb_conn_manager,
+        lambda: build_transfer_index(
+            rosters_storage, max_gap_days=settings.transfer_max_gap_days
+        ),
+    )
+    memory_collector.track_cache("transfer_index", lambda: len(cache.current or ()))
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_api_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    settings: Settings = Provide(get_settings),
+) -> ApiCache:
+    cache = ApiCache(duckdb_conn_manager, settings.api_cache_entries)
+    duckdb_conn_manager.add_update_listener(cache.on_update)
+    memory_collector.track_cache("api", cache.__len__)
+    return cache
+
+
+@dependency(scope_class=SingletonScope)
+@inject
+def get_export_file_cache(
+    duckdb_conn_manager: DuckDbConnectionManager = Provide(
+        get_duckdb_connection_manager
+    ),
+    exporter: DatasetExporter = Provide(get_dataset_exporter),
+) -> ExportFileCache:
+    return ExportFileCache(exporter, duckdb_conn_manager)
+
+
+@inject
+def get_entity_api(
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    api_cache: ApiCache = Provide(get_api_cache),
+) -> EntityApi:
+    return EntityApi(
+        rosters_storage=rosters_storage,
+        alias_index_cache=alias_index_cache,
+        cache=api_cache,
+    )
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from cs_wayback_machine.storage import RosterStorage
+
+
+@dataclass(frozen=True)
+class TeammateLink:
+    player_id: str
+    teammate_id: str
+    team_id: str
+    start: date
+    end: date
+
+
+class TeammateGraph:
+    """
+    Players connected by time spent in the same team, in CSR form: neighbors
+    of player `num` are `neighbors[offsets[num]:offsets[num + 1]]`, and
+    `edge_links` of the same positions point to the team and period
+    of the link. Players are numbered in order of their ids.
+    """
+
+    def __init__(self, links: Iterable[tuple[str, str, str, date, date]]) -> None:
+        """`links` - (player id, teammate id, team id, start, end), once per pair"""
+        links = list(links)
+        self._player_ids = sorted(
+            {player_id for link in links for player_id in link[:2]}
+        )
+        self._player_nums = {
+            player_id: num for num, player_id in enumerate(self._player_ids)
+        }
+        self._team_ids = sorted({link[2] for link in links})
+        team_nums = {team_id: num for num, team_id in enumerate(self._team_ids)}
+        self._link_teams = array("i", (team_nums[link[2]] for link in links))
+        self._link_starts = array("i", (link[3].toordinal() for link in links))
+        self._link_ends = array("i", (link[4].toordinal() for link in links))
+
+        degrees = [0] * (len(self._player_ids) + 1)
+        pairs = [
+            (self._player_nums[player_id], self._player_nums[teammate_id])
+            for player_id, teammate_id, *_ in links
+        ]
+        for player, teammate in pairs:
+            degrees[player + 1] += 1
+            degrees[teammate + 1] += 1
+        self._offsets = array("i", degrees)
+        for num in range(1, len(self._offsets)):
+            self._offsets[num] += self._offsets[num - 1]
+        self._neighbors = array("i", bytes(4 * self._offsets[-1]))
+        self._edge_links = array("i", bytes(4 * self._offsets[-1]))
+        positions = array("i", self._offsets[:-1])
+        for link_num, (player, teammate) in enumerate(pairs):
+            for source, target in [(player, teammate), (teammate, player)]:
+                self._neighbors[positions[source]] = target
+                self._edge_links[positions[source]] = link_num
+                positions[source] += 1
+        self._components = self._find_components()
+
+    def __len__(self) -> int:
+        return len(self._player_ids)
+
+    def path(self, player_id: str, teammate_id: str) -> list[TeammateLink] | None:
+        """
+        Shortest chain of links from the player to the other player,
+        None if they are not connected
+        """
+        source = self._player_nums.get(player_id)
+        target = self._player_nums.get(teammate_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return []
+        if self._components[source] != self._components[target]:
+            return None
+        path = self._bidirectional_bfs(source, target)
+        return [
+            self._link(player, teammate) for player, teammate in zip(path, path[1:])
+        ]
+
+    def _neighbors_of(self, num: int) -> array[int]:
+        return self._neighbors[self._offsets[num] : self._offsets[num + 1]]
+
+    def _bidirectional_bfs(self, source: int, target: int) -> list[int]:
+        """Path of player nums, source and target must be connected"""
+        forward_parents = {source: -1}
+        backward_parents = {target: -1}
+        forward_frontier = [source]
+        backward_frontier = [target]
+        while True:
+            # expand the smaller side
+            expand_forward = len(forward_frontier) <= len(backward_frontier)
+            if expand_forward:
+                frontier, parents, others = (
+                    forward_frontier,
+                    forward_parents,
+                    backward_parents,
+                )
+            else:
+                frontier, parents, others = (
+                    backward_frontier,
+                    backward_parents,
+                    forward_parents,
+                )
+            next_frontier = []
+            for num in frontier:
+                for neighbor in self._neighbors_of(num):
+                    if neighbor in parents:
+                        continue
+                    parents[neighbor] = num
+                    if neighbor in others:
+                        return _join_paths(forward_parents, backward_parents, neighbor)
+                    next_frontier.append(neighbor)
+            if expand_forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+    def _link(self, player: int, teammate: int) -> TeammateLink:
+        start = self._offsets[player]
+        position = start + self._neighbors_of(player).index(teammate)
+        link_num = self._edge_links[position]
+        return TeammateLink(
+            player_id=self._player_ids[player],
+            teammate_id=self._player_ids[teammate],
+            team_id=self._team_ids[self._link_teams[link_num]],
+            start=date.fromordinal(self._link_starts[link_num]),
+            end=date.fromordinal(self._link_ends[link_num]),
+        )
+
+    def _find_components(self) -> array[int]:
+        components = array("i", [-1]) * len(self._player_ids)
+        for num in range(len(self._player_ids)):
+            if components[num] != -1:
+                continue
+            components[num] = num
+            stack = [num]
+            while stack:
+                current = stack.pop()
+                for neighbor in self._neighbors_of(current):
+                    if components[neighbor] == -1:
+                        components[neighbor] = num
+                        stack.append(neighbor)
+        return components
+
+
+def _join_paths(
+    forward_parents: dict[int, int], backward_parents: dict[int, int], meeting: int
+) -> list[int]:
+    path = []
+    num = meeting
+    while num != -1:
+        path.append(num)
+        num = forward_parents[num]
+    path.reverse()
+    num = backward_parents[meeting]
+    while num != -1:
+        path.append(num)
+        num = backward_parents[num]
+    return path
+
+
+def build_teammate_graph(storage: RosterStorage) -> TeammateGraph:
+    return TeammateGraph(storage.get_teammate_links())
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-from typing import Any
+import logging
+from typing import TYPE_CHECKING, Any
 
-from jinja2 import Environment, PackageLoader, StrictUndefined
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, StrictUndefined
 from markupsafe import Markup
 from picodi import Provide, inject
 
 from cs_wayback_machine.date_util import days_human_readable
+from cs_wayback_machine.spans import timed
 from cs_wayback_machine.web.deps import get_global_data
 from cs_wayback_machine.web.presenters import GlobalDataDTO, player_link, team_link
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
 jinja_env = Environment(
     loader=PackageLoader(__name__, "templates"),
     undefined=StrictUndefined,
@@ -17,6 +24,31 @@ jinja_env = Environment(
 )
 
 
+def configure_templates(*, auto_reload: bool, bytecode_cache_path: Path | None) -> None:
+    """
+    Compiled templates are stored in `bytecode_cache_path` and reused by
+    other workers and after restarts. Without `auto_reload` templates are
+    not checked for changes after the first load.
+    """
+    jinja_env.auto_reload = auto_reload
+    if bytecode_cache_path is None:
+        return
+    try:
+        bytecode_cache_path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        logger.warning("Can't create templates cache in %s", bytecode_cache_path)
+        return
+    jinja_env.bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_path))
+
+
+def compile_templates() -> list[str]:
+    """Load all templates, so they are compiled and stored in the cache"""
+    names = jinja_env.list_templates()
+    for name in names:
+        jinja_env.get_template(name)
+    return names
+
+
 def player_date(date_val: str, raw_val: str | None) -> Markup | str:
     if not raw_val:
         return date_val
@@ -38,6 +70,7 @@ jinja_env.globals.update(
 )
 
 
+@timed("render_html")
 @inject
 def render_html(
     template_name: str,
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from cs_wayback_machine.storage import RosterStorage
+
+# active periods are saved after this number of events of the global timeline
+CHECKPOINT_INTERVAL = 256
+
+
+@dataclass(frozen=True)
+class RosterPeriod:
+    start: date
+    end: date
+    players: tuple[str, ...]
+
+
+class RosterIntervalIndex:
+    """
+    Rosters of teams by date. Periods of a team don't overlap, so they are
+    kept in arrays sorted by start (and end) and found by binary search.
+    Both ends of periods are inclusive, on the day of the roster change
+    the new roster is returned.
+    """
+
+    def __init__(
+        self, periods: Iterable[tuple[str, date, date, Iterable[str]]]
+    ) -> None:
+        """`periods` - (team id, start, end, player ids) sorted by team and start"""
+        self._periods: dict[str, list[RosterPeriod]] = {}
+        for team_id, start, end, players in periods:
+            self._periods.setdefault(team_id, []).append(
+                RosterPeriod(start=start, end=end, players=tuple(players))
+            )
+        self._timeline = RosterTimeline(self._periods)
+        self._starts = {
+            team_id: [period.start for period in team_periods]
+            for team_id, team_periods in self._periods.items()
+        }
+        self._ends = {
+            team_id: [period.end for period in team_periods]
+            for team_id, team_periods in self._periods.items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(team_periods) for team_periods in self._periods.values())
+
+    def at(self, team_id: str, day: date) -> RosterPeriod | None:
+        starts = self._starts.get(team_id)
+        if not starts:
+            return None
+        pos = bisect.bisect_right(starts, day) - 1
+        if pos < 0:
+            return None
+        period = self._periods[team_id][pos]
+        return period if day <= period.end else None
+
+    def between(
+        self, team_id: str, date_from: date, date_to: date
+    ) -> list[RosterPeriod]:
+        """Periods that overlap with `date_from` - `date_to`"""
+        if team_id not in self._periods:
+            return []
+        first = bisect.bisect_left(self._ends[team_id], date_from)
+        last = bisect.bisect_right(self._starts[team_id], date_to)
+        return self._periods[team_id][first:last]
+
+    def snapshot(self, day: date) -> dict[str, RosterPeriod]:
+        """Rosters of all teams on the day, by team id"""
+        return self._timeline.snapshot(day)
+
+
+class RosterTimeline:
+    """
+    Starts and ends of roster periods of all teams in one array sorted by date.
+    Active periods are saved every `checkpoint_interval` events, so a snapshot
+    is restored from the nearest checkpoint and at most that many events
+    instead of checking every team.
+    """
+
+    def __init__(
+        self,
+        periods: dict[str, list[RosterPeriod]],
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+    ) -> None:
+        self._checkpoint_interval = checkpoint_interval
+        self._periods = [
+            (team_id, period)
+            for team_id, team_periods in periods.items()
+            for period in team_periods
+        ]
+        # (date from which the event applies, 1 - start / -1 - end, period num)
+        events = []
+        for num, (_, period) in enumerate(self._periods):
+            events.append((period.start, 1, num))
+            if period.end < date.max:
+                events.append((period.end + timedelta(days=1), -1, num))
+        events.sort()
+        self._event_dates = [event_date for event_date, _, _ in events]
+        self._events = [(change, num) for _, change, num in events]
+
+        self._checkpoints: list[tuple[int, ...]] = []
+        active: set[int] = set()
+        for pos, (change, num) in enumerate(self._events):
+            if pos % checkpoint_interval == 0:
+                self._checkpoints.append(tuple(active))
+            _apply(active, change, num)
+        if len(self._events) % checkpoint_interval == 0:
+            self._checkpoints.append(tuple(active))
+
+    def snapshot(self, day: date) -> dict[str, RosterPeriod]:
+        pos = bisect.bisect_right(self._event_dates, day)
+        checkpoint = pos // self._checkpoint_interval
+        active = set(self._checkpoints[checkpoint])
+        for change, num in self._events[checkpoint * self._checkpoint_interval : pos]:
+            _apply(active, change, num)
+
+        result: dict[str, RosterPeriod] = {}
+        for num in active:
+            team_id, period = self._periods[num]
+            # on the day of the roster change the new roster wins
+            if team_id not in result or result[team_id].start < period.start:
+                result[team_id] = period
+        return dict(sorted(result.items()))
+
+
+def _apply(active: set[int], change: int, num: int) -> None:
+    if change > 0:
+        active.add(num)
+    else:
+        active.discard(num)
+
+
+def build_roster_interval_index(storage: RosterStorage) -> RosterIntervalIndex:
+    return RosterIntervalIndex(storage.get_roster_periods())
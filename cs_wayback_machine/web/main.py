@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import logging
 from typing import TYPE_CHECKING
 
+import anyio
 import picodi
 import sentry_sdk
 from sentry_sdk.integrations.starlette import StarletteIntegration
@@ -12,30 +14,60 @@ from starlette.middleware import Middleware
 from starlette_exporter import PrometheusMiddleware
 
 from cs_wayback_machine.deps import get_settings
-from cs_wayback_machine.web.middleware import ClosingSlashMiddleware
+from cs_wayback_machine.web.html_render import configure_templates
+from cs_wayback_machine.web.middleware import (
+    ClosingSlashMiddleware,
+    ServerTimingMiddleware,
+)
+from cs_wayback_machine.web.profiling import ProfilingMiddleware
 from cs_wayback_machine.web.routes import routes
 from cs_wayback_machine.web.views import not_found_view, server_error_view
+from cs_wayback_machine.web.warmup import warm_up
 
 if TYPE_CHECKING:
     from collections.abc import AsyncGenerator
 
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 
 @contextlib.asynccontextmanager
-async def lifespan(app: Starlette) -> AsyncGenerator[None]:  # noqa: U100
+async def lifespan(app: Starlette) -> AsyncGenerator[None]:
+    app.state.ready = False
     await picodi.init_dependencies()
+    # warm-up runs in background, so the worker can answer /ready/ meanwhile
+    warmup_task = asyncio.create_task(_warm_up(app))
     try:
         yield
     finally:
+        warmup_task.cancel()
         await picodi.shutdown_dependencies()  # noqa: ASYNC102
 
 
+async def _warm_up(app: Starlette) -> None:
+    try:
+        await anyio.to_thread.run_sync(warm_up)
+    except Exception:  # noqa: PIE786
+        # cold worker is better than no worker
+        logger.exception("Warm-up failed")
+    app.state.ready = True
+
+
+settings = get_settings()
+configure_templates(
+    auto_reload=settings.templates_auto_reload,
+    bytecode_cache_path=settings.templates_cache_path,
+)
+
 middleware = [
     Middleware(ClosingSlashMiddleware),
     Middleware(PrometheusMiddleware, app_name="cs_wayback_machine_web"),
 ]
+if settings.server_timing:
+    middleware.append(Middleware(ServerTimingMiddleware))
+if settings.admin_token:
+    middleware.append(Middleware(ProfilingMiddleware))
 
 exception_handlers = {
     404: not_found_view,
@@ -49,8 +81,6 @@ app = Starlette(
     exception_handlers=exception_handlers,
 )
 
-settings = get_settings()
-
 if settings.sentry_dsn:
     sentry_sdk.init(
         dsn=settings.sentry_dsn,
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING
 
+from starlette.datastructures import MutableHeaders
+
+from cs_wayback_machine.spans import collect_spans, server_timing_header
+
 if TYPE_CHECKING:
-    from starlette.types import ASGIApp, Receive, Scope, Send
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
 class ClosingSlashMiddleware:
@@ -15,3 +20,31 @@ class ClosingSlashMiddleware:
             scope["path"] = f"{scope['path']}/"
             scope["raw_path"] = scope["path"].encode("utf-8")
         await self.app(scope, receive, send)
+
+
+class ServerTimingMiddleware:
+    """
+    Collect spans of the request and report them in `Server-Timing` header
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with collect_spans() as spans:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    total = ("total", time.perf_counter() - start)
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing", server_timing_header([*spans, total])
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
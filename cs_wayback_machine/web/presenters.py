@@ -3,15 +3,20 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import date, timedelta
 from typing import TYPE_CHECKING
+from urllib.parse import quote
 
 from cs_wayback_machine.date_util import DateRange, days_human_readable
 from cs_wayback_machine.roster import create_rosters
+from cs_wayback_machine.spans import timed
 from cs_wayback_machine.web.slugify import slugify
 
 if TYPE_CHECKING:
     from cs_wayback_machine.entities import Roster, RosterPlayer
-    from cs_wayback_machine.statistics import StatisticsCalculator
+    from cs_wayback_machine.statistics import StatisticsCalculator, StatisticsCube
     from cs_wayback_machine.storage import RosterStorage
+    from cs_wayback_machine.web.graph import TeammateLink
+    from cs_wayback_machine.web.intervals import RosterPeriod
+    from cs_wayback_machine.web.transfers import TeamFlow, Transfer, TransferIndex
 
 
 @dataclass
@@ -90,6 +95,7 @@ class TeamRostersPresenter:
             rosters=rosters,
         )
 
+    @timed("prepare_rosters")
     def _prepare_rosters(
         self, rosters: list[Roster], date_from: date, date_to: date, highlight: str
     ) -> list[RosterDTO]:
@@ -220,12 +226,221 @@ class TableDTO:
     rows: list[list[RowValueDTO]]
 
 
+@dataclass
+class FilterLinkDTO:
+    title: str
+    url: str
+    selected: bool
+
+
 @dataclass
 class MainPageDTO:
-    search_items: list[str]
+    filters: list[FilterLinkDTO]
+    statistics: list[TableDTO]
+
+
+@dataclass
+class SnapshotTeamDTO:
+    team_id: str
+    url: str
+    period: str
+    players: list[str]
+
+
+@dataclass
+class SnapshotDTO:
+    date: str
+    date_title: str
+    teams: list[SnapshotTeamDTO]
+
+
+def present_snapshot(rosters: dict[str, RosterPeriod], day: date) -> SnapshotDTO:
+    return SnapshotDTO(
+        date=day.isoformat(),
+        date_title=_format_date(day),
+        teams=[
+            SnapshotTeamDTO(
+                team_id=team_id,
+                url=team_link(team_id, period.start, period.end),
+                period=f"{_format_date(period.start)} - {_format_date(period.end)}",
+                players=list(period.players),
+            )
+            for team_id, period in rosters.items()
+        ],
+    )
+
+
+@dataclass
+class ConnectionLinkDTO:
+    player_id: str
+    player_url: str
+    teammate_id: str
+    teammate_url: str
+    team_id: str
+    team_url: str
+    period: str
+
+
+@dataclass
+class ConnectionDTO:
+    player_from: str
+    player_to: str
+    searched: bool
+    links: list[ConnectionLinkDTO] | None
+
+
+def present_connection(
+    player_from: str, player_to: str, links: list[TeammateLink] | None
+) -> ConnectionDTO:
+    """`links` is None if there is no connection"""
+    return ConnectionDTO(
+        player_from=player_from,
+        player_to=player_to,
+        searched=bool(player_from and player_to),
+        links=(
+            None
+            if links is None
+            else [
+                ConnectionLinkDTO(
+                    player_id=link.player_id,
+                    player_url=player_link(link.player_id),
+                    teammate_id=link.teammate_id,
+                    teammate_url=player_link(link.teammate_id),
+                    team_id=link.team_id,
+                    team_url=team_link(
+                        link.team_id, link.start, link.end, highlight=link.player_id
+                    ),
+                    period=f"{_format_date(link.start)} - {_format_date(link.end)}",
+                )
+                for link in links
+            ]
+        ),
+    )
+
+
+@dataclass
+class TransfersDTO:
+    title: str
+    team_id: str | None
+    years: list[FilterLinkDTO]
     statistics: list[TableDTO]
 
 
+def present_transfers(
+    index: TransferIndex, *, year: int | None, team_id: str | None, limit: int
+) -> TransfersDTO:
+    years = [
+        FilterLinkDTO(
+            title=str(item) if item else "All time",
+            url=transfers_link(team_id, item),
+            selected=item == year,
+        )
+        for item in [None, *index.years]
+    ]
+    period = str(year) if year else "all time"
+    if team_id is None:
+        title = f"Transfers of {period}"
+        statistics = _present_transfer_routes(index, year=year, limit=limit)
+    else:
+        title = f"Transfers of {team_id}"
+        statistics = _present_team_transfers(index, team_id, year=year, limit=limit)
+    return TransfersDTO(
+        title=title, team_id=team_id, years=years, statistics=statistics
+    )
+
+
+def _present_transfer_routes(
+    index: TransferIndex, *, year: int | None, limit: int
+) -> list[TableDTO]:
+    net_flow = index.net_flow(year=year)
+    flow_headers = ["Team", "Joined", "Left", "Net"]
+
+    def flow_row(flow: TeamFlow) -> list[RowValueDTO]:
+        return [
+            RowValueDTO(flow.team_id, is_team_id=True),
+            RowValueDTO(str(flow.inbound)),
+            RowValueDTO(str(flow.outbound)),
+            RowValueDTO(f"{flow.net:+d}"),
+        ]
+
+    return [
+        TableDTO(
+            title=f"TOP{limit} Transfer routes",
+            headers=["From team", "To team", "Transfers"],
+            rows=[
+                [
+                    RowValueDTO(route.from_team_id, is_team_id=True),
+                    RowValueDTO(route.to_team_id, is_team_id=True),
+                    RowValueDTO(str(route.transfers)),
+                ]
+                for route in index.top_routes(year=year, limit=limit)
+            ],
+        ),
+        TableDTO(
+            title=f"TOP{limit} Teams by players gained",
+            headers=flow_headers,
+            rows=[flow_row(flow) for flow in net_flow[:limit] if flow.net > 0],
+        ),
+        TableDTO(
+            title=f"TOP{limit} Teams by players lost",
+            headers=flow_headers,
+            rows=[flow_row(flow) for flow in net_flow[::-1][:limit] if flow.net < 0],
+        ),
+    ]
+
+
+def _present_team_transfers(
+    index: TransferIndex, team_id: str, *, year: int | None, limit: int
+) -> list[TableDTO]:
+    def in_year(transfer: Transfer) -> bool:
+        return year is None or transfer.joined_date.year == year
+
+    inbound = [item for item in index.inbound(team_id) if in_year(item)]
+    outbound = [item for item in index.outbound(team_id) if in_year(item)]
+    return [
+        TableDTO(
+            title="Transfers by year",
+            headers=["Year", "Joined", "Left", "Net"],
+            rows=[
+                [
+                    RowValueDTO(str(flow_year)),
+                    RowValueDTO(str(flow.inbound)),
+                    RowValueDTO(str(flow.outbound)),
+                    RowValueDTO(f"{flow.net:+d}"),
+                ]
+                for flow_year, flow in sorted(
+                    index.team_flow(team_id).items(), reverse=True
+                )
+                if year is None or flow_year == year
+            ],
+        ),
+        TableDTO(
+            title=f"Last {limit} joined players",
+            headers=["Player", "From team", "Joined"],
+            rows=[
+                [
+                    RowValueDTO(item.player_id, is_player_id=True),
+                    RowValueDTO(item.from_team_id, is_team_id=True),
+                    RowValueDTO(_format_date(item.joined_date)),
+                ]
+                for item in inbound[:limit]
+            ],
+        ),
+        TableDTO(
+            title=f"Last {limit} left players",
+            headers=["Player", "To team", "Left"],
+            rows=[
+                [
+                    RowValueDTO(item.player_id, is_player_id=True),
+                    RowValueDTO(item.to_team_id, is_team_id=True),
+                    RowValueDTO(_format_date(item.left_date)),
+                ]
+                for item in outbound[:limit]
+            ],
+        ),
+    ]
+
+
 def present_available_ids(rosters_storage: RosterStorage) -> list[str]:
     team_names = sorted(rosters_storage.get_team_names())
     player_names = sorted(rosters_storage.get_player_names())
@@ -234,23 +449,100 @@ def present_available_ids(rosters_storage: RosterStorage) -> list[str]:
     ]
 
 
+# the longest top of statistics by year and game version on the main page
+STATISTICS_CUBE_LIMIT = 10
+
+
 class MainPagePresenter:
     def __init__(
         self,
         *,
-        rosters_storage: RosterStorage,
         statistics_calculator: StatisticsCalculator,
+        statistics_cube: StatisticsCube,
     ) -> None:
-        self._rosters_storage = rosters_storage
         self._statistics_calculator = statistics_calculator
+        self._statistics_cube = statistics_cube
 
-    def present(self) -> MainPageDTO:
+    def present(
+        self, *, year: int | None = None, game_version: str | None = None
+    ) -> MainPageDTO:
+        """With `year` or `game_version` only statistics of the cube are shown"""
+        cube = self._statistics_cube
+        filters = [
+            FilterLinkDTO(
+                title="All time",
+                url="/",
+                selected=year is None and game_version is None,
+            ),
+            *[
+                FilterLinkDTO(
+                    title=item,
+                    url=f"/?game_version={quote(item)}",
+                    selected=item == game_version,
+                )
+                for item in cube.game_versions
+            ],
+            *[
+                FilterLinkDTO(
+                    title=str(item), url=f"/?year={item}", selected=item == year
+                )
+                for item in cube.years
+            ],
+        ]
+        most_teams, most_players = self._build_bucketed_statistics(
+            year=year, game_version=game_version
+        )
+        if year is not None or game_version is not None:
+            return MainPageDTO(filters=filters, statistics=[most_teams, most_players])
         return MainPageDTO(
-            search_items=present_available_ids(self._rosters_storage),
-            statistics=self._build_statistics(),
+            filters=filters,
+            statistics=self._build_statistics(most_teams, most_players),
         )
 
-    def _build_statistics(self) -> list[TableDTO]:
+    def _build_bucketed_statistics(
+        self, *, year: int | None, game_version: str | None
+    ) -> tuple[TableDTO, TableDTO]:
+        cube = self._statistics_cube
+        bucket = year or game_version
+        return (
+            TableDTO(
+                title="TOP5 Players with most teams"
+                + (f" in {bucket}" if bucket else ""),
+                headers=["Player", "Number of teams"],
+                rows=[
+                    [
+                        RowValueDTO(item[0], is_player_id=True),
+                        RowValueDTO(str(item[1])),
+                    ]
+                    for item in cube.top(
+                        "players_with_most_teams",
+                        year=year,
+                        game_version=game_version,
+                        limit=5,
+                    )
+                ],
+            ),
+            TableDTO(
+                title=f"TOP10 Teams with most players in {bucket or 'history'}",
+                headers=["Team name", "Number of players"],
+                rows=[
+                    [
+                        RowValueDTO(item[0], is_team_id=True),
+                        RowValueDTO(str(item[1])),
+                    ]
+                    for item in cube.top(
+                        "teams_with_most_players",
+                        year=year,
+                        game_version=game_version,
+                        limit=10,
+                    )
+                ],
+            ),
+        )
+
+    def _build_statistics(
+        self, most_teams: TableDTO, most_players: TableDTO
+    ) -> list[TableDTO]:
         calc = self._statistics_calculator
 
         def format_days_description(days: int) -> str | None:
@@ -274,17 +566,7 @@ class MainPagePresenter:
                     for item in calc.players_with_most_days_in_current_team(limit=5)
                 ],
             ),
-            TableDTO(
-                title="TOP5 Players with most teams",
-                headers=["Player", "Number of teams"],
-                rows=[
-                    [
-                        RowValueDTO(item[0], is_player_id=True),
-                        RowValueDTO(str(item[1])),
-                    ]
-                    for item in calc.players_with_most_teams(limit=5)
-                ],
-            ),
+            most_teams,
             TableDTO(
                 title="TOP10 Players with most teammates",
                 headers=["Player", "Number of teammates"],
@@ -311,17 +593,7 @@ class MainPagePresenter:
                     for item in calc.get_teammate_pair_with_most_time(limit=10)
                 ],
             ),
-            TableDTO(
-                title="TOP10 Teams with most players in history",
-                headers=["Team name", "Number of players"],
-                rows=[
-                    [
-                        RowValueDTO(item[0], is_team_id=True),
-                        RowValueDTO(str(item[1])),
-                    ]
-                    for item in calc.teams_with_most_players(limit=10)
-                ],
-            ),
+            most_players,
             TableDTO(
                 title="TOP10 Countries by active players",
                 headers=["Country", "Number of active players"],
@@ -479,3 +751,13 @@ def team_link(
         params.append(f"hl={highlight}")
     url = f"/teams/{slugify(team_id)}/"
     return f"{url}?{'&'.join(params)}" if params else url
+
+
+def transfers_link(team_id: str | None = None, year: int | None = None) -> str:
+    params = []
+    if team_id:
+        params.append(f"team={slugify(team_id)}")
+    if year:
+        params.append(f"year={year}")
+    url = "/transfers/"
+    return f"{url}?{'&'.join(params)}" if params else url
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import FrameType
+
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+# (file, function) of the innermost frame of threads that are waiting for work
+IDLE_FRAMES = frozenset(
+    [
+        ("threading.py", "wait"),
+        ("queue.py", "get"),
+        ("selectors.py", "select"),
+    ]
+)
+
+
+class SamplingProfiler:
+    """
+    Samples stacks of all threads every `interval` seconds from a background
+    thread and aggregates them in collapsed-stack format (as used by
+    flamegraph.pl and speedscope). Samples are taken only while `gate` returns
+    True, idle threads are skipped.
+    """
+
+    def __init__(
+        self, *, interval: float = 0.005, gate: Callable[[], bool] | None = None
+    ) -> None:
+        self._interval = interval
+        self._gate = gate
+        self._stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return "".join(
+            f"{stack} {count}\n" for stack, count in sorted(self._stacks.items())
+        )
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self._interval):
+            if self._gate is not None and not self._gate():
+                continue
+            thread_names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or _is_idle(frame):
+                    continue
+                thread_name = thread_names.get(thread_id, str(thread_id))
+                self._stacks[_collapse(thread_name, frame)] += 1
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES
+
+
+def _collapse(thread_name: str, frame: FrameType | None) -> str:
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        path = Path(code.co_filename)
+        labels.append(f"{code.co_name} ({path.parent.name}/{path.name})")
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class RequestsProfiling:
+    """Profiling of the next `count` requests with path matching `path_pattern`"""
+
+    def __init__(self, path_pattern: str, count: int) -> None:
+        self.path_pattern = re.compile(path_pattern)
+        self.in_flight = 0
+        self._remaining = count
+        self.done = asyncio.Event()
+
+    def matches(self, path: str) -> bool:
+        return self._remaining > 0 and bool(self.path_pattern.search(path))
+
+    def enter(self) -> None:
+        self._remaining -= 1
+        self.in_flight += 1
+
+    def exit(self) -> None:
+        self.in_flight -= 1
+        if self._remaining <= 0 and self.in_flight == 0:
+            self.done.set()
+
+
+class ProfilingState:
+    def __init__(self) -> None:
+        self.busy = False
+        self.requests_profiling: RequestsProfiling | None = None
+
+
+profiling_state = ProfilingState()
+
+
+async def profile_for(seconds: float, *, interval: float) -> str:
+    profiler = SamplingProfiler(interval=interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        result = profiler.stop()
+    return result
+
+
+async def profile_requests(
+    path_pattern: str, count: int, *, max_seconds: float, interval: float
+) -> str:
+    """
+    Profile the next `count` matching requests. Stacks are sampled only
+    while some of them are in flight, so concurrent requests to other
+    pages can get into the profile too.
+    """
+    profiling = RequestsProfiling(path_pattern, count)
+    profiler = SamplingProfiler(interval=interval, gate=lambda: profiling.in_flight > 0)
+    profiling_state.requests_profiling = profiling
+    profiler.start()
+    try:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(profiling.done.wait(), max_seconds)
+    finally:
+        profiling_state.requests_profiling = None
+        result = profiler.stop()
+    return result
+
+
+class ProfilingMiddleware:
+    """Marks requests that should be profiled by `profile_requests`"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiling = profiling_state.requests_profiling
+        if (
+            profiling is None
+            or scope["type"] != "http"
+            or not profiling.matches(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiling.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiling.exit()
@@ -4,20 +4,48 @@ from starlette_exporter import handle_metrics
 
 from cs_wayback_machine.web import ROOT_DIR
 from cs_wayback_machine.web.views import (
+    batch_api_view,
+    connection_api_view,
+    connection_view,
     entities_view,
+    export_view,
     goto_view,
     main_page_view,
+    player_api_view,
     player_detail_view,
+    profile_view,
+    ready_view,
+    rosters_api_view,
+    search_view,
+    snapshot_api_view,
+    snapshot_view,
+    team_api_view,
     team_detail_view,
+    transfers_api_view,
+    transfers_view,
 )
 
 routes = [
     Route("/", main_page_view, methods=["get"]),
     Route("/api/entities/", entities_view, methods=["get"]),
+    Route("/api/search/", search_view, methods=["get"]),
+    Route("/api/teams/{team_id}/", team_api_view, methods=["get"]),
+    Route("/api/players/{player_id}/", player_api_view, methods=["get"]),
+    Route("/api/batch/", batch_api_view, methods=["post"]),
+    Route("/api/rosters/", rosters_api_view, methods=["get"]),
+    Route("/api/snapshot/", snapshot_api_view, methods=["get"]),
+    Route("/api/connection/", connection_api_view, methods=["get"]),
+    Route("/api/transfers/", transfers_api_view, methods=["get"]),
+    Route("/api/export/{table}/", export_view, methods=["get"]),
     Route("/goto/", goto_view, methods=["get"]),
     Route("/teams/{team_id}/", team_detail_view, methods=["get"]),
     Route("/players/{player_id}/", player_detail_view, methods=["get"]),
+    Route("/snapshot/", snapshot_view, methods=["get"]),
+    Route("/connection/", connection_view, methods=["get"]),
+    Route("/transfers/", transfers_view, methods=["get"]),
     Route("/metrics/", handle_metrics),
+    Route("/ready/", ready_view, methods=["get"]),
+    Route("/admin/profile/", profile_view, methods=["get"]),
     Mount(
         "/",
         app=StaticFiles(directory=ROOT_DIR / "public"),
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import bisect
+import re
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING
+
+from cs_wayback_machine.web.aliases import fold
+from cs_wayback_machine.web.presenters import present_available_ids
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from cs_wayback_machine.statistics import StatisticsCalculator
+    from cs_wayback_machine.storage import RosterStorage
+
+MAX_RESULTS = 100
+# results of queries up to this length are precomputed
+SHORT_QUERY_LENGTH = 2
+# prefix matches of longer queries are scanned up to this number
+MAX_PREFIX_CANDIDATES = 1000
+MIN_FUZZY_QUERY_LENGTH = 3
+MIN_FUZZY_SIMILARITY = 0.3
+
+# match kinds, lower is better
+EXACT_MATCH = 0
+NAME_PREFIX_MATCH = 1
+WORD_PREFIX_MATCH = 2
+FUZZY_MATCH = 3
+
+_WORD_SEPARATOR_RE = re.compile(r"[\W_]+")
+ENTITY_KINDS = ("team", "player")
+
+
+class SearchIndex:
+    """
+    In-memory index of entity ids (`team:<name>`, `player:<name>`).
+    Names are matched by prefix of the whole name or any of its words,
+    and by trigram similarity if there are not enough prefix matches.
+    Matches of the same kind are ordered by `scores` (popularity) of entities.
+    Queries like `team:<name>` match only entities of that kind.
+    """
+
+    def __init__(
+        self, entity_ids: Iterable[str], scores: dict[str, float] | None = None
+    ) -> None:
+        self._entity_ids = list(entity_ids)
+        self._kinds = [entity_id.partition(":")[0] for entity_id in self._entity_ids]
+        self._names = [
+            normalize(entity_id.partition(":")[2]) for entity_id in self._entity_ids
+        ]
+        scores = scores or {}
+        self._scores = [scores.get(entity_id, 0.0) for entity_id in self._entity_ids]
+
+        keys = []
+        for entity_num, name in enumerate(self._names):
+            keys.append((name, entity_num))
+            keys.extend((word, entity_num) for word in _words(name)[1:])
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._key_entities = [entity_num for _, entity_num in keys]
+
+        self._trigrams: dict[str, list[int]] = defaultdict(list)
+        self._trigram_counts = []
+        for entity_num, name in enumerate(self._names):
+            trigrams = _trigrams(name)
+            self._trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self._trigrams[trigram].append(entity_num)
+
+        # short prefixes match too many names to rank them on every request
+        self._short_query_results = {
+            prefix: self._rank(self._prefix_matches(prefix, max_candidates=None))[
+                :MAX_RESULTS
+            ]
+            for prefix in {key[:length] for key in self._keys for length in (1, 2)}
+        }
+
+    def __len__(self) -> int:
+        return len(self._entity_ids)
+
+    def search(self, query: str, *, limit: int = 10) -> list[str]:
+        kind, separator, name = query.partition(":")
+        kind = kind.strip().lower()
+        if separator and kind in ENTITY_KINDS:
+            query = name
+        else:
+            kind = ""
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) <= SHORT_QUERY_LENGTH:
+            best = [
+                entity_num
+                for entity_num in self._short_query_results.get(query, [])
+                if not kind or self._kinds[entity_num] == kind
+            ]
+        else:
+            matches = self._prefix_matches(query, max_candidates=MAX_PREFIX_CANDIDATES)
+            if len(matches) < limit and len(query) >= MIN_FUZZY_QUERY_LENGTH:
+                for entity_num, similarity in self._similar(query).items():
+                    if entity_num not in matches:
+                        matches[entity_num] = (FUZZY_MATCH, -similarity)
+            if kind:
+                matches = {
+                    entity_num: match
+                    for entity_num, match in matches.items()
+                    if self._kinds[entity_num] == kind
+                }
+            best = self._rank(matches)
+        return [self._entity_ids[entity_num] for entity_num in best[:limit]]
+
+    def _prefix_matches(
+        self, query: str, *, max_candidates: int | None
+    ) -> dict[int, tuple[int, float]]:
+        """Entity num -> (match kind, 0) for names with a word starting with query"""
+        matches: dict[int, tuple[int, float]] = {}
+        start = bisect.bisect_left(self._keys, query)
+        end = len(self._keys)
+        if max_candidates is not None:
+            end = min(end, start + max_candidates)
+        for pos in range(start, end):
+            if not self._keys[pos].startswith(query):
+                break
+            entity_num = self._key_entities[pos]
+            name = self._names[entity_num]
+            if name == query:
+                kind = EXACT_MATCH
+            elif name.startswith(query):
+                kind = NAME_PREFIX_MATCH
+            else:
+                kind = WORD_PREFIX_MATCH
+            matches[entity_num] = min(matches.get(entity_num, (kind, 0.0)), (kind, 0.0))
+        return matches
+
+    def _rank(self, matches: dict[int, tuple[int, float]]) -> list[int]:
+        """Order by match kind, similarity, score, then shorter names first"""
+        return sorted(
+            matches,
+            key=lambda num: (
+                *matches[num],
+                -self._scores[num],
+                len(self._names[num]),
+                self._names[num],
+            ),
+        )
+
+    def _similar(self, query: str) -> dict[int, float]:
+        """Jaccard similarity of trigram sets for entities with common trigrams"""
+        query_trigrams = _trigrams(query)
+        shared: Counter[int] = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        result = {}
+        for entity_num, count in shared.items():
+            similarity = count / (
+                len(query_trigrams) + self._trigram_counts[entity_num] - count
+            )
+            if similarity >= MIN_FUZZY_SIMILARITY:
+                result[entity_num] = similarity
+        return result
+
+
+def normalize(value: str) -> str:
+    return " ".join(_words(value))
+
+
+def _words(value: str) -> list[str]:
+    return [word for word in _WORD_SEPARATOR_RE.split(fold(value)) if word]
+
+
+def _trigrams(name: str) -> set[str]:
+    padded = f"  {name} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def build_search_index(
+    storage: RosterStorage, statistics_calculator: StatisticsCalculator
+) -> SearchIndex:
+    popularity = statistics_calculator.entity_popularity()
+    scores = {f"{kind}:{entity_id}": score for kind, entity_id, score in popularity}
+    return SearchIndex(present_available_ids(storage), scores)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import date
+
+    from cs_wayback_machine.storage import RosterStorage
+
+
+@dataclass(frozen=True)
+class Transfer:
+    player_id: str
+    from_team_id: str
+    to_team_id: str
+    left_date: date
+    joined_date: date
+
+
+@dataclass(frozen=True)
+class TransferRoute:
+    from_team_id: str
+    to_team_id: str
+    transfers: int
+
+
+@dataclass(frozen=True)
+class TeamFlow:
+    team_id: str
+    inbound: int
+    outbound: int
+    net: int
+
+
+class TransferIndex:
+    """
+    Transfers and their aggregates, all computed when the index is built.
+    Transfers belong to the year the player joined the new team,
+    aggregates for all time are stored under the `None` year.
+    """
+
+    def __init__(self, transfers: Iterable[tuple[str, str, str, date, date]]) -> None:
+        """`transfers` - (player id, from team, to team, left, joined)"""
+        self._transfers = [Transfer(*transfer) for transfer in transfers]
+        self._transfers.sort(key=lambda item: item.joined_date, reverse=True)
+
+        self._inbound: dict[str, list[Transfer]] = {}
+        self._outbound: dict[str, list[Transfer]] = {}
+        routes: dict[int | None, Counter[tuple[str, str]]] = {}
+        flows: dict[int | None, dict[str, list[int]]] = {}
+        for transfer in self._transfers:
+            self._inbound.setdefault(transfer.to_team_id, []).append(transfer)
+            self._outbound.setdefault(transfer.from_team_id, []).append(transfer)
+            for year in (None, transfer.joined_date.year):
+                route = (transfer.from_team_id, transfer.to_team_id)
+                routes.setdefault(year, Counter())[route] += 1
+                year_flows = flows.setdefault(year, {})
+                year_flows.setdefault(transfer.to_team_id, [0, 0])[0] += 1
+                year_flows.setdefault(transfer.from_team_id, [0, 0])[1] += 1
+
+        self.years = sorted(year for year in flows if year is not None)
+        self._routes = {
+            year: [
+                TransferRoute(from_team_id, to_team_id, count)
+                for (from_team_id, to_team_id), count in sorted(
+                    counter.items(), key=lambda item: (-item[1], item[0])
+                )
+            ]
+            for year, counter in routes.items()
+        }
+        # from the biggest gain to the biggest loss of players
+        self._net_flow = {
+            year: sorted(
+                (
+                    TeamFlow(team_id, inbound, outbound, inbound - outbound)
+                    for team_id, (inbound, outbound) in year_flows.items()
+                ),
+                key=lambda flow: (-flow.net, flow.team_id),
+            )
+            for year, year_flows in flows.items()
+        }
+        self._team_flow: dict[str, dict[int, TeamFlow]] = {}
+        for year in self.years:
+            for flow in self._net_flow[year]:
+                self._team_flow.setdefault(flow.team_id, {})[year] = flow
+
+    def __len__(self) -> int:
+        return len(self._transfers)
+
+    def top_routes(self, *, year: int | None = None, limit: int) -> list[TransferRoute]:
+        return self._routes.get(year, [])[:limit]
+
+    def net_flow(self, *, year: int | None = None) -> list[TeamFlow]:
+        """Inbound and outbound transfers of teams, sorted by net gain"""
+        return self._net_flow.get(year, [])
+
+    def team_flow(self, team_id: str) -> dict[int, TeamFlow]:
+        """Transfers of the team by year"""
+        return self._team_flow.get(team_id, {})
+
+    def inbound(self, team_id: str) -> list[Transfer]:
+        """Transfers to the team, newest first"""
+        return self._inbound.get(team_id, [])
+
+    def outbound(self, team_id: str) -> list[Transfer]:
+        """Transfers from the team, newest first"""
+        return self._outbound.get(team_id, [])
+
+
+def build_transfer_index(storage: RosterStorage, *, max_gap_days: int) -> TransferIndex:
+    return TransferIndex(storage.get_transfers(max_gap_days=max_gap_days))
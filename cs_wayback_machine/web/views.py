@@ -1,55 +1,117 @@
 from __future__ import annotations
 
+import hmac
+import math
+import re
 from datetime import date
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+import orjson
 from picodi import Provide, inject
-from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from starlette.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 
-from cs_wayback_machine.deps import get_rosters_storage, get_statistics_calculator
+from cs_wayback_machine.deps import (
+    get_rosters_storage,
+    get_settings,
+    get_statistics_calculator,
+)
+from cs_wayback_machine.export import EXPORT_QUERIES
+from cs_wayback_machine.web.api import MAX_BATCH_IDS, parse_batch_request
+from cs_wayback_machine.web.deps import (
+    get_alias_index_cache,
+    get_entity_api,
+    get_export_file_cache,
+    get_roster_interval_index_cache,
+    get_search_index_cache,
+    get_statistics_cube_cache,
+    get_teammate_graph_cache,
+    get_transfer_index_cache,
+)
 from cs_wayback_machine.web.html_render import render_404, render_html
 from cs_wayback_machine.web.presenters import (
     MainPagePresenter,
     PlayerPagePresenter,
     TeamRostersPresenter,
+    player_link,
     present_available_ids,
+    present_connection,
+    present_snapshot,
+    present_transfers,
+    team_link,
+)
+from cs_wayback_machine.web.profiling import (
+    profile_for,
+    profile_requests,
+    profiling_state,
 )
+from cs_wayback_machine.web.search import MAX_RESULTS
 from cs_wayback_machine.web.slugify import slugify
 
 if TYPE_CHECKING:
     from starlette.requests import Request
 
-    from cs_wayback_machine.statistics import StatisticsCalculator
-    from cs_wayback_machine.storage import RosterStorage
+    from cs_wayback_machine.export import ExportFileCache
+    from cs_wayback_machine.settings import Settings
+    from cs_wayback_machine.statistics import StatisticsCalculator, StatisticsCube
+    from cs_wayback_machine.storage import GenerationCache, RosterStorage
+    from cs_wayback_machine.web.aliases import AliasIndex
+    from cs_wayback_machine.web.api import EntityApi
+    from cs_wayback_machine.web.graph import TeammateGraph, TeammateLink
+    from cs_wayback_machine.web.intervals import RosterIntervalIndex, RosterPeriod
+    from cs_wayback_machine.web.search import SearchIndex
+    from cs_wayback_machine.web.transfers import TransferIndex
 
 
 @inject
 def main_page_view(
-    request: Request,  # noqa: U100
-    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    request: Request,
     statistics_calculator: StatisticsCalculator = Provide(get_statistics_calculator),
+    statistics_cube_cache: GenerationCache[StatisticsCube] = Provide(
+        get_statistics_cube_cache
+    ),
 ) -> Response:
     presenter = MainPagePresenter(
-        rosters_storage=rosters_storage, statistics_calculator=statistics_calculator
+        statistics_calculator=statistics_calculator,
+        statistics_cube=statistics_cube_cache.get(),
+    )
+    result = presenter.present(
+        year=_parse_year(request.query_params.get("year", "")),
+        game_version=request.query_params.get("game_version") or None,
     )
-    result = presenter.present()
     html = render_html("main_page.jinja2", result)
     return HTMLResponse(html)
 
 
-def goto_view(request: Request) -> Response:
+@inject
+def goto_view(
+    request: Request,
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+) -> Response:
     query = request.query_params.get("q", "")
     if not query:
         return RedirectResponse(url="/")
 
-    url_template = "/teams/{slug}/"
-    value = query.removeprefix("team:")
+    aliases = alias_index_cache.get()
     if query.startswith("player:"):
-        url_template = "/players/{slug}/"
         value = query.removeprefix("player:")
+        if player_id := aliases.player(value):
+            return RedirectResponse(url=player_link(player_id))
+        return RedirectResponse(url=player_link(value))
 
-    slug = slugify(value)
-    return RedirectResponse(url=url_template.format(slug=slug))
+    value = query.removeprefix("team:")
+    if team_id := aliases.team(value):
+        return RedirectResponse(url=team_link(team_id))
+    if not query.startswith("team:") and (player_id := aliases.player(value)):
+        return RedirectResponse(url=player_link(player_id))
+    return RedirectResponse(url=team_link(value))
 
 
 @inject
@@ -61,11 +123,33 @@ def entities_view(
     return JSONResponse(result)
 
 
+@inject
+def search_view(
+    request: Request,
+    search_index_cache: GenerationCache[SearchIndex] = Provide(get_search_index_cache),
+) -> Response:
+    query = request.query_params.get("q", "")
+    try:
+        limit = int(request.query_params.get("limit", "10"))
+    except ValueError:
+        limit = 10
+    limit = max(1, min(limit, MAX_RESULTS))
+    return JSONResponse(search_index_cache.get().search(query, limit=limit))
+
+
 @inject
 def team_detail_view(
-    request: Request, rosters_storage: RosterStorage = Provide(get_rosters_storage)
+    request: Request,
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
 ) -> Response:
-    team_id = slugify.reverse(request.path_params["team_id"])
+    requested_id = slugify.reverse(request.path_params["team_id"])
+    team_id = alias_index_cache.get().team(requested_id)
+    if team_id is None:
+        return HTMLResponse(content=render_404(), status_code=404)
+    # ids with `_` can't be restored from the URL, so they are compared by URL
+    if slugify.reverse(slugify(team_id)) != requested_id:
+        return _redirect_to_canonical(request, team_link(team_id))
     date_from = _parse_date(request.query_params.get("from", ""))
     date_to = _parse_date(request.query_params.get("to", ""))
     highlight = request.query_params.get("hl", "").strip()
@@ -78,6 +162,19 @@ def team_detail_view(
     return HTMLResponse(html)
 
 
+def _redirect_to_canonical(request: Request, path: str) -> Response:
+    """
+    Redirect from the alias to the page of the entity, temporary because
+    the alias can point to another entity after the data is updated
+    """
+    url = f"{path}?{request.url.query}" if request.url.query else path
+    return RedirectResponse(url=url, status_code=302)
+
+
+def _parse_year(value: str) -> int | None:
+    return int(value) if value.isdigit() else None
+
+
 def _parse_date(value: str) -> date | None:
     try:
         return date.fromisoformat(value)
@@ -87,9 +184,16 @@ def _parse_date(value: str) -> date | None:
 
 @inject
 def player_detail_view(
-    request: Request, rosters_storage: RosterStorage = Provide(get_rosters_storage)
+    request: Request,
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
 ) -> Response:
-    player_id = slugify.reverse(request.path_params["player_id"])
+    requested_id = slugify.reverse(request.path_params["player_id"])
+    player_id = alias_index_cache.get().player(requested_id)
+    if player_id is None:
+        return HTMLResponse(content=render_404(), status_code=404)
+    if slugify.reverse(slugify(player_id)) != requested_id:
+        return _redirect_to_canonical(request, player_link(player_id))
     presenter = PlayerPagePresenter(rosters_storage=rosters_storage)
     result = presenter.present(player_id)
     if result is None:
@@ -98,6 +202,317 @@ def player_detail_view(
     return HTMLResponse(html)
 
 
+@inject
+def team_api_view(
+    request: Request, entity_api: EntityApi = Provide(get_entity_api)
+) -> Response:
+    data = entity_api.team(slugify.reverse(request.path_params["team_id"]))
+    if data is None:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    return Response(data, media_type="application/json")
+
+
+@inject
+def player_api_view(
+    request: Request, entity_api: EntityApi = Provide(get_entity_api)
+) -> Response:
+    data = entity_api.player(slugify.reverse(request.path_params["player_id"]))
+    if data is None:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    return Response(data, media_type="application/json")
+
+
+@inject
+async def batch_api_view(
+    request: Request, entity_api: EntityApi = Provide(get_entity_api)
+) -> Response:
+    """
+    Data of many teams and players, ids are passed as
+    `{"teams": [...], "players": [...]}`, up to `MAX_BATCH_IDS` of each
+    """
+    ids = parse_batch_request(await request.body())
+    if ids is None:
+        return JSONResponse(
+            {"detail": f"Expected lists of up to {MAX_BATCH_IDS} teams and players"},
+            status_code=400,
+        )
+    teams, players = ids
+    return StreamingResponse(
+        entity_api.batch(teams, players), media_type="application/json"
+    )
+
+
+@inject
+def rosters_api_view(
+    request: Request,
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    interval_index_cache: GenerationCache[RosterIntervalIndex] = Provide(
+        get_roster_interval_index_cache
+    ),
+) -> Response:
+    """
+    Rosters of up to `MAX_BATCH_IDS` teams (`?team=A&team=B`) on `date`
+    or in `from` - `to` period, null for unknown teams
+    """
+    params = request.query_params
+    team_ids = params.getlist("team")
+    day = _parse_date(params.get("date", ""))
+    date_from = day or _parse_date(params.get("from", ""))
+    date_to = day or _parse_date(params.get("to", ""))
+    if (
+        not team_ids
+        or len(team_ids) > MAX_BATCH_IDS
+        or date_from is None
+        or date_to is None
+    ):
+        return JSONResponse(
+            {"detail": f"Expected 1-{MAX_BATCH_IDS} teams and date or from and to"},
+            status_code=400,
+        )
+
+    aliases = alias_index_cache.get()
+    index = interval_index_cache.get()
+    result: dict[str, list[RosterPeriod] | None] = {}
+    for value in team_ids:
+        if (team_id := aliases.team(value)) is None:
+            result[value] = None
+        elif day is not None:
+            period = index.at(team_id, day)
+            result[value] = [period] if period else []
+        else:
+            result[value] = index.between(team_id, date_from, date_to)
+    return Response(orjson.dumps(result), media_type="application/json")
+
+
+@inject
+def snapshot_view(
+    request: Request,
+    interval_index_cache: GenerationCache[RosterIntervalIndex] = Provide(
+        get_roster_interval_index_cache
+    ),
+) -> Response:
+    day = _parse_date(request.query_params.get("date", "")) or date.today()
+    result = present_snapshot(interval_index_cache.get().snapshot(day), day)
+    html = render_html("snapshot.jinja2", result)
+    return HTMLResponse(html)
+
+
+@inject
+def snapshot_api_view(
+    request: Request,
+    interval_index_cache: GenerationCache[RosterIntervalIndex] = Provide(
+        get_roster_interval_index_cache
+    ),
+) -> Response:
+    """Rosters of all teams on `date` by team id"""
+    day = _parse_date(request.query_params.get("date", ""))
+    if day is None:
+        return JSONResponse({"detail": "Expected date"}, status_code=400)
+    result = interval_index_cache.get().snapshot(day)
+    return Response(orjson.dumps(result), media_type="application/json")
+
+
+@inject
+def connection_view(
+    request: Request,
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    teammate_graph_cache: GenerationCache[TeammateGraph] = Provide(
+        get_teammate_graph_cache
+    ),
+) -> Response:
+    player_from = request.query_params.get("from", "")
+    player_to = request.query_params.get("to", "")
+    links = _find_connection(
+        player_from, player_to, alias_index_cache.get(), teammate_graph_cache.get()
+    )
+    result = present_connection(player_from, player_to, links)
+    html = render_html("connection.jinja2", result)
+    return HTMLResponse(html)
+
+
+@inject
+def connection_api_view(
+    request: Request,
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    teammate_graph_cache: GenerationCache[TeammateGraph] = Provide(
+        get_teammate_graph_cache
+    ),
+) -> Response:
+    """
+    Shortest chain of teammates between players `from` and `to`,
+    every link is the longest time the pair spent in one team
+    """
+    player_from = request.query_params.get("from", "")
+    player_to = request.query_params.get("to", "")
+    if not player_from or not player_to:
+        return JSONResponse({"detail": "Expected from and to"}, status_code=400)
+    links = _find_connection(
+        player_from, player_to, alias_index_cache.get(), teammate_graph_cache.get()
+    )
+    if links is None:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    result = {"degrees": len(links), "links": links}
+    return Response(orjson.dumps(result), media_type="application/json")
+
+
+def _find_connection(
+    player_from: str, player_to: str, aliases: AliasIndex, graph: TeammateGraph
+) -> list[TeammateLink] | None:
+    source = aliases.player(player_from)
+    target = aliases.player(player_to)
+    if source is None or target is None:
+        return None
+    return graph.path(source, target)
+
+
+# rows of tables of /transfers/ and routes of /api/transfers/
+TRANSFERS_LIMIT = 20
+
+
+@inject
+def transfers_view(
+    request: Request,
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    transfer_index_cache: GenerationCache[TransferIndex] = Provide(
+        get_transfer_index_cache
+    ),
+) -> Response:
+    params = request.query_params
+    team_id = None
+    if team := params.get("team"):
+        team_id = alias_index_cache.get().team(team)
+        if team_id is None:
+            return HTMLResponse(content=render_404(), status_code=404)
+    result = present_transfers(
+        transfer_index_cache.get(),
+        year=_parse_year(params.get("year", "")),
+        team_id=team_id,
+        limit=TRANSFERS_LIMIT,
+    )
+    html = render_html("transfers.jinja2", result)
+    return HTMLResponse(html)
+
+
+@inject
+def transfers_api_view(
+    request: Request,
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    transfer_index_cache: GenerationCache[TransferIndex] = Provide(
+        get_transfer_index_cache
+    ),
+) -> Response:
+    """
+    Top transfer routes and net flow of teams, or inbound and outbound
+    transfers of `team`; for all time or for `year`
+    """
+    params = request.query_params
+    year = _parse_year(params.get("year", ""))
+    index = transfer_index_cache.get()
+    result: dict[str, Any]
+    if team := params.get("team"):
+        team_id = alias_index_cache.get().team(team)
+        if team_id is None:
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        result = {
+            "team_id": team_id,
+            "by_year": index.team_flow(team_id),
+            "inbound": [
+                item
+                for item in index.inbound(team_id)
+                if year is None or item.joined_date.year == year
+            ],
+            "outbound": [
+                item
+                for item in index.outbound(team_id)
+                if year is None or item.joined_date.year == year
+            ],
+        }
+    else:
+        result = {
+            "routes": index.top_routes(year=year, limit=TRANSFERS_LIMIT),
+            "net_flow": index.net_flow(year=year),
+        }
+    return Response(
+        orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS),
+        media_type="application/json",
+    )
+
+
+@inject
+def export_view(
+    request: Request,
+    export_file_cache: ExportFileCache = Provide(get_export_file_cache),
+) -> Response:
+    """Table as Parquet file, written by DuckDB once per data generation"""
+    table = request.path_params["table"]
+    if table not in EXPORT_QUERIES:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    return FileResponse(
+        export_file_cache.get(table),
+        media_type="application/vnd.apache.parquet",
+        filename=f"{table}.parquet",
+    )
+
+
+def ready_view(request: Request) -> Response:
+    """Readiness probe, ready after the warm-up on startup is finished"""
+    if getattr(request.app.state, "ready", False):
+        return PlainTextResponse("ready")
+    return PlainTextResponse("warming up", status_code=503)
+
+
+MAX_PROFILING_SECONDS = 300.0
+# shorter intervals make the sampler thread busy-spin
+MIN_PROFILING_INTERVAL = 0.001
+
+
+@inject
+async def profile_view(
+    request: Request, settings: Settings = Provide(get_settings)
+) -> Response:
+    """
+    Profile the worker and return stacks in collapsed format.
+    `?seconds=N` - sample all threads for N seconds,
+    `?requests=N&path=REGEX` - sample while next N matching requests are handled.
+    """
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not settings.admin_token or not hmac.compare_digest(token, settings.admin_token):
+        return PlainTextResponse("Not Found", status_code=404)
+
+    params = request.query_params
+    try:
+        interval = float(params.get("interval", "0.005"))
+        seconds = min(float(params.get("seconds", "10")), MAX_PROFILING_SECONDS)
+        requests_count = int(params.get("requests", "0"))
+        path = params.get("path", "")
+        re.compile(path)
+    except (ValueError, re.error):
+        return PlainTextResponse("Invalid parameters", status_code=400)
+    if not math.isfinite(interval) or not math.isfinite(seconds):
+        return PlainTextResponse("Invalid parameters", status_code=400)
+    interval = max(interval, MIN_PROFILING_INTERVAL)
+    if profiling_state.busy:
+        return PlainTextResponse("Profiling is already running", status_code=409)
+
+    profiling_state.busy = True
+    try:
+        if requests_count:
+            result = await profile_requests(
+                path,
+                requests_count,
+                max_seconds=MAX_PROFILING_SECONDS,
+                interval=interval,
+            )
+        else:
+            result = await profile_for(seconds, interval=interval)
+    finally:
+        profiling_state.busy = False
+    return PlainTextResponse(
+        result,
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'},
+    )
+
+
 async def not_found_view(
     request: Request, exc: Exception  # noqa: U100
 ) -> HTMLResponse:
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from picodi import Provide, inject
+
+from cs_wayback_machine.deps import (
+    get_rosters_storage,
+    get_settings,
+    get_statistics_calculator,
+)
+from cs_wayback_machine.web.deps import (
+    get_alias_index_cache,
+    get_roster_interval_index_cache,
+    get_search_index_cache,
+    get_statistics_cube_cache,
+    get_teammate_graph_cache,
+    get_transfer_index_cache,
+)
+from cs_wayback_machine.web.html_render import compile_templates, render_html
+from cs_wayback_machine.web.presenters import (
+    MainPagePresenter,
+    PlayerPagePresenter,
+    TeamRostersPresenter,
+)
+
+if TYPE_CHECKING:
+    from cs_wayback_machine.settings import Settings
+    from cs_wayback_machine.statistics import StatisticsCalculator, StatisticsCube
+    from cs_wayback_machine.storage import GenerationCache, RosterStorage
+    from cs_wayback_machine.web.aliases import AliasIndex
+    from cs_wayback_machine.web.graph import TeammateGraph
+    from cs_wayback_machine.web.intervals import RosterIntervalIndex
+    from cs_wayback_machine.web.search import SearchIndex
+    from cs_wayback_machine.web.transfers import TransferIndex
+
+logger = logging.getLogger(__name__)
+
+
+@inject
+def warm_up(
+    rosters_storage: RosterStorage = Provide(get_rosters_storage),
+    statistics_calculator: StatisticsCalculator = Provide(get_statistics_calculator),
+    settings: Settings = Provide(get_settings),
+    search_index_cache: GenerationCache[SearchIndex] = Provide(get_search_index_cache),
+    alias_index_cache: GenerationCache[AliasIndex] = Provide(get_alias_index_cache),
+    interval_index_cache: GenerationCache[RosterIntervalIndex] = Provide(
+        get_roster_interval_index_cache
+    ),
+    teammate_graph_cache: GenerationCache[TeammateGraph] = Provide(
+        get_teammate_graph_cache
+    ),
+    transfer_index_cache: GenerationCache[TransferIndex] = Provide(
+        get_transfer_index_cache
+    ),
+    statistics_cube_cache: GenerationCache[StatisticsCube] = Provide(
+        get_statistics_cube_cache
+    ),
+) -> None:
+    """
+    Compile templates, build in-memory indexes and render the main page and
+    pages of the biggest teams and players, so the first requests don't pay
+    for cold queries and template compilation.
+    """
+    start = time.perf_counter()
+    compile_templates()
+
+    search_index_cache.get()
+    alias_index_cache.get()
+    interval_index_cache.get()
+    teammate_graph_cache.get()
+    transfer_index_cache.get()
+    main_page = MainPagePresenter(
+        statistics_calculator=statistics_calculator,
+        statistics_cube=statistics_cube_cache.get(),
+    ).present()
+    render_html("main_page.jinja2", main_page)
+
+    # there are no popularity stats, so the biggest teams and players are used
+    top = settings.warmup_top
+    team_presenter = TeamRostersPresenter(rosters_storage=rosters_storage)
+    for team_id, _ in statistics_calculator.teams_with_most_players(limit=top):
+        if team_page := team_presenter.present(team_id):
+            render_html("team_detail.jinja2", team_page)
+    player_presenter = PlayerPagePresenter(rosters_storage=rosters_storage)
+    for player_id, _ in statistics_calculator.players_with_most_teams(limit=top):
+        if player_page := player_presenter.present(player_id):
+            render_html("player_detail.jinja2", player_page)
+
+    logger.info("Warm-up finished in %.2fs", time.perf_counter() - start)
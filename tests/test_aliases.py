@@ -0,0 +1,52 @@
+import pytest
+
+from cs_wayback_machine.web.aliases import AliasIndex, normalize_alias
+
+
+@pytest.fixture()
+def aliases():
+    return AliasIndex(
+        [
+            ("team", "Natus Vincere", "Natus Vincere", 10),
+            ("team", "Ninjas in Pyjamas", "NIP", 5),
+            ("player", "Niko (Danish player)", "niko", 3),
+            ("player", "NiKo", "NiKo", 40),
+            ("player", "Leo drk", "leo_drk", 2),
+            ("player", "Zeus", "Zeus", 20),
+            ("player", "Zeus", "zeus_old", 1),
+            ("player", "Søren", "Søren", 1),
+        ]
+    )
+
+
+def test_normalize_alias():
+    assert normalize_alias(" Åsbjørn__Émile ") == "asbjorn emile"
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("Natus Vincere", "Natus Vincere"),
+        ("natus_vincere", "Natus Vincere"),
+        ("nip", "Ninjas in Pyjamas"),
+        ("Unknown", None),
+    ],
+)
+def test_team(aliases, value, expected):
+    assert aliases.team(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("leo drk", "Leo drk"),
+        ("ZEUS_OLD", "Zeus"),
+        ("soren", "Søren"),
+        # id wins over nickname of other player
+        ("niko", "NiKo"),
+        ("Niko (Danish player)", "Niko (Danish player)"),
+        ("Natus Vincere", None),
+    ],
+)
+def test_player(aliases, value, expected):
+    assert aliases.player(value) == expected
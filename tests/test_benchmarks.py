@@ -0,0 +1,88 @@
+from collections import Counter
+
+from picodi import Provide, inject
+
+from benchmarks.datasets import FIXTURE_PATH, prepare_dataset, serve_dataset
+from benchmarks.loadtest import TRAFFIC_MIX, ZipfSampler, load_test
+from benchmarks.suite import run_suite
+from cs_wayback_machine.storage import DuckDbConnectionManager, ParserResultsStorage
+from cs_wayback_machine.web.deps import (
+    get_search_index_cache,
+    get_statistics_cube_cache,
+)
+
+
+def test_benchmark_suite_runs_on_fixture():
+    results = run_suite(FIXTURE_PATH, scale=1, rounds=1)
+
+    names = {result.name for result in results}
+    assert "RosterStorage.get_teammates" in names
+    assert "GET /players/{player_id}/" in names
+    assert all(result.median > 0 for result in results)
+
+
+def test_benchmark_suite_runs_on_two_scales(tmp_path):
+    # routes of the second scale must not use caches built for the first one
+    for scale in (1, 2):
+        results = run_suite(
+            prepare_dataset(scale, tmp_path), scale=scale, rounds=1, only="GET"
+        )
+
+        assert {result.dataset for result in results} == {f"x{scale}"}
+
+
+@inject
+def _served_caches(
+    search_index_cache=Provide(get_search_index_cache),
+    statistics_cube_cache=Provide(get_statistics_cube_cache),
+):
+    return search_index_cache.get(), statistics_cube_cache.get()
+
+
+def test_caches_are_built_for_each_dataset(tmp_path):
+    served = []
+    for scale in (1, 2):
+        path = prepare_dataset(scale, tmp_path)
+        manager = DuckDbConnectionManager(ParserResultsStorage(path))
+        with serve_dataset(manager):
+            served.append(_served_caches())
+
+    (small_index, small_cube), (big_index, big_cube) = served
+    assert len(big_index) > len(small_index)
+    assert big_cube is not small_cube
+
+
+def test_scaled_dataset_has_more_rows(tmp_path):
+    path = prepare_dataset(3, tmp_path)
+
+    with open(FIXTURE_PATH) as f:
+        fixture_rows = sum(1 for _ in f)
+    with open(path) as f:
+        rows = sum(1 for _ in f)
+    assert 3 * fixture_rows <= rows < 4 * fixture_rows
+
+
+async def test_load_test_reports_every_route():
+    reports = await load_test(
+        None,
+        feed_path=FIXTURE_PATH,
+        concurrency=4,
+        total_requests=200,
+        duration=None,
+        zipf_s=1.1,
+        seed=0,
+    )
+
+    by_route = {report.route: report for report in reports}
+    assert set(by_route) == {*TRAFFIC_MIX, "total"}
+    assert by_route["total"].requests == 200
+    assert by_route["total"].errors == 0
+    assert all(report.p50 <= report.p95 <= report.p99 for report in reports)
+
+
+def test_zipf_sampler_prefers_first_items():
+    sampler = ZipfSampler(["a", "b", "c", "d"], 1.5)
+
+    counts = Counter(sampler.pick(i / 1000) for i in range(1000))
+
+    assert counts["a"] > counts["b"] > counts["d"]
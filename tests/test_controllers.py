@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from cs_wayback_machine.cli import controllers
+from cs_wayback_machine.delta import Delta
+from cs_wayback_machine.feed import ShardedFeedWriter
+from cs_wayback_machine.scraper import ShardedFeedPipeline, TeamCrawled, TeamsSpider
+from cs_wayback_machine.settings import Settings
+from cs_wayback_machine.storage import ParserResultsStorage
+
+
+class FakeStats:
+    def get_value(self, key, default=None):
+        return {"finish_reason": "finished"}.get(key, default)
+
+
+class FakeCrawler:
+    def __init__(self):
+        self.stats = FakeStats()
+        self.spider = TeamsSpider()
+
+
+class FakeProcess:
+    """Crawls `teams` through the real feed pipeline"""
+
+    def __init__(self, teams, runs, *, result_dir, job_dir, **kwargs):
+        self._teams = teams
+        self._runs = runs
+        self._result_dir = result_dir
+        self._job_dir = job_dir
+
+    def create_crawler(self, spider_class):  # noqa: U100
+        self.crawler = FakeCrawler()
+        return self.crawler
+
+    def crawl(self, crawler, **kwargs):
+        pass
+
+    def start(self, **kwargs):
+        spider = self.crawler.spider
+        pipeline = ShardedFeedPipeline(
+            self._result_dir, max_shard_size=1024, checkpoint_dir=self._job_dir
+        )
+        pipeline.open_spider(spider)
+        self._runs.append(set(spider.crawled_teams))
+        for team in self._teams:
+            if team in spider.crawled_teams:
+                continue
+            pipeline.process_item({"team_unique_name": team}, spider)
+            spider.crawled_teams.add(team)
+            pipeline.process_item(TeamCrawled(team), spider)
+        pipeline.close_spider(spider)
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture()
+def settings(tmp_path):
+    return Settings(
+        email_for_scrapper_useragent="me@example.com",
+        parser_results_path=tmp_path,
+        sentry_dsn=None,
+    )
+
+
+def test_rejected_feed_is_not_resumed(settings, monkeypatch):
+    writer = ShardedFeedWriter(settings.parser_result_path)
+    for num in range(10):
+        writer.write({"team_unique_name": f"Team {num}"})
+    writer.close()
+    runs: list[set[str]] = []
+    teams = ["Team 0"]
+    monkeypatch.setattr(
+        controllers,
+        "create_crawler_process",
+        lambda **kwargs: FakeProcess(teams, runs, **kwargs),
+    )
+
+    first = controllers.scrape_liquidpedia_and_replace_result(settings=settings)
+    teams = [f"Team {num}" for num in range(10)]
+    second = controllers.scrape_liquidpedia_and_replace_result(settings=settings)
+
+    assert first.message == "New feed is significantly smaller than the old one"
+    assert second.exit_code == 0
+    # the second run crawled everything again
+    assert runs == [set(), set()]
+    assert not Path(settings.crawl_job_path).exists()
+
+
+def test_every_update_gets_new_version(settings, monkeypatch):
+    runs: list[set[str]] = []
+    teams = [f"Team {num}" for num in range(10)]
+    monkeypatch.setattr(
+        controllers,
+        "create_crawler_process",
+        lambda **kwargs: FakeProcess(teams, runs, **kwargs),
+    )
+    storage = ParserResultsStorage(
+        settings.parser_result_path,
+        updated_file=settings.parser_result_updated_date_file_path,
+    )
+
+    versions = []
+    for _ in range(3):
+        result = controllers.scrape_liquidpedia_and_replace_result(settings=settings)
+        assert result.exit_code == 0
+        versions.append(storage.version())
+
+    # several updates on the same day are still ordered
+    assert versions == sorted(set(versions))
+    deltas = [Delta.load(path) for path in settings.parser_result_deltas_path.iterdir()]
+    assert sorted((delta.from_version, delta.to_version) for delta in deltas) == [
+        (versions[0], versions[1]),
+        (versions[1], versions[2]),
+    ]
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+from pathlib import Path
+
+from cs_wayback_machine.crawl_scheduler import CrawlScheduler, TeamCrawlState
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+TODAY = date(2024, 10, 8)
+
+
+def test_plan_prefers_active_teams_within_budget():
+    scheduler = CrawlScheduler(
+        {
+            "hot": TeamCrawlState(
+                last_crawled=date(2024, 10, 1),
+                last_changed=date(2024, 9, 20),
+                active_players=5,
+                recent_moves=4,
+            ),
+            "cold": TeamCrawlState(
+                last_crawled=date(2024, 9, 1), last_changed=date(2015, 1, 1)
+            ),
+            "crawled_today": TeamCrawlState(last_crawled=TODAY, active_players=5),
+            "forgotten": TeamCrawlState(
+                last_crawled=date(2024, 1, 1), last_changed=date(2010, 1, 1)
+            ),
+        }
+    )
+
+    assert scheduler.plan(2, TODAY) == {"forgotten", "hot"}
+    assert scheduler.plan(10, TODAY) == {"forgotten", "hot", "cold"}
+
+
+def test_overdue_teams_do_not_crowd_out_active_ones():
+    teams = {
+        f"Team {num:03d}": TeamCrawlState(
+            last_crawled=date(2024, 1, 1) + timedelta(days=num % 3),
+            last_changed=date(2015, 1, 1),
+        )
+        for num in range(100)
+    }
+    active = {
+        name: TeamCrawlState(
+            last_crawled=date(2024, 10, 1),
+            last_changed=date(2024, 9, 20),
+            active_players=5,
+            recent_moves=4,
+        )
+        for name in ["Astralis", "Vitality", "Zeta"]
+    }
+    scheduler = CrawlScheduler({**teams, **active})
+
+    planned = scheduler.plan(10, TODAY)
+
+    assert len(planned) == 10
+    assert set(active) <= planned
+    # the least recently crawled overdue teams go first, not the last by name
+    overdue = planned - set(active)
+    assert all(teams[name].last_crawled == date(2024, 1, 1) for name in overdue)
+    assert "Team 099" not in planned
+
+
+def test_state_persists_between_runs(tmp_path):
+    scheduler = CrawlScheduler()
+    scheduler.record_crawl(
+        crawled_teams=["Natus Vincere", "Port22"],
+        changed_teams=["Port22"],
+        feed_path=FIXTURE_PATH,
+        today=TODAY,
+    )
+    scheduler.save(tmp_path / "state.json")
+
+    loaded = CrawlScheduler.load(tmp_path / "state.json")
+
+    assert loaded.teams == scheduler.teams
+    assert loaded.teams["Port22"].last_changed == TODAY
+    assert loaded.teams["Natus Vincere"].last_crawled == TODAY
+    assert loaded.teams["Natus Vincere"].active_players > 0
@@ -0,0 +1,129 @@
+import json
+from datetime import date
+from itertools import product
+from pathlib import Path
+
+from cs_wayback_machine.scraper import DateParser, parse_dates
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+DATE_TYPES = [
+    "Join Date:",
+    "Leave Date:",
+    "Inactive Date:",
+    " join date ",
+    "Other:",
+    "",
+]
+EXTRA_VALUES = [
+    "",
+    "  ",
+    "2024-01-06 [1]",
+    "2024-02-30",
+    "2024-13",
+    "2013-?",
+    "2020 (approx.)",
+    "20xx-01-01",
+    "Unknown",
+    "abc",
+]
+
+
+class ReferenceDateParser:
+    """Implementation of `DateParser` before it delegated to `parse_dates`"""
+
+    def __init__(self, date_type: str, date_value: str) -> None:
+        self._date_type_raw = date_type
+        self._date_value_raw = date_value
+        self._date_type: str | None = None
+        self._date_value: date | None = None
+
+    def parse(self) -> tuple[str | None, date | None, str | None]:
+        self._date_type_raw = self._date_type_raw.strip()
+        self._date_value_raw = self._date_value_raw.strip()
+
+        self._parse_date_type()
+        if not self._date_type:
+            return None, None, None
+        date_fixed = self._parse_date_value()
+
+        date_value_raw = None
+        empty_value = not self._date_value and not self._date_value_raw
+        if ("join" in self._date_type or "leave" in self._date_type) and empty_value:
+            date_value_raw = "unknown"
+        elif not self._date_value or date_fixed:
+            date_value_raw = self._date_value_raw or None
+
+        return self._date_type, self._date_value, date_value_raw
+
+    def _parse_date_type(self) -> None:
+        date_type = self._date_type_raw.lower().replace(" ", "_")
+        parsed = date_type.replace(":", "")
+        if parsed in ["join_date", "leave_date", "inactive_date"]:
+            self._date_type = parsed
+
+    def _parse_date_value(self) -> bool:
+        if self._date_type is None:
+            raise RuntimeError("Date type must be parsed first")
+
+        text = self._date_value_raw[:10].lower()
+        if date := self._parse_date(text):
+            self._date_value = date
+            return False
+
+        fixed_date = self._try_to_fix_date(text, to_start="join" in self._date_type)
+        if fixed_date is None:
+            return False
+        if date := self._parse_date(fixed_date):
+            self._date_value = date
+            return True
+        return False
+
+    def _parse_date(self, value: str) -> date | None:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return None
+
+    def _try_to_fix_date(self, value: str, *, to_start: bool) -> str | None:
+        year = value[:4]
+        if len(year) < 4:
+            return None
+        try:
+            int(year)
+        except ValueError:
+            return None
+
+        if len(value) > 4 and not value[5].isdigit():
+            value = value[:4]
+        value = "".join(char for char in value if char.isdigit() or char == "-")
+        value = value.rstrip("-")
+
+        parts = value.split("-")
+        if to_start:
+            parts.extend(["01", "01"])
+        else:
+            parts.extend(["12", "31"])
+        return "-".join(parts[:3])
+
+
+def dataset_date_strings() -> set[str]:
+    values = set()
+    with open(FIXTURE_PATH) as f:
+        for line in f:
+            for key, value in json.loads(line).items():
+                if "date" in key and isinstance(value, str):
+                    values.add(value)
+    return values
+
+
+def test_parse_dates_equals_reference_parser():
+    values = sorted(dataset_date_strings() | set(EXTRA_VALUES))
+    cells = list(product(DATE_TYPES, values))
+
+    expected = [
+        ReferenceDateParser(date_type, value).parse() for date_type, value in cells
+    ]
+
+    assert parse_dates(cells) == expected
+    assert [DateParser(*cell).parse() for cell in cells] == expected
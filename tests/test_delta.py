@@ -0,0 +1,161 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from cs_wayback_machine.delta import compute_delta, find_delta_chain
+from cs_wayback_machine.duck import create_new_connection_from_parser_results
+from cs_wayback_machine.feed import ShardedFeedWriter
+from cs_wayback_machine.storage import DuckDbConnectionManager, ParserResultsStorage
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+OLD_VERSION = datetime(2024, 10, 1, 6, 0)
+# published later on the same day
+NEW_VERSION = datetime(2024, 10, 1, 18, 30)
+
+
+def write_feed(path, items):
+    writer = ShardedFeedWriter(path)
+    for item in items:
+        writer.write(item)
+    writer.close()
+    return path
+
+
+@pytest.fixture()
+def old_items():
+    with open(FIXTURE_PATH) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture()
+def new_items(old_items):
+    teams = sorted({item["team_unique_name"] for item in old_items})
+    changed_team, removed_team = teams[0], teams[1]
+    items = [
+        dict(item) for item in old_items if item["team_unique_name"] != removed_team
+    ]
+    for item in items:
+        if item["team_unique_name"] == changed_team:
+            item["leave_date"] = "2024-10-05"
+            break
+    items.append({**items[-1], "team_unique_name": "New Team", "team_name": "New"})
+    return items
+
+
+@pytest.fixture()
+def storage(tmp_path, old_items, new_items):
+    old_feed = write_feed(tmp_path / "old", old_items)
+    new_feed = write_feed(tmp_path / "rosters", new_items)
+    compute_delta(
+        old_feed,
+        new_feed,
+        from_version=OLD_VERSION,
+        to_version=NEW_VERSION,
+        deltas_path=tmp_path / "deltas",
+    )
+    updated_file = tmp_path / "updated.txt"
+    updated_file.write_text(NEW_VERSION.isoformat())
+    return ParserResultsStorage(
+        new_feed, updated_file=updated_file, deltas_path=tmp_path / "deltas"
+    )
+
+
+def test_delta_contains_only_changed_teams(storage, old_items):
+    chain = find_delta_chain(storage.deltas_path, OLD_VERSION, NEW_VERSION)
+
+    assert chain is not None
+    [delta] = chain
+    teams = sorted({item["team_unique_name"] for item in old_items})
+    assert delta.teams == sorted([teams[0], teams[1], "New Team"])
+    assert delta.added_rows == 2
+
+
+def test_find_delta_chain_returns_none_for_broken_chain(storage):
+    assert (
+        find_delta_chain(storage.deltas_path, datetime(2024, 9, 1), NEW_VERSION) is None
+    )
+
+
+def test_applied_delta_equals_full_reload(tmp_path, storage):
+    new_feed = storage.parsed_rosters
+    updated_file = tmp_path / "updated.txt"
+    updated_file.write_text(OLD_VERSION.isoformat())
+    storage.parsed_rosters = tmp_path / "old"
+    manager = DuckDbConnectionManager(storage)
+    manager.conn
+    updates = []
+    manager.add_update_listener(updates.append)
+    # publish new version
+    updated_file.write_text(NEW_VERSION.isoformat())
+    storage.parsed_rosters = new_feed
+
+    conn = manager.conn
+
+    expected = create_new_connection_from_parser_results(storage)
+    for query in [
+        "SELECT * FROM rosters ORDER BY ALL",
+        "SELECT * FROM teams ORDER BY ALL",
+    ]:
+        assert conn.execute(query).fetchall() == expected.execute(query).fetchall()
+    [update] = updates
+    assert update.version == NEW_VERSION
+    assert update.teams is not None
+    assert "New Team" in update.teams
+
+
+def test_shared_database_is_built_once_per_version(tmp_path, storage):
+    new_feed = storage.parsed_rosters
+    updated_file = tmp_path / "updated.txt"
+    updated_file.write_text(OLD_VERSION.isoformat())
+    storage.parsed_rosters = tmp_path / "old"
+    shared_path = tmp_path / "duckdb"
+    managers = [
+        DuckDbConnectionManager(storage, shared_database_path=shared_path)
+        for _ in range(2)
+    ]
+    for manager in managers:
+        manager.conn
+    assert [path.name for path in shared_path.glob("*.duckdb")] == [
+        "rosters-2024-10-01T06-00-00.duckdb"
+    ]
+    updates = []
+    managers[0].add_update_listener(updates.append)
+    # publish new version
+    updated_file.write_text(NEW_VERSION.isoformat())
+    storage.parsed_rosters = new_feed
+
+    conn = managers[0].conn
+
+    assert [path.name for path in shared_path.glob("*.duckdb")] == [
+        "rosters-2024-10-01T18-30-00.duckdb"
+    ]
+    expected = create_new_connection_from_parser_results(storage)
+    query = "SELECT * FROM rosters ORDER BY ALL"
+    assert conn.execute(query).fetchall() == expected.execute(query).fetchall()
+    # read-only database is reloaded, not updated with deltas
+    [update] = updates
+    assert update.teams is None
+
+
+def test_refresh_switches_to_new_version_once(tmp_path, storage):
+    new_feed = storage.parsed_rosters
+    updated_file = tmp_path / "updated.txt"
+    updated_file.write_text(OLD_VERSION.isoformat())
+    storage.parsed_rosters = tmp_path / "old"
+    manager = DuckDbConnectionManager(storage)
+    manager.refresh()
+    assert manager.generation == 1
+    updates = []
+    manager.add_update_listener(updates.append)
+    manager.refresh()
+    # publish new version
+    updated_file.write_text(NEW_VERSION.isoformat())
+    storage.parsed_rosters = new_feed
+
+    manager.refresh()
+    manager.refresh()
+
+    assert [update.version for update in updates] == [NEW_VERSION]
+    assert manager.generation == 2
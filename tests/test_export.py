@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from cs_wayback_machine.export import EXPORT_QUERIES, DatasetExporter, ExportFileCache
+from cs_wayback_machine.storage import DuckDbConnectionManager, ParserResultsStorage
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+
+@pytest.fixture()
+def manager():
+    return DuckDbConnectionManager(ParserResultsStorage(FIXTURE_PATH))
+
+
+@pytest.fixture()
+def exporter(manager):
+    return DatasetExporter(manager)
+
+
+@pytest.mark.parametrize("table", list(EXPORT_QUERIES))
+def test_write(exporter, tmp_path, table):
+    path = tmp_path / f"{table}.parquet"
+
+    rows = exporter.write(table, path)
+
+    assert rows > 0
+    count = duckdb.sql(f"SELECT COUNT(*) FROM '{path}'").fetchone()  # noqa: S608
+    assert count == (rows,)
+
+
+def test_roster_periods_have_players_of_the_period(exporter, tmp_path):
+    path = tmp_path / "roster_periods.parquet"
+    exporter.write("roster_periods", path)
+
+    rows = duckdb.sql(
+        f"""
+        SELECT players FROM '{path}'
+        WHERE team_id = '00 Nation' AND start_date = '2024-01-06'
+        """  # noqa: S608
+    ).fetchall()
+
+    assert rows
+    assert {"VLDN", "FASHR"} <= set(rows[0][0])
+
+
+def test_file_is_written_once_per_generation(exporter, manager):
+    cache = ExportFileCache(exporter, manager)
+
+    path = cache.get("teams")
+    mtime = path.stat().st_mtime_ns
+    assert cache.get("teams") == path
+    assert path.stat().st_mtime_ns == mtime
+    manager.generation += 1
+    new_path = cache.get("teams")
+
+    assert new_path != path
+    count = duckdb.sql(f"SELECT COUNT(*) FROM '{new_path}'").fetchone()  # noqa: S608
+    assert count[0] > 0
@@ -0,0 +1,123 @@
+import json
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from cs_wayback_machine.duck import create_new_connection_from_parser_results
+from cs_wayback_machine.feed import (
+    Manifest,
+    ShardedFeedWriter,
+    iter_feed,
+    merge_feeds,
+    verify_feed,
+)
+from cs_wayback_machine.storage import ParserResultsStorage
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+
+@pytest.fixture()
+def fixture_items():
+    with open(FIXTURE_PATH) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture()
+def feed_dir(tmp_path, fixture_items):
+    writer = ShardedFeedWriter(tmp_path / "rosters", max_shard_size=1024)
+    for item in fixture_items:
+        writer.write(item)
+    writer.close()
+    return tmp_path / "rosters"
+
+
+def test_writer_splits_feed_into_shards(feed_dir, fixture_items):
+    manifest = Manifest.load(feed_dir)
+
+    assert manifest is not None
+    assert len(manifest.shards) > 1
+    assert manifest.total_rows == len(fixture_items)
+    assert verify_feed(feed_dir) == []
+
+
+def test_verify_feed_detects_corrupted_shard(feed_dir):
+    manifest = Manifest.load(feed_dir)
+    shard_path = feed_dir / manifest.shards[0].file_name
+    shard_path.write_bytes(shard_path.read_bytes()[:-1])
+
+    assert verify_feed(feed_dir) == [
+        f"Shard {manifest.shards[0].file_name} checksum mismatch"
+    ]
+
+
+def test_shards_loaded_same_as_plain_file(feed_dir):
+    query = "SELECT * FROM rosters ORDER BY ALL"
+    from_shards = create_new_connection_from_parser_results(
+        ParserResultsStorage(feed_dir)
+    )
+    from_file = create_new_connection_from_parser_results(
+        ParserResultsStorage(FIXTURE_PATH)
+    )
+
+    assert from_shards.execute(query).fetchall() == from_file.execute(query).fetchall()
+
+
+def test_merge_feeds_replaces_rows_of_crawled_teams(tmp_path, feed_dir):
+    update_dir = tmp_path / "update"
+    writer = ShardedFeedWriter(update_dir)
+    writer.write({"team_unique_name": "Port22", "player_unique_id": "new"})
+    writer.close()
+
+    merge_feeds(
+        feed_dir,
+        update_dir,
+        replaced_teams={"Port22"},
+        target_dir=tmp_path / "merged",
+    )
+
+    merged = list(iter_feed(tmp_path / "merged"))
+    port22 = [item for item in merged if item["team_unique_name"] == "Port22"]
+    assert port22 == [{"team_unique_name": "Port22", "player_unique_id": "new"}]
+    assert len(merged) == len(list(iter_feed(FIXTURE_PATH))) - 24
+
+
+def test_writer_resume_appends_to_existing_shards(feed_dir, fixture_items):
+    manifest = Manifest.load(feed_dir)
+    writer = ShardedFeedWriter(feed_dir, max_shard_size=1024, resume=True)
+    writer.write({"team_unique_name": "New Team", "player_unique_id": "new"})
+    resumed = writer.close()
+
+    assert resumed.shards[: len(manifest.shards)] == manifest.shards
+    assert resumed.total_rows == len(fixture_items) + 1
+    assert verify_feed(feed_dir) == []
+
+
+def test_writer_resumes_open_shard_from_checkpoint(tmp_path):
+    directory = tmp_path / "rosters"
+    writer = ShardedFeedWriter(directory)
+    writer.write({"team_unique_name": "A"})
+    writer.checkpoint()
+    writer.write({"team_unique_name": "B"})
+    manifest, position = writer.checkpoint()
+    assert manifest.shards == []
+    # killed while writing after the checkpoint
+    with open(directory / position.file_name, "ab") as f:
+        f.write(b"incomplete frame")
+
+    resumed = ShardedFeedWriter(directory, resume=True, resume_shard=position)
+    resumed.write({"team_unique_name": "C"})
+    manifest = resumed.close()
+
+    assert len(manifest.shards) == 1
+    assert manifest.total_rows == 3
+    assert verify_feed(directory) == []
+    assert [item["team_unique_name"] for item in iter_feed(directory)] == [
+        "A",
+        "B",
+        "C",
+    ]
+    # DuckDB reads all frames of the shard too
+    shard_path = directory / manifest.shards[0].file_name
+    query = f"SELECT COUNT(*) FROM read_json_auto('{shard_path}')"  # noqa: S608
+    assert duckdb.sql(query).fetchone() == (3,)
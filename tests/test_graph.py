@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from cs_wayback_machine.web.graph import TeammateGraph, TeammateLink
+
+LINKS = [
+    ("a", "b", "T1", date(2020, 1, 1), date(2020, 6, 1)),
+    ("b", "c", "T2", date(2021, 1, 1), date(2021, 6, 1)),
+    ("c", "d", "T2", date(2021, 1, 1), date(2021, 3, 1)),
+    ("a", "e", "T3", date(2019, 1, 1), date(2019, 6, 1)),
+    ("d", "e", "T4", date(2022, 1, 1), date(2022, 6, 1)),
+    # separate component
+    ("x", "y", "T5", date(2020, 1, 1), date(2020, 2, 1)),
+]
+
+
+@pytest.fixture()
+def graph():
+    return TeammateGraph(LINKS)
+
+
+def test_path(graph):
+    result = graph.path("a", "c")
+
+    assert result == [
+        TeammateLink("a", "b", "T1", date(2020, 1, 1), date(2020, 6, 1)),
+        TeammateLink("b", "c", "T2", date(2021, 1, 1), date(2021, 6, 1)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "player_from,player_to,degrees",
+    [("a", "b", 1), ("b", "a", 1), ("a", "d", 2), ("b", "e", 2), ("c", "e", 2)],
+)
+def test_shortest_path(graph, player_from, player_to, degrees):
+    result = graph.path(player_from, player_to)
+
+    assert result is not None
+    assert len(result) == degrees
+    assert result[0].player_id == player_from
+    assert result[-1].teammate_id == player_to
+    for link, next_link in zip(result, result[1:]):
+        assert link.teammate_id == next_link.player_id
+
+
+def test_same_player(graph):
+    assert graph.path("a", "a") == []
+
+
+@pytest.mark.parametrize("player_to", ["x", "unknown"])
+def test_not_connected(graph, player_to):
+    assert graph.path("a", player_to) is None
+
+
+def test_empty_graph():
+    graph = TeammateGraph([])
+
+    assert len(graph) == 0
+    assert graph.path("a", "b") is None
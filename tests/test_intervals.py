@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+from cs_wayback_machine.web.intervals import (
+    RosterIntervalIndex,
+    RosterPeriod,
+    RosterTimeline,
+)
+
+PERIODS = [
+    ("A", date(2020, 1, 1), date(2020, 6, 1), ["p1", "p2"]),
+    ("A", date(2020, 6, 1), date(2021, 1, 1), ["p1", "p3"]),
+    # gap in 2021
+    ("A", date(2022, 1, 1), date(2023, 1, 1), ["p4"]),
+    ("B", date(2019, 1, 1), date(2019, 2, 1), ["p5"]),
+]
+
+
+@pytest.fixture()
+def index():
+    return RosterIntervalIndex(PERIODS)
+
+
+@pytest.mark.parametrize(
+    "day,expected",
+    [
+        (date(2019, 12, 31), None),
+        (date(2020, 1, 1), ("p1", "p2")),
+        (date(2020, 3, 1), ("p1", "p2")),
+        # new roster on the day of the change
+        (date(2020, 6, 1), ("p1", "p3")),
+        (date(2021, 1, 1), ("p1", "p3")),
+        (date(2021, 6, 1), None),
+        (date(2023, 1, 1), ("p4",)),
+        (date(2023, 1, 2), None),
+    ],
+)
+def test_at(index, day, expected):
+    period = index.at("A", day)
+
+    assert (period.players if period else None) == expected
+
+
+def test_between(index):
+    periods = index.between("A", date(2020, 5, 1), date(2022, 1, 1))
+
+    assert [period.players for period in periods] == [
+        ("p1", "p2"),
+        ("p1", "p3"),
+        ("p4",),
+    ]
+
+
+def test_unknown_team(index):
+    assert index.at("C", date(2020, 1, 1)) is None
+    assert index.between("C", date.min, date.max) == []
+
+
+@pytest.mark.parametrize("checkpoint_interval", [1, 2, 256])
+def test_snapshot(checkpoint_interval):
+    periods: dict[str, list[RosterPeriod]] = {}
+    for team_id, start, end, players in PERIODS:
+        periods.setdefault(team_id, []).append(RosterPeriod(start, end, tuple(players)))
+    timeline = RosterTimeline(periods, checkpoint_interval=checkpoint_interval)
+
+    assert timeline.snapshot(date(2018, 1, 1)) == {}
+    assert {
+        team_id: period.players
+        for team_id, period in timeline.snapshot(date(2019, 1, 15)).items()
+    } == {"B": ("p5",)}
+    assert timeline.snapshot(date(2020, 6, 1))["A"].players == ("p1", "p3")
+    assert timeline.snapshot(date(2021, 6, 1)) == {}
+    assert timeline.snapshot(date(2022, 5, 1))["A"].players == ("p4",)
+
+
+def test_snapshot_matches_per_team_index(index):
+    for day in [date(2019, 1, 1), date(2020, 6, 1), date(2021, 1, 1), date(2023, 1, 1)]:
+        assert index.snapshot(day) == {
+            team_id: period
+            for team_id in ["A", "B"]
+            if (period := index.at(team_id, day)) is not None
+        }
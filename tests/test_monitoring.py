@@ -0,0 +1,91 @@
+import logging
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+
+from cs_wayback_machine.monitoring import MemoryCollector, QueryMonitor
+from cs_wayback_machine.storage import (
+    DuckDbConnectionManager,
+    ParserResultsStorage,
+    RosterStorage,
+)
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+
+def make_storage(query_monitor):
+    manager = DuckDbConnectionManager(
+        ParserResultsStorage(FIXTURE_PATH), query_monitor=query_monitor
+    )
+    return RosterStorage(manager)
+
+
+def test_query_metrics_are_reported_by_query_name():
+    storage = make_storage(QueryMonitor())
+
+    def count():
+        value = REGISTRY.get_sample_value(
+            "cswm_query_rows_count", {"query": "get_team_names"}
+        )
+        return value or 0
+
+    before = count()
+    storage.get_team_names()
+
+    assert count() == before + 1
+
+
+def test_slow_queries_are_logged_with_plan(caplog):
+    storage = make_storage(QueryMonitor(slow_query_threshold=0))
+
+    with caplog.at_level(logging.WARNING, logger="cs_wayback_machine.slow_queries"):
+        storage.get_team("Port22")
+
+    [record] = caplog.records
+    assert "Slow query get_team" in record.message
+    assert "generation 1" in record.message
+    assert "Total Time" in record.message
+
+
+def test_fast_queries_are_not_logged(caplog):
+    storage = make_storage(QueryMonitor(slow_query_threshold=60))
+
+    with caplog.at_level(logging.WARNING, logger="cs_wayback_machine.slow_queries"):
+        storage.get_team("Port22")
+
+    assert not caplog.records
+
+
+def test_duckdb_limits_are_applied():
+    manager = DuckDbConnectionManager(
+        ParserResultsStorage(FIXTURE_PATH),
+        duckdb_config={"memory_limit": "256MB", "threads": 1},
+    )
+
+    [(threads,)] = manager.fetchall("settings", "SELECT current_setting('threads');")
+    assert threads == 1
+
+
+def test_memory_collector_reports_duckdb_memory_and_caches():
+    manager = DuckDbConnectionManager(ParserResultsStorage(FIXTURE_PATH))
+    collector = MemoryCollector()
+    collector.track_duckdb(manager.current_cursor)
+    collector.track_cache("teams", lambda: 42)
+
+    assert _samples(collector) == {("cswm_cache_entries", "teams"): 42}
+
+    manager.conn
+    samples = _samples(collector)
+
+    assert samples[("cswm_duckdb_memory_bytes", "IN_MEMORY_TABLE")] > 0
+    assert samples[("cswm_cache_entries", "teams")] == 42
+
+
+def _samples(collector):
+    return {
+        (sample.name, sample.labels.get("tag") or sample.labels.get("cache")): (
+            sample.value
+        )
+        for metric in collector.collect()
+        for sample in metric.samples
+    }
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from cs_wayback_machine.deps import get_settings
+from cs_wayback_machine.settings import Settings
+from cs_wayback_machine.web import views
+from cs_wayback_machine.web.profiling import ProfilingMiddleware
+from cs_wayback_machine.web.views import MIN_PROFILING_INTERVAL, profile_view
+
+pytestmark = pytest.mark.picodi_override(
+    get_settings,
+    lambda: Settings(
+        email_for_scrapper_useragent="me@example.com",
+        parser_results_path=Path(),
+        sentry_dsn=None,
+        admin_token="secret",
+    ),
+)
+
+
+def busy_loop():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+def slow_view(request):  # noqa: U100
+    busy_loop()
+    return PlainTextResponse("ok")
+
+
+@pytest.fixture()
+async def client():
+    app = Starlette(
+        routes=[
+            Route("/admin/profile/", profile_view),
+            Route("/slow/", slow_view),
+        ],
+        middleware=[Middleware(ProfilingMiddleware)],
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver", timeout=10
+    ) as client:
+        yield client
+
+
+async def test_profile_requires_admin_token(client):
+    response = await client.get("/admin/profile/", params={"seconds": "0.01"})
+
+    assert response.status_code == 404
+
+
+async def test_profile_next_matching_requests(client):
+    profile = asyncio.create_task(
+        client.get(
+            "/admin/profile/",
+            params={"requests": "2", "path": "^/slow/", "interval": "0.001"},
+            headers={"Authorization": "Bearer secret"},
+        )
+    )
+    await asyncio.sleep(0.05)
+    await client.get("/slow/")
+    await client.get("/slow/")
+    response = await profile
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert any("busy_loop" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"requests": "1", "path": "(unclosed"},
+        {"seconds": "0.01", "interval": "nan"},
+    ],
+)
+async def test_profile_invalid_parameters(client, params):
+    response = await client.get(
+        "/admin/profile/", params=params, headers={"Authorization": "Bearer secret"}
+    )
+
+    assert response.status_code == 400
+
+
+async def test_profile_interval_is_clamped(client, monkeypatch):
+    intervals = []
+
+    async def fake_profile_for(seconds, *, interval):  # noqa: U100
+        intervals.append(interval)
+        return ""
+
+    monkeypatch.setattr(views, "profile_for", fake_profile_for)
+
+    response = await client.get(
+        "/admin/profile/",
+        params={"seconds": "0.01", "interval": "0"},
+        headers={"Authorization": "Bearer secret"},
+    )
+
+    assert response.status_code == 200
+    assert intervals == [MIN_PROFILING_INTERVAL]
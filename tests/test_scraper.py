@@ -0,0 +1,65 @@
+import pytest
+from scrapy.http import HtmlResponse
+
+from cs_wayback_machine.feed import Manifest, iter_feed
+from cs_wayback_machine.scraper import ShardedFeedPipeline, TeamCrawled, TeamsSpider
+
+TEAM_URL = "https://liquipedia.net/counterstrike/Natus_Vincere"
+
+
+def _response(body: str) -> HtmlResponse:
+    return HtmlResponse(TEAM_URL, body=body.encode(), encoding="utf-8")
+
+
+def test_team_is_crawled_after_parse():
+    spider = TeamsSpider()
+
+    rows = list(spider.parse_teams(_response("<h1 id='firstHeading'></h1>")))
+
+    assert rows == [TeamCrawled("Natus Vincere")]
+    assert spider.crawled_teams == {"Natus Vincere"}
+    assert spider.failed_urls == {}
+
+
+def test_failed_parse_is_recorded(monkeypatch):
+    spider = TeamsSpider()
+
+    def broken_rows(response):  # noqa: U100
+        yield {"team_unique_name": "Natus Vincere"}
+        raise ValueError("unexpected markup")
+
+    monkeypatch.setattr(spider, "_parse_team_rows", broken_rows)
+
+    with pytest.raises(ValueError, match="unexpected markup"):
+        list(spider.parse_teams(_response("")))
+    assert spider.crawled_teams == set()
+    assert spider.failed_urls == {TEAM_URL: "parse_teams"}
+
+
+def test_crawl_is_resumed_from_checkpoint(tmp_path):
+    feed_dir = tmp_path / "feed"
+    job_dir = tmp_path / "job"
+    spider = TeamsSpider()
+    pipeline = ShardedFeedPipeline(
+        feed_dir, max_shard_size=1024, checkpoint_dir=job_dir, checkpoint_interval=1
+    )
+    pipeline.open_spider(spider)
+    pipeline.process_item({"team_unique_name": "Natus Vincere"}, spider)
+    pipeline.process_item(TeamCrawled("Natus Vincere"), spider)
+    # killed before the next checkpoint
+    pipeline.process_item({"team_unique_name": "Astralis"}, spider)
+
+    resumed_spider = TeamsSpider()
+    resumed = ShardedFeedPipeline(feed_dir, max_shard_size=1024, checkpoint_dir=job_dir)
+    resumed.open_spider(resumed_spider)
+    assert resumed_spider.crawled_teams == {"Natus Vincere"}
+    resumed.process_item({"team_unique_name": "Astralis"}, resumed_spider)
+    resumed.process_item(TeamCrawled("Astralis"), resumed_spider)
+    resumed.close_spider(resumed_spider)
+
+    assert [item["team_unique_name"] for item in iter_feed(feed_dir)] == [
+        "Natus Vincere",
+        "Astralis",
+    ]
+    # checkpoints don't close the shard
+    assert len(Manifest.load(feed_dir).shards) == 1
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+
+from cs_wayback_machine.statistics import StatisticsCalculator
+from cs_wayback_machine.storage import (
+    DuckDbConnectionManager,
+    ParserResultsStorage,
+    RosterStorage,
+)
+from cs_wayback_machine.web.presenters import present_available_ids
+from cs_wayback_machine.web.search import SearchIndex
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+
+@pytest.fixture()
+def index():
+    return SearchIndex(
+        [
+            "team:Natus Vincere",
+            "team:Natus Vincere Junior",
+            "team:Vitality",
+            "team:Virtus.pro",
+            "player:s1mple",
+            "player:simple_guy",
+            "player:Electronic",
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("natus", ["team:Natus Vincere", "team:Natus Vincere Junior"]),
+        ("VINCERE", ["team:Natus Vincere", "team:Natus Vincere Junior"]),
+        ("virtus pro", ["team:Virtus.pro"]),
+        ("s1mple", ["player:s1mple"]),
+        ("simple guy", ["player:simple_guy"]),
+    ],
+)
+def test_prefix_matches(index, query, expected):
+    assert index.search(query, limit=2) == expected
+
+
+def test_exact_match_is_first(index):
+    assert index.search("natus vincere")[0] == "team:Natus Vincere"
+
+
+def test_fuzzy_matches_are_after_prefix_matches(index):
+    assert index.search("electornic") == ["player:Electronic"]
+    assert index.search("vit")[0] == "team:Vitality"
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("team:vit", ["team:Vitality"]),
+        ("player:vit", []),
+        ("Player: S1mple", ["player:s1mple"]),
+        ("team:simple", []),
+        ("team:", []),
+    ],
+)
+def test_kind_prefix_filters_results(index, query, expected):
+    assert index.search(query) == expected
+
+
+def test_empty_query(index):
+    assert index.search("  ") == []
+
+
+@pytest.mark.parametrize("query", ["s", "si", "sim"])
+def test_popular_entities_are_ranked_first(query):
+    index = SearchIndex(
+        ["player:simo", "player:simple", "player:sim_rookie"],
+        scores={"player:simple": 5.0, "player:simo": 1.0},
+    )
+
+    assert index.search(query) == ["player:simple", "player:simo", "player:sim_rookie"]
+
+
+def test_popularity_scores_are_computed_for_all_entities():
+    manager = DuckDbConnectionManager(ParserResultsStorage(FIXTURE_PATH))
+    index_ids = set(present_available_ids(RosterStorage(manager)))
+
+    rows = StatisticsCalculator(manager).entity_popularity()
+
+    scores = {f"{kind}:{entity_id}": score for kind, entity_id, score in rows}
+    assert scores.keys() <= index_ids
+    assert all(score > 0 for score in scores.values())
+    assert max(scores, key=scores.__getitem__) == "team:Natus Vincere"
@@ -0,0 +1,52 @@
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from cs_wayback_machine.spans import collect_spans, server_timing_header, span, timed
+from cs_wayback_machine.web.middleware import ServerTimingMiddleware
+
+
+@timed("work")
+def work():
+    with span("inner"):
+        return 42
+
+
+def test_spans_are_not_collected_by_default():
+    assert work() == 42
+
+
+def test_spans_are_collected_inside_block():
+    with collect_spans() as spans:
+        work()
+        work()
+
+    assert [name for name, _ in spans] == ["inner", "work", "inner", "work"]
+
+
+def test_server_timing_header_sums_same_spans():
+    header = server_timing_header(
+        [("query", 0.001), ("render", 0.002), ("query", 0.003)]
+    )
+
+    assert header == "query;dur=4.00, render;dur=2.00"
+
+
+async def test_server_timing_middleware_reports_spans_from_sync_views():
+    def view(request):  # noqa: U100
+        return PlainTextResponse(str(work()))
+
+    app = Starlette(
+        routes=[Route("/", view)], middleware=[Middleware(ServerTimingMiddleware)]
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        response = await client.get("/")
+
+    names = [
+        item.split(";")[0] for item in response.headers["server-timing"].split(", ")
+    ]
+    assert names == ["inner", "work", "total"]
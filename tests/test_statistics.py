@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from cs_wayback_machine.statistics import (
+    BUCKETED_STATISTICS,
+    StatisticsCalculator,
+    StatisticsCube,
+    build_statistics_cube,
+)
+from cs_wayback_machine.storage import DuckDbConnectionManager, ParserResultsStorage
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return StatisticsCalculator(
+        DuckDbConnectionManager(ParserResultsStorage(FIXTURE_PATH))
+    )
+
+
+def test_top():
+    cube = StatisticsCube(
+        [
+            ("teams_with_most_players", "all", "", "A", 3),
+            ("teams_with_most_players", "all", "", "B", 2),
+            ("teams_with_most_players", "year", "2020", "B", 2),
+            ("teams_with_most_players", "game_version", "CS2", "A", 1),
+        ]
+    )
+
+    assert cube.top("teams_with_most_players", limit=1) == [("A", 3)]
+    assert cube.top("teams_with_most_players", year=2020, limit=5) == [("B", 2)]
+    assert cube.top("teams_with_most_players", game_version="CS2", limit=5) == [
+        ("A", 1)
+    ]
+    assert cube.top("teams_with_most_players", year=2021, limit=5) == []
+    assert cube.years == [2020]
+    assert cube.game_versions == ["CS2"]
+
+
+@pytest.mark.parametrize("statistic", BUCKETED_STATISTICS)
+def test_all_time_matches_calculator(calculator, statistic):
+    cube = build_statistics_cube(calculator, limit=10)
+
+    expected = getattr(calculator, statistic)(limit=10)
+    assert [total for _, total in cube.top(statistic, limit=10)] == [
+        total for _, total in expected
+    ]
+
+
+def test_year_totals_dont_exceed_all_time(calculator):
+    cube = build_statistics_cube(calculator, limit=100)
+
+    all_time = dict(cube.top("teams_with_most_players", limit=100))
+    for year in cube.years:
+        for team_id, total in cube.top("teams_with_most_players", year=year, limit=100):
+            assert total <= all_time[team_id]
@@ -0,0 +1,63 @@
+import dataclasses
+
+from cs_wayback_machine.duck import create_new_connection_from_parser_results
+from cs_wayback_machine.storage import ParserResultsStorage
+from cs_wayback_machine.synthetic import DatasetConfig, generate_rosters, write_dataset
+
+SPIDER_ITEM_KEYS = {
+    "team_unique_name",
+    "team_name",
+    "team_url",
+    "player_unique_id",
+    "game_version",
+    "player_id",
+    "full_name",
+    "player_url",
+    "is_captain",
+    "position",
+    "flag_name",
+    "join_date",
+    "inactive_date",
+    "leave_date",
+    "join_date_raw",
+    "inactive_date_raw",
+    "leave_date_raw",
+    "has_invalid_dates",
+}
+
+
+def test_same_seed_gives_same_dataset():
+    config = DatasetConfig(teams=20, seed=42)
+
+    assert list(generate_rosters(config)) == list(generate_rosters(config))
+    assert list(generate_rosters(config)) != list(
+        generate_rosters(dataclasses.replace(config, seed=43))
+    )
+
+
+def test_items_have_spider_schema():
+    items = list(generate_rosters(DatasetConfig(teams=50, invalid_date_share=0.5)))
+
+    assert all(set(item) == SPIDER_ITEM_KEYS for item in items)
+    invalid = [item for item in items if item["has_invalid_dates"]]
+    assert invalid
+    assert all(
+        item["join_date_raw"] or item["leave_date_raw"] or item["inactive_date_raw"]
+        for item in invalid
+    )
+
+
+def test_no_invalid_dates_if_share_is_zero():
+    items = generate_rosters(DatasetConfig(teams=50, invalid_date_share=0))
+
+    assert not any(item["has_invalid_dates"] for item in items)
+
+
+def test_dataset_can_be_loaded(tmp_path):
+    path = tmp_path / "rosters.jsonlines"
+    rows = write_dataset(path, DatasetConfig(teams=30))
+
+    conn = create_new_connection_from_parser_results(ParserResultsStorage(path))
+
+    assert conn.execute("SELECT COUNT(*) FROM rosters").fetchone() == (rows,)
+    assert conn.execute("SELECT COUNT(*) FROM teams").fetchone() == (30,)
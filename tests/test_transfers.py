@@ -0,0 +1,103 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from cs_wayback_machine.storage import (
+    DuckDbConnectionManager,
+    ParserResultsStorage,
+    RosterStorage,
+)
+from cs_wayback_machine.web.transfers import TeamFlow, TransferIndex, TransferRoute
+
+FIXTURE_PATH = Path(__file__).parent / "test_web" / "rosters.jsonlines"
+
+TRANSFERS = [
+    ("p1", "A", "B", date(2019, 12, 1), date(2020, 1, 1)),
+    ("p2", "A", "B", date(2020, 2, 1), date(2020, 2, 1)),
+    ("p3", "B", "C", date(2020, 5, 1), date(2020, 6, 1)),
+    ("p1", "B", "C", date(2021, 3, 1), date(2021, 3, 10)),
+]
+
+
+@pytest.fixture()
+def index():
+    return TransferIndex(TRANSFERS)
+
+
+def test_top_routes(index):
+    assert index.top_routes(limit=2) == [
+        TransferRoute("A", "B", 2),
+        TransferRoute("B", "C", 2),
+    ]
+    assert index.top_routes(year=2021, limit=10) == [TransferRoute("B", "C", 1)]
+    assert index.top_routes(year=2000, limit=10) == []
+
+
+def test_net_flow(index):
+    assert index.net_flow() == [
+        TeamFlow("C", 2, 0, 2),
+        TeamFlow("B", 2, 2, 0),
+        TeamFlow("A", 0, 2, -2),
+    ]
+    assert index.years == [2020, 2021]
+
+
+def test_team_transfers(index):
+    assert index.team_flow("B") == {
+        2020: TeamFlow("B", 2, 1, 1),
+        2021: TeamFlow("B", 0, 1, -1),
+    }
+    assert [item.player_id for item in index.inbound("B")] == ["p2", "p1"]
+    assert [item.player_id for item in index.outbound("B")] == ["p1", "p3"]
+    assert index.inbound("unknown") == []
+
+
+def test_transfers_from_rosters():
+    storage = RosterStorage(DuckDbConnectionManager(ParserResultsStorage(FIXTURE_PATH)))
+
+    transfers = storage.get_transfers(max_gap_days=90)
+
+    assert transfers
+    for _, from_team_id, to_team_id, left_date, joined_date in transfers:
+        assert from_team_id != to_team_id
+        assert (joined_date - left_date).days <= 90
+    assert len(storage.get_transfers(max_gap_days=0)) <= len(transfers)
+
+
+def test_overlapping_stints_are_not_transfers(tmp_path):
+    rows = [
+        ("A", "2020-01-01", "2021-01-01"),
+        # played for B while still in A
+        ("B", "2020-06-01", "2020-09-01"),
+        ("C", "2020-12-28", "2021-06-01"),
+        ("D", "2021-06-10", None),
+    ]
+    path = tmp_path / "rosters.jsonlines"
+    path.write_text(
+        "\n".join(
+            json.dumps(
+                {
+                    "team_unique_name": team,
+                    "team_name": team,
+                    "team_url": f"https://liquipedia.net/counterstrike/{team}",
+                    "player_unique_id": "p1",
+                    "player_id": "p1",
+                    "player_url": "https://liquipedia.net/counterstrike/p1",
+                    "is_captain": False,
+                    "game_version": "CS2",
+                    "has_invalid_dates": False,
+                    "join_date": join_date,
+                    "leave_date": leave_date,
+                }
+            )
+            for team, join_date, leave_date in rows
+        )
+    )
+    storage = RosterStorage(DuckDbConnectionManager(ParserResultsStorage(path)))
+
+    assert storage.get_transfers(max_gap_days=90) == [
+        ("p1", "A", "C", date(2021, 1, 1), date(2020, 12, 28)),
+        ("p1", "C", "D", date(2021, 6, 1), date(2021, 6, 10)),
+    ]
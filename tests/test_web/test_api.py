@@ -0,0 +1,227 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from cs_wayback_machine.deps import (
+    get_parser_result_path,
+    get_parser_result_updated_date_file_path,
+)
+from cs_wayback_machine.storage import DataUpdate
+from cs_wayback_machine.web.api import MAX_BATCH_IDS, ApiCache
+
+pytestmark = pytest.mark.picodi_override(
+    [
+        (
+            get_parser_result_path,
+            lambda: Path(__file__).parent / "rosters.jsonlines",
+        ),
+        (get_parser_result_updated_date_file_path, lambda: None),
+    ]
+)
+
+
+async def test_team(client):
+    result = await client.get("/api/teams/00_Nation/")
+
+    assert result.status_code == 200
+    data = result.json()
+    assert data["team_name"] == "00 Nation"
+    assert data["rosters"][0]["players"]
+
+
+async def test_player_by_alias(client):
+    result = await client.get("/api/players/leo_drk/")
+
+    assert result.status_code == 200
+    assert result.json()["player_nickname"] == "leo_drk"
+
+
+async def test_unknown_player(client):
+    result = await client.get("/api/players/nobody_at_all/")
+
+    assert result.status_code == 404
+
+
+async def test_batch(client):
+    result = await client.post(
+        "/api/batch/",
+        json={"teams": ["00 Nation", "Unknown"], "players": ["VLDN", "pita"]},
+    )
+
+    assert result.status_code == 200
+    data = result.json()
+    assert data["teams"]["00 Nation"]["team_name"] == "00 Nation"
+    assert data["teams"]["Unknown"] is None
+    assert set(data["players"]) == {"VLDN", "pita"}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"teams": "00 Nation"},
+        {"players": [1]},
+        {"teams": ["x"] * (MAX_BATCH_IDS + 1)},
+        [],
+    ],
+)
+async def test_invalid_batch(client, body):
+    result = await client.post("/api/batch/", json=body)
+
+    assert result.status_code == 400
+
+
+class FakeManager:
+    generation = 1
+
+    def __init__(self):
+        self.pending_updates = []
+        self.listeners = []
+
+    def add_update_listener(self, listener):
+        self.listeners.append(listener)
+
+    def refresh(self):
+        for update in self.pending_updates:
+            self.generation += 1
+            for listener in self.listeners:
+                listener(update)
+        self.pending_updates.clear()
+
+
+def test_cache_drops_entries_of_changed_teams():
+    cache = ApiCache(FakeManager(), max_entries=10)
+    cache.get_or_build(("team", "A"), lambda: (b"a", frozenset(["A"])))
+    cache.get_or_build(("player", "p1"), lambda: (b"p1", frozenset(["A", "B"])))
+    cache.get_or_build(("player", "p2"), lambda: (b"p2", frozenset(["B"])))
+
+    cache.on_update(
+        DataUpdate(
+            version=date(2024, 1, 1), teams=frozenset(["A"]), players=frozenset()
+        )
+    )
+
+    assert cache.get_or_build(("player", "p2"), lambda: None) == b"p2"
+    assert cache.get_or_build(("player", "p1"), lambda: None) is None
+    assert cache.get_or_build(("team", "A"), lambda: None) is None
+
+
+def test_cache_checks_for_new_data_before_lookup():
+    manager = FakeManager()
+    cache = ApiCache(manager, max_entries=10)
+    manager.add_update_listener(cache.on_update)
+    cache.get_or_build(("team", "A"), lambda: (b"old", frozenset(["A"])))
+    # published by another worker
+    manager.pending_updates.append(DataUpdate(version=date(2024, 1, 1)))
+
+    assert cache.get_or_build(("team", "A"), lambda: (b"new", frozenset(["A"]))) == (
+        b"new"
+    )
+
+
+async def test_export(client):
+    result = await client.get("/api/export/teams/")
+
+    assert result.status_code == 200
+    assert result.content.startswith(b"PAR1")
+
+
+async def test_export_unknown_table(client):
+    result = await client.get("/api/export/meta/")
+
+    assert result.status_code == 404
+
+
+async def test_rosters_on_date(client):
+    result = await client.get(
+        "/api/rosters/", params={"team": ["00 nation", "Unknown"], "date": "2024-01-10"}
+    )
+
+    assert result.status_code == 200
+    data = result.json()
+    assert data["Unknown"] is None
+    [period] = data["00 nation"]
+    assert {"VLDN", "FASHR"} <= set(period["players"])
+
+
+async def test_rosters_in_period(client):
+    result = await client.get(
+        "/api/rosters/",
+        params={"team": "00 Nation", "from": "2023-01-01", "to": "2024-12-31"},
+    )
+
+    assert result.status_code == 200
+    assert len(result.json()["00 Nation"]) > 1
+
+
+async def test_rosters_without_date(client):
+    result = await client.get("/api/rosters/", params={"team": "00 Nation"})
+
+    assert result.status_code == 400
+
+
+async def test_snapshot(client):
+    result = await client.get("/api/snapshot/", params={"date": "2024-01-10"})
+
+    assert result.status_code == 200
+    assert "00 Nation" in result.json()
+
+
+async def test_snapshot_page(client):
+    result = await client.get("/snapshot/", params={"date": "2024-01-10"})
+
+    assert result.status_code == 200
+    assert "00 Nation" in result.text
+
+
+async def test_connection(client):
+    result = await client.get(
+        "/api/connection/", params={"from": "kvik", "to": "s1mple"}
+    )
+
+    assert result.status_code == 200
+    data = result.json()
+    assert data["degrees"] == len(data["links"])
+    assert data["links"][0]["player_id"] == "Kvik"
+    assert data["links"][-1]["teammate_id"] == "S1mple"
+
+
+async def test_connection_not_found(client):
+    result = await client.get(
+        "/api/connection/", params={"from": "S1mple", "to": "RobbaN"}
+    )
+
+    assert result.status_code == 404
+
+
+async def test_connection_page(client):
+    result = await client.get("/connection/", params={"from": "Kvik", "to": "S1mple"})
+
+    assert result.status_code == 200
+    assert "degrees of separation" in result.text
+
+
+async def test_transfers(client):
+    result = await client.get("/api/transfers/")
+
+    assert result.status_code == 200
+    data = result.json()
+    assert data["routes"]
+    assert sum(flow["net"] for flow in data["net_flow"]) == 0
+
+
+async def test_team_transfers(client):
+    result = await client.get("/api/transfers/", params={"team": "natus vincere"})
+
+    assert result.status_code == 200
+    data = result.json()
+    assert data["team_id"] == "Natus Vincere"
+    assert data["inbound"]
+
+
+@pytest.mark.parametrize("url", ["/transfers/", "/transfers/?team=Natus_Vincere"])
+async def test_transfers_page(client, url):
+    result = await client.get(url)
+
+    assert result.status_code == 200
+    assert "Transfer" in result.text
@@ -3,14 +3,14 @@ from pathlib import Path
 import pytest
 
 from cs_wayback_machine.deps import (
-    get_parser_result_file_path,
+    get_parser_result_path,
     get_parser_result_updated_date_file_path,
 )
 
 pytestmark = pytest.mark.picodi_override(
     [
         (
-            get_parser_result_file_path,
+            get_parser_result_path,
             lambda: Path(__file__).parent / "rosters.jsonlines",
         ),
         (get_parser_result_updated_date_file_path, lambda: None),
@@ -45,6 +45,15 @@ async def test_request_main_page(client):
     assert "search" in result.text
 
 
+@pytest.mark.parametrize("params", [{"year": "2016"}, {"game_version": "CS:GO"}])
+async def test_request_main_page_bucket(client, params):
+    result = await client.get("/", params=params)
+
+    assert result.status_code == 200
+    assert "Teams with most players in " in result.text
+    assert 'aria-current="page"' in result.text
+
+
 async def test_request_teams(subtests, client, team_ids):
     for team_id in team_ids:
         with subtests.test(msg="request team page", team_id=team_id):
@@ -67,3 +76,30 @@ async def test_request_players(subtests, client, player_ids):
             assert result.status_code == 200
             assert "/players/" in result.url.path
             assert "List of Teams" in result.text
+
+
+async def test_search(client):
+    result = await client.get("/api/search/", params={"q": "natus vin"})
+
+    assert result.status_code == 200
+    assert result.json()[0] == "team:Natus Vincere"
+
+
+async def test_alias_redirects_to_canonical_page(client):
+    result = await client.get("/players/LEO_DRK/", params={"hl": "x"})
+
+    assert result.status_code == 302
+    assert result.headers["location"] == "/players/Leo_drk/?hl=x"
+
+
+async def test_goto_resolves_nickname(client):
+    result = await client.get("/goto/", params={"q": "niko"}, follow_redirects=True)
+
+    assert result.status_code == 200
+    assert result.url.path == "/players/Niko_(Danish_player)/"
+
+
+async def test_unknown_player_is_not_found(client):
+    result = await client.get("/players/nobody_at_all/")
+
+    assert result.status_code == 404
@@ -0,0 +1,39 @@
+import time
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from cs_wayback_machine.deps import (
+    get_parser_result_path,
+    get_parser_result_updated_date_file_path,
+)
+from cs_wayback_machine.web.html_render import jinja_env
+
+pytestmark = pytest.mark.picodi_override(
+    [
+        (
+            get_parser_result_path,
+            lambda: Path(__file__).parent / "rosters.jsonlines",
+        ),
+        (get_parser_result_updated_date_file_path, lambda: None),
+    ]
+)
+
+
+async def test_not_ready_without_warm_up(client):
+    response = await client.get("/ready/")
+
+    assert response.status_code == 503
+
+
+def test_ready_after_warm_up(asgi_app):
+    with TestClient(asgi_app) as client:
+        deadline = time.monotonic() + 10
+        while (response := client.get("/ready/")).status_code != 200:
+            assert time.monotonic() < deadline, response.text
+            time.sleep(0.05)
+
+    assert response.text == "ready"
+    assert jinja_env.cache is not None
+    assert len(jinja_env.cache) == len(jinja_env.list_templates())